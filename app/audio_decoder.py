@@ -0,0 +1,209 @@
+import asyncio
+from typing import AsyncIterator, Callable, Dict, Optional
+from .metrics import DROPS
+
+# Transcribe expects 16 kHz, 16-bit little-endian mono PCM
+PCM_SAMPLE_RATE = 16000
+PCM_FRAME_BYTES = 3200  # 100ms of 16kHz 16-bit mono
+
+EBML_MAGIC = b'\x1a\x45\xdf\xa3'
+CLUSTER_ID = b'\x1f\x43\xb6\x75'
+
+# Called with every PCM frame a session's decoder produces and its channel
+# count, by session id (the live-call handler keeps them as audio history)
+pcm_listeners: Dict[str, Callable[[bytes, int], None]] = {}
+
+class StreamingDecoder:
+    """
+    Long-lived ffmpeg process that decodes one session's WebM/Opus stream
+    The WebM stream is fed over stdin as it arrives and PCM frames are read
+    from stdout, so only the first chunk needs the EBML header. If ffmpeg
+    exits, it is restarted and primed with the saved stream header so later
+    fragments still decode. With channels > 1 the channels are kept apart
+    (interleaved PCM, 100 ms per channel in each frame) instead of downmixed.
+    """
+
+    def __init__(self, session_id: str, sample_rate: int = PCM_SAMPLE_RATE,
+                 frame_bytes: int = PCM_FRAME_BYTES, input_format: str = "webm",
+                 max_buffered_frames: int = 600, channels: int = 1):
+        self.session_id = session_id
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_bytes = frame_bytes * channels
+        self.input_format = input_format
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.stream_header = b""
+        self.restarts = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.closed = False
+        self.last_error = ""
+        self.frames_dropped = 0
+        # Decoded frames waiting for a consumer, about a minute of audio
+        self.pcm_frames: asyncio.Queue = asyncio.Queue(maxsize=max_buffered_frames)
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Set when ffmpeg is (re)started or the decoder closes, to wake the
+        # stdout pump waiting after the previous process exited
+        self._process_changed = asyncio.Event()
+
+    def command(self):
+        return [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error',
+            '-fflags', '+discardcorrupt',
+            '-f', self.input_format,
+            '-i', 'pipe:0',
+            '-f', 's16le',
+            '-ar', str(self.sample_rate),
+            '-ac', str(self.channels),
+            'pipe:1'
+        ]
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command(),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        self._stderr_task = asyncio.create_task(self._drain_stderr(self.process))
+        self._process_changed.set()
+        if self._pump_task is None:
+            self._pump_task = asyncio.create_task(self._pump_stdout())
+        print(f"Started ffmpeg decoder for session {self.session_id} (pid {self.process.pid})")
+
+    async def restart(self):
+        """Replace a dead ffmpeg process, replaying the stream header into the new one"""
+        await self._stop_process()
+        self.restarts += 1
+        await self.start()
+        if self.stream_header:
+            self.process.stdin.write(self.stream_header)
+            await self.process.stdin.drain()
+
+    async def feed(self, data: bytes):
+        """Write a chunk of the session's WebM stream to ffmpeg"""
+        if self.closed or not data:
+            return
+        async with self._lock:
+            if data[:4] == EBML_MAGIC:
+                # Keep EBML header, segment info and tracks to prime restarts
+                cluster = bytes(data).find(CLUSTER_ID)
+                self.stream_header = bytes(data[:cluster]) if cluster > 0 else bytes(data)
+
+            if self.process is None:
+                await self.start()
+                if self.stream_header and data[:4] != EBML_MAGIC:
+                    # Taking over a stream mid-way (channel layout change)
+                    self.process.stdin.write(self.stream_header)
+            elif self.process.returncode is not None:
+                print(f"ffmpeg decoder for session {self.session_id} exited "
+                      f"({self.process.returncode}): {self.last_error}, restarting")
+                await self.restart()
+
+            try:
+                self.process.stdin.write(data)
+                await self.process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError) as e:
+                print(f"ffmpeg decoder pipe error for session {self.session_id}: {e}, restarting")
+                await self.restart()
+                self.process.stdin.write(data)
+                await self.process.stdin.drain()
+            self.bytes_in += len(data)
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """Yield fixed-size PCM frames as ffmpeg produces them, across restarts"""
+        while True:
+            frame = await self.pcm_frames.get()
+            if frame is None:
+                return
+            yield frame
+
+    async def _pump_stdout(self):
+        # Reads every ffmpeg process in turn to EOF, so consumers never see a
+        # restart and close() still delivers the audio ffmpeg flushes on exit
+        while True:
+            process = self.process
+            try:
+                frame = await process.stdout.readexactly(self.frame_bytes)
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    self._put_frame(e.partial)
+                while self.process is process and not self.closed:
+                    self._process_changed.clear()
+                    await self._process_changed.wait()
+                if self.process is process:
+                    break
+                continue
+            self._put_frame(frame)
+        self._put_frame(None)
+
+    def _put_frame(self, frame: Optional[bytes]):
+        # None marks the end of the stream for frames()
+        if self.pcm_frames.full():
+            # Nobody is consuming; keep the most recent audio
+            self.pcm_frames.get_nowait()
+            self.frames_dropped += 1
+            DROPS.inc("decoder_frames")
+        if frame is not None:
+            self.bytes_out += len(frame)
+            listener = pcm_listeners.get(self.session_id)
+            if listener is not None:
+                listener(frame, self.channels)
+        self.pcm_frames.put_nowait(frame)
+
+    async def close(self):
+        """Flush and stop ffmpeg; safe to call more than once"""
+        if self.closed:
+            return
+        self.closed = True
+        self._process_changed.set()
+        await self._stop_process()
+        if self._pump_task is not None:
+            await self._pump_task
+        else:
+            self._put_frame(None)
+        print(f"Closed ffmpeg decoder for session {self.session_id} "
+              f"({self.bytes_in} bytes in, {self.bytes_out} bytes out, {self.restarts} restarts)")
+
+    async def _stop_process(self):
+        process = self.process
+        if process is None or process.returncode is not None:
+            return
+        try:
+            process.stdin.close()
+            await asyncio.wait_for(process.wait(), timeout=2)
+        except (asyncio.TimeoutError, BrokenPipeError, ConnectionResetError):
+            process.kill()
+            await process.wait()
+
+    async def _drain_stderr(self, process):
+        # An unread stderr pipe would eventually block ffmpeg
+        async for line in process.stderr:
+            self.last_error = line.decode(errors="ignore").strip()
+
+# Active decoders by session (one ffmpeg process per live call)
+session_decoders: Dict[str, StreamingDecoder] = {}
+
+def get_session_decoder(session_id: str, channels: int = 1) -> StreamingDecoder:
+    """
+    The session's decoder for a channel layout
+    A decoder open with another channel count is closed in the background
+    (its consumer still gets the audio it flushes) and replaced by one primed
+    with the stream header, so the session's WebM stream carries on
+    """
+    decoder = session_decoders.get(session_id)
+    if decoder is not None and not decoder.closed and decoder.channels != channels:
+        asyncio.get_running_loop().create_task(decoder.close())
+        replaced = StreamingDecoder(session_id, channels=channels)
+        replaced.stream_header = decoder.stream_header
+        decoder = session_decoders[session_id] = replaced
+    elif decoder is None or decoder.closed:
+        decoder = session_decoders[session_id] = StreamingDecoder(session_id, channels=channels)
+    return decoder
+
+async def close_session_decoder(session_id: str):
+    decoder = session_decoders.pop(session_id, None)
+    if decoder is not None:
+        await decoder.close()
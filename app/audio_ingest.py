@@ -0,0 +1,139 @@
+import ctypes.util
+import importlib.util
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .audio_decoder import PCM_SAMPLE_RATE
+from .multichannel import MAX_CHANNELS
+from .resampler import PolyphaseResampler
+
+# Codecs converted in-process, without ffmpeg (names as in audio_protocol.CODEC_NAMES)
+PCM_CODECS = ("pcm_s16le", "pcm_f32le")
+RAW_CODECS = PCM_CODECS + ("opus",)
+# Preferred by the server: 16 kHz s16le needs no conversion at all
+PREFERRED_CODEC = "pcm_s16le"
+# Longest Opus packet (120 ms) at the decode rate, in samples per channel
+OPUS_MAX_FRAME_SAMPLES = PCM_SAMPLE_RATE * 120 // 1000
+MAX_SAMPLE_RATE = 384000
+
+@lru_cache(maxsize=None)
+def opus_available() -> bool:
+    """Raw Opus packets need `pip install opuslib` and the libopus library"""
+    # opuslib itself raises on import when libopus cannot be found
+    return importlib.util.find_spec("opuslib") is not None and ctypes.util.find_library("opus") is not None
+
+def supported_codecs() -> List[str]:
+    codecs = ["webm_opus"] + list(PCM_CODECS)
+    if opus_available():
+        codecs.append("opus")
+    return codecs
+
+def negotiation() -> Dict:
+    """Audio formats offered to clients in the live-call handshake"""
+    return {
+        "codecs": supported_codecs(),
+        "preferred_codec": PREFERRED_CODEC,
+        "preferred_sample_rate": PCM_SAMPLE_RATE,
+        # Other PCM rates are resampled in-process
+        "sample_rates": "any"
+    }
+
+def validate_audio_config(codec: Optional[str] = None, sample_rate=None, channels=None) -> Dict:
+    """The audio format a client asked for, checked against what this server decodes"""
+    codec = codec or PREFERRED_CODEC
+    if codec not in supported_codecs():
+        raise ValueError(f"Unsupported codec {codec}; available: {', '.join(supported_codecs())}")
+    sample_rate = int(sample_rate or PCM_SAMPLE_RATE)
+    channels = int(channels or 1)
+    if not 0 < sample_rate <= MAX_SAMPLE_RATE:
+        raise ValueError(f"Unsupported sample rate: {sample_rate}")
+    if not 1 <= channels <= MAX_CHANNELS:
+        raise ValueError(f"Unsupported channel count: {channels}")
+    return {"codec": codec, "sample_rate": sample_rate, "channels": channels}
+
+class AudioIngest:
+    """
+    Converts one stream of raw client audio to the pipeline's 16 kHz s16le PCM
+    PCM (s16le or float32, any rate, interleaved channels) is resampled with
+    a NumPy polyphase filter, and raw Opus packets (one per message) are
+    decoded by libopus straight at 16 kHz; neither goes through ffmpeg.
+    WebM still needs the ffmpeg decoder. An empty Opus payload stands for a
+    lost packet and is filled by the decoder's loss concealment.
+    """
+
+    def __init__(self, codec: str, sample_rate: int = PCM_SAMPLE_RATE, channels: int = 1):
+        if codec not in RAW_CODECS:
+            raise ValueError(f"Codec {codec} is not decoded in-process")
+        if sample_rate <= 0:
+            raise ValueError(f"Invalid sample rate: {sample_rate}")
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.resampler: Optional[PolyphaseResampler] = None
+        self.decoder = None
+        self.last_frame_samples = PCM_SAMPLE_RATE // 50
+        if codec == "opus":
+            if not opus_available():
+                raise ValueError("Raw Opus needs opuslib and libopus; send WebM/Opus or PCM")
+            import opuslib
+
+            self.decoder = opuslib.Decoder(PCM_SAMPLE_RATE, channels)
+            # Decoded straight into a reused buffer: Decoder.decode copies
+            # every sample through a Python list
+            self.pcm = np.zeros(OPUS_MAX_FRAME_SAMPLES * channels, dtype="<i2")
+            self.pcm_pointer = self.pcm.ctypes.data_as(opuslib.api.c_int16_pointer)
+        elif sample_rate != PCM_SAMPLE_RATE:
+            self.resampler = PolyphaseResampler(sample_rate, PCM_SAMPLE_RATE, channels)
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def convert(self, payload) -> bytes:
+        """Interleaved 16 kHz s16le PCM for a payload (may be empty while the filter fills)"""
+        self.bytes_in += len(payload)
+        if self.codec == "opus":
+            pcm = self._decode_opus(bytes(payload))
+        elif self.resampler is None and self.codec == "pcm_s16le":
+            # Already the pipeline format
+            pcm = bytes(payload)
+        else:
+            pcm = self._convert_pcm(payload)
+        self.bytes_out += len(pcm)
+        return pcm
+
+    def _convert_pcm(self, payload) -> bytes:
+        dtype = "<i2" if self.codec == "pcm_s16le" else "<f4"
+        samples = np.frombuffer(payload, dtype=dtype)
+        samples = samples[:len(samples) - len(samples) % self.channels].reshape(-1, self.channels)
+        if self.codec == "pcm_s16le":
+            samples = samples.astype(np.float32)
+        else:
+            samples = samples * np.float32(32768.0)
+        if self.resampler is not None:
+            samples = self.resampler.process(samples)
+        return np.clip(np.rint(samples), -32768, 32767).astype("<i2").tobytes()
+
+    def _decode_opus(self, packet: bytes) -> bytes:
+        import opuslib
+
+        # An empty packet (lost) is concealed with as much audio as the
+        # previous one carried
+        frame_samples = OPUS_MAX_FRAME_SAMPLES if packet else self.last_frame_samples
+        samples = opuslib.api.decoder.libopus_decode(
+            self.decoder.decoder_state, packet, len(packet), self.pcm_pointer, frame_samples, 0
+        )
+        if samples < 0:
+            raise opuslib.OpusError(samples)
+        if packet:
+            self.last_frame_samples = samples
+        return self.pcm[:samples * self.channels].tobytes()
+
+    def stats(self) -> Dict:
+        return {
+            "codec": self.codec,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out
+        }
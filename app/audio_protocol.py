@@ -0,0 +1,82 @@
+import struct
+from typing import Optional, Union
+
+# Binary audio frames on /ws/live-call/{session_id}
+#
+#   offset  size  field
+#   0       1     message type (MSG_AUDIO)
+#   1       1     codec (CODEC_*)
+#   2       1     channels (interleaved in the payload)
+#   3       1     flags (FLAG_*; bits 4-7: source channel + 1 for one
+#                 source of a dual-stream client, 0 otherwise)
+#   4       4     sequence number, little-endian uint32
+#   8       4     sample rate in Hz, little-endian uint32
+#   12      ...   raw audio payload
+#
+# JSON text messages (transcript_data, control messages, base64 audio_data)
+# keep working on the same socket.
+HEADER = struct.Struct("<BBBBII")
+HEADER_SIZE = HEADER.size
+
+MSG_AUDIO = 1
+
+CODEC_WEBM_OPUS = 0
+CODEC_PCM_S16LE = 1
+CODEC_PCM_F32LE = 2
+CODEC_OPUS = 3
+
+CODEC_NAMES = {
+    CODEC_WEBM_OPUS: "webm_opus",
+    CODEC_PCM_S16LE: "pcm_s16le",
+    CODEC_PCM_F32LE: "pcm_f32le",
+    CODEC_OPUS: "opus"
+}
+
+FLAG_REAL_TRANSCRIPTION = 0x01
+FLAG_SOURCE_CHANNEL_SHIFT = 4
+
+class AudioFrame:
+    """A parsed binary audio frame; payload is a zero-copy view into the message"""
+
+    __slots__ = ("msg_type", "codec", "channels", "flags", "sequence", "sample_rate", "payload")
+
+    def __init__(self, msg_type: int, codec: int, channels: int, flags: int,
+                 sequence: int, sample_rate: int, payload: memoryview):
+        self.msg_type = msg_type
+        self.codec = codec
+        self.channels = channels
+        self.flags = flags
+        self.sequence = sequence
+        self.sample_rate = sample_rate
+        self.payload = payload
+
+    @property
+    def use_real_transcription(self) -> bool:
+        return bool(self.flags & FLAG_REAL_TRANSCRIPTION)
+
+    @property
+    def source_channel(self) -> Optional[int]:
+        """Channel a dual-stream client's mono frame belongs to, if any"""
+        value = self.flags >> FLAG_SOURCE_CHANNEL_SHIFT
+        return value - 1 if value else None
+
+def parse_frame(data: Union[bytes, bytearray, memoryview]) -> AudioFrame:
+    """Parse a binary WebSocket message without copying its payload"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError(f"Binary frame too short: {len(data)} bytes")
+    msg_type, codec, channels, flags, sequence, sample_rate = HEADER.unpack_from(data)
+    if msg_type != MSG_AUDIO:
+        raise ValueError(f"Unknown binary message type: {msg_type}")
+    if codec not in CODEC_NAMES:
+        raise ValueError(f"Unknown audio codec: {codec}")
+    return AudioFrame(msg_type, codec, channels, flags, sequence, sample_rate,
+                      memoryview(data)[HEADER_SIZE:])
+
+def encode_frame(payload: bytes, sequence: int, codec: int = CODEC_WEBM_OPUS,
+                 sample_rate: int = 48000, channels: int = 1,
+                 use_real_transcription: bool = False, source_channel: Optional[int] = None) -> bytes:
+    """Build a binary audio frame (used by clients, tests and benchmarks)"""
+    flags = FLAG_REAL_TRANSCRIPTION if use_real_transcription else 0
+    if source_channel is not None:
+        flags |= (source_channel + 1) << FLAG_SOURCE_CHANNEL_SHIFT
+    return HEADER.pack(MSG_AUDIO, codec, channels, flags, sequence & 0xFFFFFFFF, sample_rate) + payload
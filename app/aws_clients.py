@@ -0,0 +1,91 @@
+import threading
+from typing import Dict, Optional
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_REGION = "ap-south-1"
+
+# One pool per client is shared by every session, so size it for concurrent
+# sessions rather than botocore's default of 10
+MAX_POOL_CONNECTIONS = 50
+
+CLIENT_CONFIG = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    retries={"mode": "adaptive", "max_attempts": 5}
+)
+
+class AWSClientRegistry:
+    """
+    Process-wide registry of boto3 clients
+    Clients are created lazily on first use, once per (service, region), and
+    shared across sessions and threads so TLS connections are pooled and reused
+    """
+
+    def __init__(self, config: Config = CLIENT_CONFIG):
+        self.config = config
+        self.clients: Dict[tuple, object] = {}
+        self.lookups: Dict[tuple, int] = {}
+        self.lock = threading.Lock()
+        self.session = None
+
+    def get(self, service: str, region_name: Optional[str] = None):
+        key = (service, region_name or DEFAULT_REGION)
+        client = self.clients.get(key)
+        if client is None:
+            with self.lock:
+                client = self.clients.get(key)
+                if client is None:
+                    # boto3 sessions are not thread-safe, so creation stays under the lock
+                    if self.session is None:
+                        self.session = boto3.session.Session()
+                    client = self.session.client(service, region_name=key[1], config=self.config)
+                    self.clients[key] = client
+                    print(f"Created shared {service} client for {key[1]}")
+        self.lookups[key] = self.lookups.get(key, 0) + 1
+        return client
+
+    def stats(self) -> Dict:
+        """Live clients and pooled HTTP connections per (service, region)"""
+        clients = {}
+        for (service, region), client in list(self.clients.items()):
+            clients[f"{service}:{region}"] = {
+                "lookups": self.lookups.get((service, region), 0),
+                "connections": _live_connections(client)
+            }
+        return {
+            "clients": len(clients),
+            "connections": sum(c["connections"] for c in clients.values()),
+            "by_client": clients
+        }
+
+    def reset(self):
+        with self.lock:
+            self.clients.clear()
+            self.lookups.clear()
+            self.session = None
+
+def _live_connections(client) -> int:
+    """Count open connections in a client's urllib3 pools (idle plus in use)"""
+    try:
+        manager = client._endpoint.http_session._manager
+        total = 0
+        for pool_key in list(manager.pools.keys()):
+            pool = manager.pools.get(pool_key)
+            if pool is None or pool.pool is None:
+                continue
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+            in_use = pool.pool.maxsize - pool.pool.qsize()
+            total += idle + in_use
+        return total
+    except Exception:
+        return 0
+
+registry = AWSClientRegistry()
+
+def get_client(service: str, region_name: Optional[str] = None):
+    """Shared, pooled boto3 client for a service"""
+    return registry.get(service, region_name)
+
+def get_client_stats() -> Dict:
+    return registry.stats()
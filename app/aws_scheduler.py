@@ -0,0 +1,286 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from .call_insights import CUSTOMER_SPEAKER, get_call_insights
+from .metrics import AWS_WAIT, DROPS
+
+# Served in this order; "low" is bulk/offline work
+PRIORITIES = ("critical", "high", "normal", "low")
+PRIORITY_RANK = {priority: rank for rank, priority in enumerate(PRIORITIES)}
+
+# Requests per second per API for this process. Conservative defaults: set
+# them to your account's Service Quotas (per region) with
+# AWS_QUOTAS="comprehend.batch_detect_sentiment=20,transcribe.start_stream_transcription=25",
+# divided by the number of workers sharing the account
+DEFAULT_QUOTAS = {
+    "comprehend.batch_detect_sentiment": 10.0,
+    "comprehend.batch_detect_entities": 10.0,
+    "comprehend.batch_detect_key_phrases": 10.0,
+    "transcribe.start_transcription_job": 10.0,
+    "transcribe.get_transcription_job": 10.0,
+    "transcribe.start_stream_transcription": 10.0
+}
+# APIs not listed above
+DEFAULT_QUOTA = 10.0
+# Recent waits kept per priority for the percentiles in stats()
+WAIT_SAMPLES = 1000
+
+def parse_quotas(value: Optional[str]) -> Dict[str, float]:
+    quotas = dict(DEFAULT_QUOTAS)
+    for entry in (value or "").split(","):
+        api, _, rate = entry.partition("=")
+        if api.strip() and rate.strip():
+            quotas[api.strip()] = float(rate)
+    return quotas
+
+AWS_QUOTAS = parse_quotas(os.environ.get("AWS_QUOTAS"))
+
+# Priority and deadline (seconds from enqueue) of AWS requests made in the
+# current context; set with scheduling()
+request_priority: contextvars.ContextVar[Tuple[str, float]] = \
+    contextvars.ContextVar("request_priority", default=("normal", 0.0))
+request_deadline: contextvars.ContextVar[Optional[float]] = \
+    contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """A request was still queued for quota at its deadline, so it was dropped"""
+
+@contextmanager
+def scheduling(priority: str = "normal", score: float = 0.0, deadline_seconds: Optional[float] = None):
+    """AWS requests made inside the block use this priority and deadline"""
+    if priority not in PRIORITY_RANK:
+        raise ValueError(f"Unknown priority: {priority}")
+    priority_token = request_priority.set((priority, score))
+    deadline_token = request_deadline.set(deadline_seconds)
+    try:
+        yield
+    finally:
+        request_priority.reset(priority_token)
+        request_deadline.reset(deadline_token)
+
+def session_priority(session_id: str) -> Tuple[str, float]:
+    """
+    Priority of a live call's requests, from its current insights
+    High urgency with negative sentiment is critical, either alone is high.
+    The customer's own channel is used once it has been heard. The score
+    orders sessions within a priority (higher first)
+    """
+    aggregate = get_call_insights(session_id.partition(":")[0])
+    if aggregate is None or not aggregate.chunks:
+        return "normal", 0.0
+    customer = aggregate.by_speaker.get(CUSTOMER_SPEAKER, aggregate)
+    level = customer.current_urgency["level"]
+    negative = customer.current_sentiment == "negative"
+    score = customer.current_urgency["score"] + customer.sentiment_counts["negative"] / max(customer.chunks, 1)
+    if level == "high" and negative:
+        return "critical", score
+    if level == "high" or (negative and level == "medium"):
+        return "high", score
+    return "normal", score
+
+class TokenBucket:
+    """rate requests per second, with bursts of up to capacity; thread-safe"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now: float) -> bool:
+        with self.lock:
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available"""
+        with self.lock:
+            self._refill(now)
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+class QuotaBuckets:
+    """
+    The token bucket of every AWS API, created on first use
+    Shared by the schedulers of all event loops in the process (the server's,
+    the bulk runner's, Lambda's), since the quota is per account, not per loop
+    """
+
+    def __init__(self, quotas: Optional[Dict[str, float]] = None):
+        self.quotas = dict(AWS_QUOTAS if quotas is None else quotas)
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    def get(self, api: str) -> TokenBucket:
+        with self.lock:
+            bucket = self.buckets.get(api)
+            if bucket is None:
+                bucket = self.buckets[api] = TokenBucket(self.quotas.get(api, DEFAULT_QUOTA))
+            return bucket
+
+QUOTA_BUCKETS = QuotaBuckets()
+
+class Waiter:
+    __slots__ = ("key", "priority", "future", "enqueued_at", "deadline")
+
+    def __init__(self, key, priority, future, enqueued_at, deadline):
+        self.key = key
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = enqueued_at
+        self.deadline = deadline
+
+    def __lt__(self, other: "Waiter") -> bool:
+        return self.key < other.key
+
+class APIQueue:
+    """One event loop's priority queue for an AWS API, and the API's shared bucket"""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.waiters: list = []
+        self.dispatcher: Optional[asyncio.Task] = None
+        self.granted = 0
+        self.dropped = 0
+
+class AWSRequestScheduler:
+    """
+    Shares AWS API quota between sessions by priority
+    Every API has a token bucket sized to its quota, shared with the other
+    event loops' schedulers. A request takes a token at once when nobody in
+    this loop is queued; otherwise it waits in the loop's priority queue
+    (critical first, then by session score, then arrival) drained as tokens
+    refill. A request still queued at its deadline is dropped with
+    DeadlineExceeded instead of spending quota on a stale result. Wait times
+    are recorded per API and priority.
+    """
+
+    def __init__(self, buckets: Optional[QuotaBuckets] = None):
+        self.buckets = QUOTA_BUCKETS if buckets is None else buckets
+        self.queues: Dict[str, APIQueue] = {}
+        self.sequence = itertools.count()
+        self.waits: Dict[str, deque] = {priority: deque(maxlen=WAIT_SAMPLES) for priority in PRIORITIES}
+        self.requests = {priority: 0 for priority in PRIORITIES}
+        self.drops = {priority: 0 for priority in PRIORITIES}
+
+    def _queue(self, api: str) -> APIQueue:
+        queue = self.queues.get(api)
+        if queue is None:
+            queue = self.queues[api] = APIQueue(self.buckets.get(api))
+        return queue
+
+    async def acquire(self, api: str, priority: Optional[str] = None, score: Optional[float] = None,
+                      deadline_seconds: Optional[float] = None):
+        """Wait for quota to make one request; priority and deadline default to the context's"""
+        context_priority, context_score = request_priority.get()
+        priority = priority or context_priority
+        score = context_score if score is None else score
+        if deadline_seconds is None:
+            deadline_seconds = request_deadline.get()
+        queue = self._queue(api)
+        now = time.monotonic()
+        self.requests[priority] += 1
+        if not queue.waiters and queue.bucket.try_take(now):
+            self._granted(api, queue, priority, 0.0)
+            return
+
+        deadline = now + deadline_seconds if deadline_seconds is not None else None
+        waiter = Waiter((PRIORITY_RANK[priority], -score, next(self.sequence)), priority,
+                        asyncio.get_running_loop().create_future(), now, deadline)
+        heapq.heappush(queue.waiters, waiter)
+        if queue.dispatcher is None or queue.dispatcher.done():
+            queue.dispatcher = asyncio.create_task(self._dispatch(api, queue))
+        try:
+            # asyncio.wait rather than wait_for, so a grant racing the
+            # timeout is never lost
+            done, _ = await asyncio.wait({waiter.future}, timeout=deadline_seconds)
+        except asyncio.CancelledError:
+            waiter.future.cancel()
+            raise
+        if not done or waiter.future.cancelled():
+            waiter.future.cancel()
+            queue.dropped += 1
+            self.drops[priority] += 1
+            DROPS.inc("aws_deadline")
+            raise DeadlineExceeded(f"{api} request ({priority}) not started within {deadline_seconds:.1f}s")
+
+    async def call(self, api: str, func: Callable, *args, priority: Optional[str] = None,
+                   score: Optional[float] = None, deadline_seconds: Optional[float] = None, **kwargs):
+        """Run a blocking boto3 call in a thread once quota allows"""
+        await self.acquire(api, priority, score, deadline_seconds)
+        return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def _dispatch(self, api: str, queue: APIQueue):
+        while queue.waiters:
+            waiter = queue.waiters[0]
+            now = time.monotonic()
+            if waiter.future.done() or (waiter.deadline is not None and now >= waiter.deadline):
+                # Timed out or cancelled: never spend a token on it
+                heapq.heappop(queue.waiters)
+                waiter.future.cancel()
+                continue
+            if queue.bucket.try_take(now):
+                heapq.heappop(queue.waiters)
+                waiter.future.set_result(None)
+                self._granted(api, queue, waiter.priority, now - waiter.enqueued_at)
+                continue
+            await asyncio.sleep(queue.bucket.wait_time(now))
+
+    def _granted(self, api: str, queue: APIQueue, priority: str, waited: float):
+        queue.granted += 1
+        self.waits[priority].append(waited)
+        AWS_WAIT.observe(waited, api, priority)
+
+    def stats(self) -> Dict:
+        by_priority = {}
+        for priority in PRIORITIES:
+            waits = sorted(self.waits[priority])
+            by_priority[priority] = {
+                "requests": self.requests[priority],
+                "dropped": self.drops[priority],
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else None,
+                "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else None,
+                "wait_max_ms": round(waits[-1] * 1000, 1) if waits else None
+            }
+        return {
+            "by_priority": by_priority,
+            "by_api": {
+                api: {
+                    "quota_per_second": queue.bucket.rate,
+                    "queued": sum(1 for waiter in queue.waiters if not waiter.future.done()),
+                    "granted": queue.granted,
+                    "dropped": queue.dropped
+                }
+                for api, queue in self.queues.items()
+            }
+        }
+
+# One scheduler per event loop (the server loop, or Lambda's reused loop),
+# all drawing on QUOTA_BUCKETS
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AWSRequestScheduler]" = \
+    weakref.WeakKeyDictionary()
+_schedulers_lock = threading.Lock()
+
+def get_scheduler() -> AWSRequestScheduler:
+    loop = asyncio.get_running_loop()
+    with _schedulers_lock:
+        scheduler = _schedulers.get(loop)
+        if scheduler is None:
+            scheduler = _schedulers[loop] = AWSRequestScheduler()
+        return scheduler
@@ -0,0 +1,313 @@
+"""
+Bulk offline call analysis
+Transcribes and analyzes every recording in a local directory, an S3 prefix
+or a manifest file (one local path or s3:// URI per line), with per-service
+concurrency limits and a checkpoint so interrupted runs resume where they
+stopped. Run from the repo root:
+
+    python -m app.batch_runner s3://bucket/calls/ --out results.jsonl
+    python -m app.batch_runner ./recordings --bucket my-bucket --out results.parquet
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from .aws_clients import DEFAULT_REGION, get_client
+from .aws_scheduler import scheduling
+from .comprehend import analyze_text_async
+from .s3_upload import upload_stream
+from .transcribe import estimate_media_seconds, get_transcript_text, start_transcription
+
+AUDIO_EXTENSIONS = (".mp3", ".mp4", ".m4a", ".wav", ".flac", ".ogg", ".amr", ".webm")
+DEFAULT_BUCKET = "callinsightawsgenai"
+# Read size when streaming local recordings into S3
+FILE_CHUNK_BYTES = 1024 * 1024
+# Seconds between progress lines
+PROGRESS_INTERVAL = 10.0
+
+def list_sources(source: str, region: str = DEFAULT_REGION) -> List[str]:
+    """Expand a directory, s3:// prefix or manifest file into recording locations"""
+    if source.startswith("s3://"):
+        bucket, _, prefix = source[5:].partition("/")
+        paginator = get_client("s3", region).get_paginator("list_objects_v2")
+        return [
+            f"s3://{bucket}/{item['Key']}"
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix)
+            for item in page.get("Contents", [])
+            if item["Key"].lower().endswith(AUDIO_EXTENSIONS)
+        ]
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+            if name.lower().endswith(AUDIO_EXTENSIONS)
+        )
+    with open(source) as manifest:
+        entries = []
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entries.append(json.loads(line)["uri"] if line.startswith("{") else line)
+        return entries
+
+class Checkpoint:
+    """
+    Append-only record of finished recordings (JSON lines of source/status)
+    Every line is flushed as soon as a recording finishes, so a crash loses
+    at most the recordings that were in flight
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from an interrupted run
+                    self.done[entry["source"]] = entry["status"]
+        self.file = open(path, "a")
+
+    def completed(self, retry_failed: bool = True) -> Set[str]:
+        return {source for source, status in self.done.items()
+                if status == "ok" or not retry_failed}
+
+    def record(self, source: str, status: str):
+        self.done[source] = status
+        self.file.write(json.dumps({"source": source, "status": status}) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class JSONLSink:
+    def __init__(self, path: str):
+        self.file = open(path, "a")
+
+    def write(self, record: Dict):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    """
+    Writes results as Parquet row groups (needs pyarrow)
+    Parquet files cannot be appended to, so each run writes its own
+    <name>-<run id>.parquet next to the requested path
+    """
+
+    def __init__(self, path: str, rows_per_group: int = 500):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        stem, extension = os.path.splitext(path)
+        self.path = f"{stem}-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}{extension}"
+        self.rows_per_group = rows_per_group
+        self.rows: List[Dict] = []
+        self.writer = None
+        # Declared up front: failed and successful records carry different
+        # keys, and an inferred schema would keep only the first row's
+        self.schema = pyarrow.schema([
+            ("source", pyarrow.string()),
+            ("status", pyarrow.string()),
+            ("error", pyarrow.string()),
+            ("media_uri", pyarrow.string()),
+            ("job_name", pyarrow.string()),
+            ("transcript", pyarrow.string()),
+            ("insights", pyarrow.string()),
+            ("elapsed_seconds", pyarrow.float64())
+        ])
+
+    def write(self, record: Dict):
+        # Nested insights are stored as a JSON string column (null for failures)
+        insights = record.get("insights")
+        self.rows.append(dict(record, insights=None if insights is None else json.dumps(insights)))
+        if len(self.rows) >= self.rows_per_group:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        # Missing keys become nulls
+        table = self.pa.Table.from_pylist(self.rows, schema=self.schema)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+
+def open_sink(path: str):
+    return ParquetSink(path) if path.endswith(".parquet") else JSONLSink(path)
+
+async def file_chunks(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, FILE_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+class BatchRunner:
+    """
+    Drives transcription and analysis for many recordings
+    A fixed pool of workers pulls recordings one at a time; each AWS stage
+    (S3 upload/download, Transcribe jobs, Comprehend analysis) has its own
+    concurrency limit so no service is pushed past its quota
+    """
+
+    def __init__(self, sink, checkpoint: Checkpoint, bucket: str = DEFAULT_BUCKET,
+                 region: str = DEFAULT_REGION, workers: int = 16, s3_concurrency: int = 8,
+                 transcribe_concurrency: int = 10, comprehend_concurrency: int = 4):
+        self.sink = sink
+        self.checkpoint = checkpoint
+        self.bucket = bucket
+        self.region = region
+        self.workers = workers
+        self.limits = {
+            "s3": asyncio.Semaphore(s3_concurrency),
+            "transcribe": asyncio.Semaphore(transcribe_concurrency),
+            "comprehend": asyncio.Semaphore(comprehend_concurrency),
+        }
+        self.total = 0
+        self.ok = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.started_at = 0.0
+
+    async def process(self, source: str) -> Dict:
+        started = time.monotonic()
+        media_format = None
+        media_seconds = None
+        if source.startswith("s3://"):
+            media_uri = source
+        else:
+            key = f"uploads/{uuid.uuid4()}_{os.path.basename(source)}"
+            async with self.limits["s3"]:
+                upload = await upload_stream(get_client("s3", self.region), self.bucket, key,
+                                             file_chunks(source))
+            media_uri = upload.uri
+            media_format = upload.media_format
+            media_seconds = estimate_media_seconds(upload.size, media_format)
+
+        async with self.limits["transcribe"]:
+            transcription = await start_transcription(
+                get_client("transcribe", self.region), media_uri,
+                media_format=media_format, media_seconds=media_seconds
+            )
+        async with self.limits["s3"]:
+            transcript_text = await asyncio.to_thread(get_transcript_text, transcription["Transcript"])
+        async with self.limits["comprehend"]:
+            insights = await analyze_text_async(get_client("comprehend", self.region), transcript_text)
+        if media_seconds:
+            self.audio_seconds += media_seconds
+        return {
+            "source": source,
+            "media_uri": media_uri,
+            "job_name": transcription["JobName"],
+            "transcript": transcript_text,
+            "insights": insights,
+            "elapsed_seconds": round(time.monotonic() - started, 2)
+        }
+
+    async def _worker(self, queue: "asyncio.Queue[str]"):
+        while True:
+            source = await queue.get()
+            try:
+                record = await self.process(source)
+                record["status"] = "ok"
+                self.ok += 1
+            except Exception as e:
+                record = {"source": source, "status": "failed", "error": str(e)}
+                self.failed += 1
+            try:
+                self.sink.write(record)
+                self.checkpoint.record(source, record["status"])
+            finally:
+                queue.task_done()
+
+    async def run(self, sources: Iterable[str]):
+        queue: "asyncio.Queue[str]" = asyncio.Queue()
+        for source in sources:
+            queue.put_nowait(source)
+        self.total = queue.qsize()
+        self.started_at = time.monotonic()
+        # Bulk work yields AWS quota to live calls sharing the process
+        with scheduling("low"):
+            workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+        reporter = asyncio.create_task(self._report_progress())
+        try:
+            await queue.join()
+        finally:
+            for task in workers + [reporter]:
+                task.cancel()
+            await asyncio.gather(*workers, reporter, return_exceptions=True)
+        self.print_progress()
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            self.print_progress()
+
+    def print_progress(self):
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        done = self.ok + self.failed
+        rate = done / elapsed
+        eta = f"{(self.total - done) / rate:.0f}s" if rate else "?"
+        print(f"[{elapsed:7.0f}s] {done}/{self.total} done ({self.ok} ok, {self.failed} failed)  "
+              f"{rate * 60:.1f} files/min  {self.audio_seconds / elapsed:.1f} audio s/s  "
+              f"eta {eta}", flush=True)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Transcribe and analyze recorded calls in bulk")
+    parser.add_argument("source", help="local directory, s3://bucket/prefix or manifest file")
+    parser.add_argument("--out", default="results.jsonl", help="results file (.jsonl or .parquet)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <out>.checkpoint)")
+    parser.add_argument("--bucket", default=DEFAULT_BUCKET, help="bucket for local recordings")
+    parser.add_argument("--region", default=DEFAULT_REGION)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--s3-concurrency", type=int, default=8)
+    parser.add_argument("--transcribe-concurrency", type=int, default=10)
+    parser.add_argument("--comprehend-concurrency", type=int, default=4)
+    parser.add_argument("--skip-failed", action="store_true",
+                        help="do not retry recordings that failed in a previous run")
+    args = parser.parse_args(argv)
+
+    checkpoint = Checkpoint(args.checkpoint or f"{args.out}.checkpoint")
+    finished = checkpoint.completed(retry_failed=not args.skip_failed)
+    sources = [source for source in list_sources(args.source, args.region) if source not in finished]
+    print(f"{len(sources)} recordings to process ({len(finished)} already done)", flush=True)
+
+    sink = open_sink(args.out)
+    runner = BatchRunner(
+        sink, checkpoint, bucket=args.bucket, region=args.region, workers=args.workers,
+        s3_concurrency=args.s3_concurrency, transcribe_concurrency=args.transcribe_concurrency,
+        comprehend_concurrency=args.comprehend_concurrency
+    )
+    try:
+        asyncio.run(runner.run(sources))
+    finally:
+        sink.close()
+        checkpoint.close()
+    return 1 if runner.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
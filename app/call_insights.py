@@ -0,0 +1,243 @@
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+# Points kept in each session's sentiment timeline
+TIMELINE_POINTS = 120
+# Distinct keywords / action items tracked per session (space-saving top-k)
+TOP_K_CAPACITY = 32
+# Finished calls kept for post-call queries before the oldest is evicted
+MAX_RETAINED_SESSIONS = 1000
+# Most recent speaker-tagged utterances kept per session
+SPEAKER_TIMELINE_ENTRIES = 200
+# Speaker whose sentiment, emotion and urgency describe "the customer"
+CUSTOMER_SPEAKER = "customer"
+
+SENTIMENT_VALUES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+URGENCY_RANK = {"low": 0, "medium": 1, "high": 2}
+
+class SpaceSavingCounter:
+    """
+    Approximate top-k counter in bounded memory (Metwally et al. space-saving)
+    When full, a new item replaces the current minimum and inherits its count,
+    so heavy hitters are never lost and counts are over-estimated by at most
+    the minimum
+    """
+
+    def __init__(self, capacity: int = TOP_K_CAPACITY):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+
+    def add(self, item: str, count: int = 1):
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+        else:
+            victim = min(self.counts, key=self.counts.get)
+            self.counts[item] = self.counts.pop(victim) + count
+
+    def top(self, k: int = 10) -> List[Dict]:
+        ranked = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:k]
+        return [{"item": item, "count": count} for item, count in ranked]
+
+class DownsampledTimeline:
+    """
+    Fixed-size timeline of averaged values
+    Each point covers bucket_seconds; when the timeline fills up adjacent
+    points are merged and the bucket width doubles, so memory stays bounded
+    for any call length
+    """
+
+    def __init__(self, max_points: int = TIMELINE_POINTS, bucket_seconds: float = 5.0):
+        self.max_points = max_points
+        self.bucket_seconds = bucket_seconds
+        # [bucket_start_offset, sum, count]
+        self.points: List[list] = []
+
+    def add(self, offset: float, value: float):
+        bucket_start = offset - offset % self.bucket_seconds
+        if self.points and self.points[-1][0] == bucket_start:
+            self.points[-1][1] += value
+            self.points[-1][2] += 1
+            return
+        if len(self.points) >= self.max_points:
+            self._downsample()
+            bucket_start = offset - offset % self.bucket_seconds
+            if self.points and self.points[-1][0] == bucket_start:
+                self.points[-1][1] += value
+                self.points[-1][2] += 1
+                return
+        self.points.append([bucket_start, value, 1])
+
+    def _downsample(self):
+        self.bucket_seconds *= 2
+        merged: List[list] = []
+        for start, total, count in self.points:
+            bucket_start = start - start % self.bucket_seconds
+            if merged and merged[-1][0] == bucket_start:
+                merged[-1][1] += total
+                merged[-1][2] += count
+            else:
+                merged.append([bucket_start, total, count])
+        self.points = merged
+
+    def to_list(self) -> List[Dict]:
+        return [
+            {"offset_seconds": start, "value": round(total / count, 3), "samples": count}
+            for start, total, count in self.points
+        ]
+
+class CallInsightsAggregate:
+    """
+    Running insight state for one call, updated in O(1) per analyzed chunk
+    Holds the sentiment distribution and timeline, current and peak urgency,
+    keyword and action-item top-k, the emotion histogram and call duration.
+    Chunks from separated channels carry a speaker: each speaker also gets
+    its own aggregate, the call gets a speaker-tagged timeline, and once the
+    customer has been heard the customer-facing fields come from their
+    channel alone
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.last_update: Optional[float] = None
+        self.ended_at: Optional[float] = None
+        self.chunks = 0
+        self.sentiment_counts = {"positive": 0, "neutral": 0, "negative": 0}
+        self.current_sentiment = "neutral"
+        self.sentiment_timeline = DownsampledTimeline()
+        self.current_urgency = {"level": "low", "score": 0}
+        self.peak_urgency = {"level": "low", "score": 0, "offset_seconds": None}
+        self.keywords = SpaceSavingCounter()
+        self.action_items = SpaceSavingCounter()
+        self.emotions: Dict[str, int] = {}
+        self.current_emotion = "neutral"
+        self.by_speaker: Dict[str, CallInsightsAggregate] = {}
+        self.speaker_timeline: deque = deque(maxlen=SPEAKER_TIMELINE_ENTRIES)
+
+    def record(self, insights: Dict, now: Optional[float] = None, speaker: Optional[str] = None,
+               text: Optional[str] = None):
+        """Fold one analyze_text_chunk result into the aggregate"""
+        if not insights or "error" in insights:
+            return
+        now = now or time.time()
+        offset = now - self.started_at
+        if speaker is not None:
+            per_speaker = self.by_speaker.get(speaker)
+            if per_speaker is None:
+                per_speaker = self.by_speaker[speaker] = CallInsightsAggregate(self.session_id)
+                per_speaker.started_at = self.started_at
+            per_speaker.record(insights, now)
+            self.speaker_timeline.append({
+                "offset_seconds": round(offset, 1),
+                "speaker": speaker,
+                "text": text,
+                "sentiment": insights.get("sentiment", "neutral"),
+                "urgency": (insights.get("urgency") or {}).get("level", "low"),
+                "emotion": insights.get("customer_emotion", "neutral")
+            })
+        self.chunks += 1
+        self.last_update = now
+
+        sentiment = insights.get("sentiment", "neutral")
+        self.sentiment_counts[sentiment] = self.sentiment_counts.get(sentiment, 0) + 1
+        self.current_sentiment = sentiment
+        self.sentiment_timeline.add(offset, SENTIMENT_VALUES.get(sentiment, 0.0))
+
+        urgency = insights.get("urgency") or {}
+        level = urgency.get("level", "low")
+        score = urgency.get("score", 0)
+        self.current_urgency = {"level": level, "score": score}
+        if (URGENCY_RANK.get(level, 0), score) > (URGENCY_RANK.get(self.peak_urgency["level"], 0),
+                                                  self.peak_urgency["score"]):
+            self.peak_urgency = {"level": level, "score": score, "offset_seconds": round(offset, 1)}
+
+        for keyword in insights.get("keywords", []):
+            self.keywords.add(keyword)
+        for action in insights.get("action_items", []):
+            self.action_items.add(action)
+
+        emotion = insights.get("customer_emotion", "neutral")
+        self.emotions[emotion] = self.emotions.get(emotion, 0) + 1
+        self.current_emotion = emotion
+
+    def end(self):
+        self.ended_at = self.ended_at or time.time()
+
+    @property
+    def duration_seconds(self) -> float:
+        return (self.ended_at or time.time()) - self.started_at
+
+    @property
+    def dominant_sentiment(self) -> str:
+        return max(self.sentiment_counts, key=self.sentiment_counts.get) if self.chunks else "neutral"
+
+    def speaker_summary(self) -> Dict:
+        return {
+            "chunks_analyzed": self.chunks,
+            "dominant_sentiment": self.dominant_sentiment,
+            "current_sentiment": self.current_sentiment,
+            "sentiment_distribution": dict(self.sentiment_counts),
+            "peak_urgency": self.peak_urgency,
+            "current_emotion": self.current_emotion,
+            "emotion_histogram": dict(self.emotions)
+        }
+
+    def snapshot(self) -> Dict:
+        duration = int(self.duration_seconds)
+        # With separated channels, the customer's own speech is the signal
+        customer = self.by_speaker.get(CUSTOMER_SPEAKER, self)
+        snapshot = {
+            "total_duration": f"{duration // 3600:02d}:{duration % 3600 // 60:02d}:{duration % 60:02d}",
+            "duration_seconds": round(self.duration_seconds, 1),
+            "active": self.ended_at is None,
+            "chunks_analyzed": self.chunks,
+            "customer_sentiment": customer.dominant_sentiment,
+            "current_sentiment": self.current_sentiment,
+            "sentiment_distribution": dict(self.sentiment_counts),
+            "sentiment_timeline": self.sentiment_timeline.to_list(),
+            "urgency_level": customer.peak_urgency["level"],
+            "current_urgency": self.current_urgency,
+            "peak_urgency": self.peak_urgency,
+            "action_items": [entry["item"] for entry in self.action_items.top()],
+            "keywords": [entry["item"] for entry in self.keywords.top()],
+            "top_action_items": self.action_items.top(),
+            "top_keywords": self.keywords.top(),
+            "customer_emotion": customer.current_emotion,
+            "emotion_histogram": dict(self.emotions)
+        }
+        if self.by_speaker:
+            snapshot["speakers"] = {speaker: aggregate.speaker_summary()
+                                    for speaker, aggregate in self.by_speaker.items()}
+            snapshot["speaker_timeline"] = list(self.speaker_timeline)
+        return snapshot
+
+# Aggregates by session id, oldest first; finished calls stay queryable
+# until MAX_RETAINED_SESSIONS newer ones push them out. Calls still in
+# progress are never evicted
+session_insights: "OrderedDict[str, CallInsightsAggregate]" = OrderedDict()
+
+def get_or_create_call_insights(session_id: str) -> CallInsightsAggregate:
+    aggregate = session_insights.get(session_id)
+    if aggregate is None:
+        aggregate = session_insights[session_id] = CallInsightsAggregate(session_id)
+        _evict_finished()
+    return aggregate
+
+def _evict_finished():
+    excess = len(session_insights) - MAX_RETAINED_SESSIONS
+    if excess <= 0:
+        return
+    finished = [session_id for session_id, aggregate in session_insights.items()
+                if aggregate.ended_at is not None]
+    for session_id in finished[:excess]:
+        del session_insights[session_id]
+
+def get_call_insights(session_id: str) -> Optional[CallInsightsAggregate]:
+    return session_insights.get(session_id)
+
+def record_insights(session_id: str, insights: Dict, speaker: Optional[str] = None,
+                    text: Optional[str] = None):
+    get_or_create_call_insights(session_id).record(insights, speaker=speaker, text=text)
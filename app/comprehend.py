@@ -1,143 +1,513 @@
-import boto3
 import asyncio
-from typing import Dict, List
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .aws_clients import get_client
+from .aws_scheduler import get_scheduler
+from .metrics import timed
+
+# Comprehend rejects documents over 5,000 UTF-8 bytes; keep a safety margin
+MAX_SEGMENT_BYTES = 4800
+# Maximum documents per batch_detect_* call
+MAX_BATCH_DOCUMENTS = 25
+# Cap on Comprehend calls in flight for a single analyze_text_async
+MAX_CONCURRENT_CALLS = 8
+
+SENTENCE_RE = re.compile(r"[^.!?]*(?:[.!?]+|$)\s*")
+
+async def analyze_text_async(client, text: str) -> Dict:
+    """
+    Run sentiment, entity and key phrase analysis concurrently
+    Long transcripts are split at sentence boundaries, packed into
+    batch_detect_* calls and merged back into a single result
+    Pass client=None to use the shared Comprehend client
+    """
+    cached = COMPREHEND_CACHE.get("comprehend", text)
+    if cached is not None:
+        return cached
 
-def analyze_text(client, text):
     try:
-        # Sentiment Analysis
-        sentiment_response = client.detect_sentiment(
-            Text=text,
-            LanguageCode="en"
-        )
-
-        # Entity Recognition
-        entities_response = client.detect_entities(
-            Text=text,
-            LanguageCode="en"
-        )
-
-        # Key Phrase Extraction
-        key_phrases_response = client.detect_key_phrases(
-            Text=text,
-            LanguageCode="en"
-        )
+        segments = split_text_segments(text)
+        if not segments:
+            return {
+                "Sentiment": "NEUTRAL",
+                "SentimentScore": {"Positive": 0.0, "Negative": 0.0, "Neutral": 1.0, "Mixed": 0.0},
+                "Entities": [],
+                "KeyPhrases": []
+            }
 
-        return {
-            "Sentiment": sentiment_response["Sentiment"],
-            "SentimentScore": sentiment_response["SentimentScore"],
-            "Entities": entities_response["Entities"],
-            "KeyPhrases": key_phrases_response["KeyPhrases"]
+        client = client or get_client("comprehend")
+        documents = [segment for _, segment in segments]
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+        with timed("comprehend"):
+            sentiment_results, entity_results, key_phrase_results = await asyncio.gather(
+                _batch_detect(client.batch_detect_sentiment, documents, semaphore),
+                _batch_detect(client.batch_detect_entities, documents, semaphore),
+                _batch_detect(client.batch_detect_key_phrases, documents, semaphore)
+            )
+
+        sentiment, sentiment_score = merge_sentiment(segments, sentiment_results)
+        result = {
+            "Sentiment": sentiment,
+            "SentimentScore": sentiment_score,
+            "Entities": merge_offset_items(segments, entity_results, "Entities", ("Type", "Text")),
+            "KeyPhrases": merge_offset_items(segments, key_phrase_results, "KeyPhrases", ("Text",))
         }
+        COMPREHEND_CACHE.set("comprehend", text, result)
+        return result
     except Exception as e:
         raise Exception(f"Comprehend error: {str(e)}")
 
+async def _batch_detect(api_call, documents: List[str], semaphore: asyncio.Semaphore) -> List[Dict]:
+    """Send documents in batches of 25 in parallel, returning results in document order"""
+
+    async def run_batch(start: int):
+        async with semaphore:
+            # Quota is shared with every other session, by priority
+            await get_scheduler().acquire(f"comprehend.{api_call.__name__}")
+            with timed("comprehend_api"):
+                response = await asyncio.to_thread(
+                    api_call,
+                    TextList=documents[start:start + MAX_BATCH_DOCUMENTS],
+                    LanguageCode="en"
+                )
+        if response.get("ErrorList"):
+            error = response["ErrorList"][0]
+            raise Exception(f"{error['ErrorCode']}: {error['ErrorMessage']}")
+        return start, response["ResultList"]
+
+    batches = await asyncio.gather(
+        *(run_batch(start) for start in range(0, len(documents), MAX_BATCH_DOCUMENTS))
+    )
+
+    results: List[Dict] = [{} for _ in documents]
+    for start, result_list in batches:
+        for result in result_list:
+            results[start + result["Index"]] = result
+    return results
+
+def split_text_segments(text: str, max_bytes: int = MAX_SEGMENT_BYTES) -> List[Tuple[int, str]]:
+    """
+    Split text into (char_offset, segment) pairs under max_bytes each
+    Segments end on sentence boundaries; a single over-long sentence is
+    cut at the last whitespace that fits
+    """
+    segments: List[Tuple[int, str]] = []
+    seg_start = 0
+    seg_bytes = 0
+    pos = 0
+
+    def flush(end: int):
+        if text[seg_start:end].strip():
+            segments.append((seg_start, text[seg_start:end]))
+
+    for match in SENTENCE_RE.finditer(text or ""):
+        sentence = match.group()
+        if not sentence:
+            continue
+        sentence_bytes = len(sentence.encode("utf-8"))
+
+        if seg_bytes + sentence_bytes > max_bytes and seg_bytes:
+            flush(pos)
+            seg_start, seg_bytes = pos, 0
+
+        while sentence_bytes > max_bytes:
+            cut = _byte_limited_cut(sentence, max_bytes)
+            flush(pos + cut)
+            pos += cut
+            seg_start = pos
+            sentence = sentence[cut:]
+            sentence_bytes = len(sentence.encode("utf-8"))
+
+        seg_bytes += sentence_bytes
+        pos = match.end()
+
+    flush(pos)
+    return segments
+
+def _byte_limited_cut(sentence: str, max_bytes: int) -> int:
+    """Longest prefix length that fits in max_bytes, preferring a whitespace break"""
+    cut = len(sentence.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore"))
+    space = sentence.rfind(" ", 0, cut)
+    return space + 1 if space > 0 else cut
+
+def merge_sentiment(segments: List[Tuple[int, str]], results: List[Dict]) -> Tuple[str, Dict]:
+    """Length-weighted average of per-segment sentiment scores"""
+    totals = {"Positive": 0.0, "Negative": 0.0, "Neutral": 0.0, "Mixed": 0.0}
+    total_weight = 0
+    for (_, segment), result in zip(segments, results):
+        weight = len(segment)
+        total_weight += weight
+        for label, score in result["SentimentScore"].items():
+            totals[label] = totals.get(label, 0.0) + score * weight
+
+    sentiment_score = {label: score / total_weight for label, score in totals.items()}
+    sentiment = max(sentiment_score, key=sentiment_score.get).upper()
+    return sentiment, sentiment_score
+
+def merge_offset_items(segments: List[Tuple[int, str]], results: List[Dict],
+                       field: str, key_fields: Tuple[str, ...]) -> List[Dict]:
+    """
+    Remap segment-relative offsets to the full text and drop duplicates
+    The first occurrence is kept, carrying the highest score seen
+    """
+    merged: Dict[Tuple, Dict] = {}
+    for (offset, _), result in zip(segments, results):
+        for item in result.get(field, []):
+            key = tuple(item[name].lower() for name in key_fields)
+            if key in merged:
+                merged[key]["Score"] = max(merged[key]["Score"], item["Score"])
+                continue
+            item = dict(item)
+            item["BeginOffset"] += offset
+            item["EndOffset"] += offset
+            merged[key] = item
+    return list(merged.values())
+
 def analyze_text_chunk(text_chunk: str) -> Dict:
     """
     Analyze a small chunk of text for real-time insights
     Optimized for speed and minimal latency
     """
     try:
-        comprehend_client = boto3.client("comprehend", region_name="ap-south-1")
-        
+        cached = CHUNK_CACHE.get("chunk", text_chunk)
+        if cached is not None:
+            return cached
+
         # For real-time, we focus on key insights that matter during calls
-        insights = {
-            "urgency": detect_urgency(text_chunk),
-            "sentiment": quick_sentiment_check(text_chunk),
-            "keywords": extract_keywords(text_chunk),
-            "action_items": detect_action_items(text_chunk),
-            "customer_emotion": analyze_customer_emotion(text_chunk)
-        }
-        
+        insights = LEXICON.analyze(text_chunk)
+        CHUNK_CACHE.set("chunk", text_chunk, insights)
         return insights
     except Exception as e:
         return {"error": str(e)}
 
+def speculative_insights(text: str) -> Dict:
+    """
+    Cheap provisional hints for a still-revisable partial transcript
+    Not cached or recorded, since the text will change
+    """
+    insights = LEXICON.analyze(text)
+    return {"sentiment": insights["sentiment"], "urgency_level": insights["urgency"]["level"]}
+
+def analyze_text_chunks(text_chunks: List[str]) -> List[Dict]:
+    """
+    Analyze many text chunks at once for real-time insights
+    Useful when replaying stored transcripts; repeated lines are scanned once
+    """
+    try:
+        results = [CHUNK_CACHE.get("chunk", text) for text in text_chunks]
+        missing = [i for i, cached in enumerate(results) if cached is None]
+        if missing:
+            fresh = LEXICON.analyze_many([text_chunks[i] for i in missing])
+            for i, insights in zip(missing, fresh):
+                CHUNK_CACHE.set("chunk", text_chunks[i], insights)
+                results[i] = insights
+        return results
+    except Exception as e:
+        return [{"error": str(e)} for _ in text_chunks]
+
+# Lexicons used by the real-time heuristics
+URGENCY_WORDS = [
+    "urgent", "immediately", "asap", "right now", "emergency",
+    "critical", "important", "priority", "rush", "hurry"
+]
+
+POSITIVE_WORDS = ["good", "great", "excellent", "happy", "satisfied", "love", "amazing"]
+NEGATIVE_WORDS = ["bad", "terrible", "angry", "frustrated", "hate", "awful", "disappointed"]
+
+# Common customer service keywords
+PRODUCT_WORDS = ["product", "service", "account", "billing", "payment", "order"]
+ISSUE_WORDS = ["problem", "issue", "error", "broken", "not working", "failed"]
+
+ACTION_INDICATORS = [
+    "need to", "want to", "would like to", "can you", "please",
+    "help me", "fix this", "resolve", "change", "update"
+]
+
+EMOTION_INDICATORS = {
+    "frustrated": ["frustrated", "annoyed", "irritated", "upset"],
+    "angry": ["angry", "mad", "furious", "outraged"],
+    "satisfied": ["happy", "pleased", "satisfied", "content"],
+    "confused": ["confused", "unsure", "uncertain", "don't understand"],
+    "anxious": ["worried", "concerned", "anxious", "nervous"]
+}
+
+class LexiconEngine:
+    """
+    Single-pass matcher for all real-time heuristic lexicons
+    Phrases are compiled into one word-bounded regex (factored as a prefix
+    trie), so the text is lower-cased and scanned once for every lexicon
+    """
+
+    def __init__(self, urgency_words: List[str], positive_words: List[str],
+                 negative_words: List[str], keyword_words: List[str],
+                 action_indicators: List[str], emotion_indicators: Dict[str, List[str]]):
+        self.emotions = list(emotion_indicators)
+
+        # phrase -> [(category, label, rank)], one phrase may feed several
+        # lexicons; rank keeps list results in declaration order
+        self.phrase_tags: Dict[str, List[Tuple[str, str, int]]] = {}
+        for rank, word in enumerate(urgency_words):
+            self._tag(word, "urgency", word, rank)
+        for word in positive_words:
+            self._tag(word, "sentiment", "positive", 0)
+        for word in negative_words:
+            self._tag(word, "sentiment", "negative", 0)
+        for rank, word in enumerate(keyword_words):
+            self._tag(word, "keywords", word, rank)
+        for rank, word in enumerate(action_indicators):
+            self._tag(word, "action_items", word, rank)
+        for emotion, words in emotion_indicators.items():
+            for word in words:
+                self._tag(word, "emotion", emotion, 0)
+
+        self.pattern = re.compile(r"\b(?:" + _trie_regex(self.phrase_tags) + r")\b")
+
+    def _tag(self, phrase: str, category: str, label: str, rank: int):
+        self.phrase_tags.setdefault(phrase.lower(), []).append((category, label, rank))
+
+    def match(self, text: str) -> set:
+        """Return the set of lexicon phrases present in the text"""
+        return set(self.pattern.findall(text.lower()))
+
+    def analyze(self, text: str) -> Dict:
+        """Produce every real-time insight for a text in one scan"""
+        return self.build_insights(self.match(text))
+
+    def analyze_many(self, texts: List[str]) -> List[Dict]:
+        """
+        Score many chunks at once
+        Repeated chunks (scripted greetings, simulator lines) are scanned once
+        """
+        scanned: Dict[str, frozenset] = {}
+        results = []
+        for text in texts:
+            phrases = scanned.get(text)
+            if phrases is None:
+                phrases = scanned[text] = frozenset(self.pattern.findall(text.lower()))
+            results.append(self.build_insights(phrases))
+        return results
+
+    def build_insights(self, phrases: set) -> Dict:
+        """Turn the matched phrase set into the analyze_text_chunk result shape"""
+        hits = {"urgency": [], "keywords": [], "action_items": []}
+        sentiment_counts = {"positive": 0, "negative": 0}
+        emotion_scores: Dict[str, int] = {}
+
+        for phrase in phrases:
+            for category, label, rank in self.phrase_tags[phrase]:
+                if category == "sentiment":
+                    sentiment_counts[label] += 1
+                elif category == "emotion":
+                    emotion_scores[label] = emotion_scores.get(label, 0) + 1
+                else:
+                    hits[category].append((rank, label))
+
+        for ranked in hits.values():
+            ranked.sort()
+        urgency_score = len(hits["urgency"])
+
+        if sentiment_counts["positive"] > sentiment_counts["negative"]:
+            sentiment = "positive"
+        elif sentiment_counts["negative"] > sentiment_counts["positive"]:
+            sentiment = "negative"
+        else:
+            sentiment = "neutral"
+
+        # Ties resolve in declaration order, like max() over the lexicon dict
+        customer_emotion = "neutral"
+        if emotion_scores:
+            customer_emotion = max(
+                (e for e in self.emotions if e in emotion_scores), key=emotion_scores.get
+            )
+
+        return {
+            "urgency": {
+                "level": "high" if urgency_score > 2 else "medium" if urgency_score > 0 else "low",
+                "score": urgency_score,
+                "indicators": [label for _, label in hits["urgency"]]
+            },
+            "sentiment": sentiment,
+            "keywords": [label for _, label in hits["keywords"]],
+            "action_items": [label for _, label in hits["action_items"]],
+            "customer_emotion": customer_emotion
+        }
+
+def _trie_regex(phrases) -> str:
+    """
+    Build a regex alternation factored on common prefixes
+    Greedy optional groups make each match the longest phrase at that position
+    """
+    trie: Dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        is_end = "" in node
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ""
+        if len(alternatives) == 1 and not is_end:
+            return alternatives[0]
+        group = "(?:" + "|".join(alternatives) + ")"
+        return group + "?" if is_end else group
+
+    return build(trie)
+
+# Built once at import and shared by every session
+LEXICON = LexiconEngine(
+    URGENCY_WORDS, POSITIVE_WORDS, NEGATIVE_WORDS,
+    PRODUCT_WORDS + ISSUE_WORDS, ACTION_INDICATORS, EMOTION_INDICATORS
+)
+
 def detect_urgency(text: str) -> Dict:
     """Detect urgency indicators in customer speech"""
-    urgency_words = [
-        "urgent", "immediately", "asap", "right now", "emergency",
-        "critical", "important", "priority", "rush", "hurry"
-    ]
-    
-    text_lower = text.lower()
-    urgency_score = sum(1 for word in urgency_words if word in text_lower)
-    
-    return {
-        "level": "high" if urgency_score > 2 else "medium" if urgency_score > 0 else "low",
-        "score": urgency_score,
-        "indicators": [word for word in urgency_words if word in text_lower]
-    }
+    return LEXICON.analyze(text)["urgency"]
 
 def quick_sentiment_check(text: str) -> str:
     """Quick sentiment analysis for real-time feedback"""
-    positive_words = ["good", "great", "excellent", "happy", "satisfied", "love", "amazing"]
-    negative_words = ["bad", "terrible", "angry", "frustrated", "hate", "awful", "disappointed"]
-    
-    text_lower = text.lower()
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
-    
-    if positive_count > negative_count:
-        return "positive"
-    elif negative_count > positive_count:
-        return "negative"
-    else:
-        return "neutral"
+    return LEXICON.analyze(text)["sentiment"]
 
 def extract_keywords(text: str) -> List[str]:
     """Extract important keywords for real-time suggestions"""
-    # Common customer service keywords
-    keywords = []
-    
-    # Product/service keywords
-    product_words = ["product", "service", "account", "billing", "payment", "order"]
-    for word in product_words:
-        if word in text.lower():
-            keywords.append(word)
-    
-    # Issue keywords
-    issue_words = ["problem", "issue", "error", "broken", "not working", "failed"]
-    for word in issue_words:
-        if word in text.lower():
-            keywords.append(word)
-    
-    return keywords
+    return LEXICON.analyze(text)["keywords"]
 
 def detect_action_items(text: str) -> List[str]:
     """Detect action items that need to be addressed"""
-    action_indicators = [
-        "need to", "want to", "would like to", "can you", "please",
-        "help me", "fix this", "resolve", "change", "update"
-    ]
-    
-    actions = []
-    text_lower = text.lower()
-    
-    for indicator in action_indicators:
-        if indicator in text_lower:
-            actions.append(indicator)
-    
-    return actions
+    return LEXICON.analyze(text)["action_items"]
 
 def analyze_customer_emotion(text: str) -> str:
     """Analyze customer emotional state for agent guidance"""
-    emotion_indicators = {
-        "frustrated": ["frustrated", "annoyed", "irritated", "upset"],
-        "angry": ["angry", "mad", "furious", "outraged"],
-        "satisfied": ["happy", "pleased", "satisfied", "content"],
-        "confused": ["confused", "unsure", "uncertain", "don't understand"],
-        "anxious": ["worried", "concerned", "anxious", "nervous"]
+    return LEXICON.analyze(text)["customer_emotion"]
+
+class InsightCache:
+    """
+    Content-addressed cache for analysis results
+    Keys are a SHA-256 of the analysis kind and the normalized text. Memory
+    is bounded with LRU eviction, entries expire after ttl seconds, and an
+    optional SQLite file keeps results across restarts. Cached results are
+    shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: Optional[float] = 3600,
+                 path: Optional[str] = None, normalize: Callable[[str], str] = lambda text: text):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.normalize = normalize
+        self.entries: "OrderedDict[str, Tuple[Optional[float], object]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.Lock()
+
+        self.db = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS insights (key TEXT PRIMARY KEY, value TEXT, expires REAL)"
+            )
+            self.db.commit()
+
+    def key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{kind}\0{self.normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get(self, kind: str, text: str):
+        """Return the cached result, or None on a miss"""
+        key = self.key(kind, text)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                entry = self._load(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    self.entries[key] = entry
+                    self.entries.move_to_end(key)
+                    self._evict()
+                    self.hits += 1
+                    return value
+                self.expirations += 1
+                self._delete(key)
+            self.misses += 1
+            return None
+
+    def set(self, kind: str, text: str, value):
+        key = self.key(kind, text)
+        expires = time.time() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            self._evict()
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO insights (key, value, expires) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires)
+                )
+                self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM insights")
+                self.db.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "persistent": self.db is not None
+        }
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key: str):
+        row = self.db.execute("SELECT value, expires FROM insights WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[1], json.loads(row[0])
+
+    def _delete(self, key: str):
+        self.entries.pop(key, None)
+        if self.db is not None:
+            self.db.execute("DELETE FROM insights WHERE key = ?", (key,))
+            self.db.commit()
+
+def normalize_chunk_text(text: str) -> str:
+    """Heuristics ignore case and spacing, so neither should split cache entries"""
+    return " ".join(text.split()).lower()
+
+# Comprehend results carry character offsets and entity casing, so they are
+# keyed on the exact text; set INSIGHT_CACHE_PATH to persist them on disk
+COMPREHEND_CACHE = InsightCache(
+    max_entries=5000, ttl=7 * 24 * 3600, path=os.environ.get("INSIGHT_CACHE_PATH")
+)
+CHUNK_CACHE = InsightCache(max_entries=20000, ttl=3600, normalize=normalize_chunk_text)
+
+def get_cache_stats() -> Dict:
+    """Hit/miss counters for every insight cache"""
+    return {
+        "comprehend": COMPREHEND_CACHE.stats(),
+        "chunk": CHUNK_CACHE.stats()
     }
-    
-    text_lower = text.lower()
-    emotion_scores = {}
-    
-    for emotion, words in emotion_indicators.items():
-        score = sum(1 for word in words if word in text_lower)
-        if score > 0:
-            emotion_scores[emotion] = score
-    
-    if emotion_scores:
-        return max(emotion_scores, key=emotion_scores.get)
-    else:
-        return "neutral" 
\ No newline at end of file
@@ -0,0 +1,155 @@
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .audio_decoder import PCM_FRAME_BYTES
+from .metrics import DROPS
+
+# How long an out-of-order frame is held waiting for the frames before it;
+# override per connection with ?jitter_ms= (0 releases frames as they arrive)
+JITTER_TARGET_SECONDS = float(os.environ.get("JITTER_TARGET_MS", "60")) / 1000
+# Frames held at most, whatever their age (about 5 s of 100 ms frames)
+MAX_HELD_FRAMES = 50
+# A sequence number this far from the expected one restarts the stream
+# (client reconnect or sequence reset) instead of counting as late or lost
+MAX_SEQUENCE_GAP = 100
+
+SEQUENCE_MASK = 0xFFFFFFFF
+
+class JitterBuffer:
+    """
+    Reorders one audio stream's frames by their uint32 sequence numbers
+    Frames are released in sequence order, starting target_latency after
+    the first one arrives (so frames that overtook it at the start of the
+    stream are not lost). A missing frame is waited for
+    until the oldest frame held behind it is target_latency old; it is then
+    declared lost and released as None, so the caller can conceal the gap.
+    Frames arriving after their slot was released are late and dropped.
+    """
+
+    def __init__(self, target_latency: float = JITTER_TARGET_SECONDS,
+                 max_held: int = MAX_HELD_FRAMES):
+        self.target_latency = target_latency
+        self.max_held = max_held
+        self.expected: Optional[int] = None
+        # sequence -> (arrival time, item)
+        self.held: Dict[int, Tuple[float, object]] = {}
+        # Counters
+        self.received = 0
+        self.released = 0
+        self.reordered = 0
+        self.late = 0
+        self.lost = 0
+        self.duplicates = 0
+        self.resyncs = 0
+
+    def push(self, sequence: int, item, now: Optional[float] = None) -> List[Tuple[int, object]]:
+        """Add a frame; returns the (sequence, item or None if lost) now due, in order"""
+        now = time.monotonic() if now is None else now
+        self.received += 1
+        sequence &= SEQUENCE_MASK
+        if self.expected is None:
+            self.expected = sequence
+        ahead = (sequence - self.expected) & SEQUENCE_MASK
+        behind = (self.expected - sequence) & SEQUENCE_MASK
+        if min(ahead, behind) > MAX_SEQUENCE_GAP:
+            released = self._release_all()
+            self.expected = sequence
+            self.resyncs += 1
+            self.held[sequence] = (now, item)
+            return released + self._release(now)
+        if ahead > behind and self.released + self.lost == 0:
+            # Nothing released yet: the stream starts earlier than assumed
+            self.expected = sequence
+            ahead = 0
+        elif ahead > behind:
+            self.late += 1
+            DROPS.inc("jitter_late")
+            return []
+        if sequence in self.held:
+            self.duplicates += 1
+            DROPS.inc("jitter_duplicate")
+            return []
+        if any((held - self.expected) & SEQUENCE_MASK > ahead for held in self.held):
+            # Overtaken by a later frame
+            self.reordered += 1
+        self.held[sequence] = (now, item)
+        return self._release(now)
+
+    def flush(self, now: Optional[float] = None) -> List[Tuple[int, object]]:
+        """Release frames whose wait is over (call at next_deadline())"""
+        return self._release(time.monotonic() if now is None else now)
+
+    def next_deadline(self) -> Optional[float]:
+        """When the oldest held frame stops waiting for the gap before it"""
+        if not self.held:
+            return None
+        return min(arrived for arrived, _ in self.held.values()) + self.target_latency
+
+    def _advance(self):
+        self.expected = (self.expected + 1) & SEQUENCE_MASK
+
+    def _release(self, now: float) -> List[Tuple[int, object]]:
+        released = []
+        if self.released + self.lost == 0 and 0 < len(self.held) < self.max_held \
+                and now < self.next_deadline():
+            return released
+        while self.held:
+            if self.expected in self.held:
+                released.append((self.expected, self.held.pop(self.expected)[1]))
+                self.released += 1
+            elif len(self.held) >= self.max_held or now >= self.next_deadline():
+                # Give up on the gap: the caller conceals the lost frame
+                released.append((self.expected, None))
+                self.lost += 1
+                DROPS.inc("jitter_lost")
+            else:
+                break
+            self._advance()
+        return released
+
+    def _release_all(self) -> List[Tuple[int, object]]:
+        released = [(sequence, self.held[sequence][1]) for sequence in
+                    sorted(self.held, key=lambda sequence: (sequence - self.expected) & SEQUENCE_MASK)]
+        self.released += len(released)
+        self.held.clear()
+        return released
+
+    def stats(self) -> Dict:
+        return {
+            "target_latency_ms": round(self.target_latency * 1000, 1),
+            "held": len(self.held),
+            "received": self.received,
+            "released": self.released,
+            "reordered": self.reordered,
+            "late": self.late,
+            "lost": self.lost,
+            "duplicates": self.duplicates,
+            "resyncs": self.resyncs
+        }
+
+class FrameRepacketizer:
+    """
+    Cuts a PCM stream into whole fixed-size frames (100 ms per channel by default)
+    Clients send PCM in whatever packet sizes they capture; VAD and
+    transcription see whole frames, and the remainder waits for the next chunk
+    """
+
+    def __init__(self, frame_bytes: int = PCM_FRAME_BYTES):
+        self.frame_bytes = frame_bytes
+        self.remainder = bytearray()
+        self.frames = 0
+
+    def push(self, chunk) -> bytes:
+        """Add PCM bytes; returns the whole frames now complete (possibly none)"""
+        self.remainder += chunk
+        usable = len(self.remainder) - len(self.remainder) % self.frame_bytes
+        if not usable:
+            return b""
+        frames = bytes(self.remainder[:usable])
+        del self.remainder[:usable]
+        self.frames += usable // self.frame_bytes
+        return frames
+
+    def stats(self) -> Dict:
+        return {"frame_bytes": self.frame_bytes, "frames": self.frames, "remainder_bytes": len(self.remainder)}
@@ -1,14 +1,25 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, WebSocket
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .transcribe import start_transcription
-from .comprehend import analyze_text
-from .websocket_handler import websocket_endpoint
+from .transcribe import estimate_media_seconds, get_transcript_text, job_tracker_stats, start_transcription
+from .comprehend import analyze_text_async, get_cache_stats
+from .websocket_handler import HYPOTHESIS_SOURCES, websocket_endpoint, watch_endpoint, manager
+from .aws_clients import get_client, get_client_stats
+from .call_insights import CallInsightsAggregate, get_call_insights
+from .vad import session_vads, vad_report
+from .transcript_assembler import session_assemblers
+from .multichannel import channel_key
+from .s3_upload import MultipartFileReader, upload_stream
+from .metrics import render_metrics, timed
+from .transcribe_streaming import available_backends, validate_backend
+from .session_store import WORKER_ID, get_session_store
+from .audio_ingest import negotiation, validate_audio_config
+from .aws_scheduler import get_scheduler
+from typing import Optional
 import asyncio
-import boto3
 import os
+import time
 import uuid
-import requests
 
 app = FastAPI(title="AI-Driven Live Call Insights")
 
@@ -21,10 +32,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# AWS clients
-transcribe_client = boto3.client("transcribe", region_name="ap-south-1")
-comprehend_client = boto3.client("comprehend", region_name="ap-south-1")
-s3_client = boto3.client("s3", region_name="ap-south-1")
 S3_BUCKET = "callinsightawsgenai"
 
 # WebSocket endpoint for real-time call insights
@@ -32,28 +39,46 @@ S3_BUCKET = "callinsightawsgenai"
 async def websocket_endpoint_route(websocket: WebSocket, session_id: str):
     await websocket_endpoint(websocket, session_id)
 
+# Read-only live feed of a call's insights, served by any worker
+@app.websocket("/ws/call-insights/{session_id}")
+async def watch_endpoint_route(websocket: WebSocket, session_id: str):
+    await watch_endpoint(websocket, session_id)
+
 @app.post("/start-transcription/")
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_audio(request: Request):
+    """
+    Transcribe and analyze an uploaded recording (multipart form field "file")
+    The upload is streamed from the request body straight into an S3 multipart
+    upload, so memory per request stays bounded and nothing touches local disk
+    """
     try:
-        # Save uploaded audio temporarily
-        audio_path = f"/tmp/{file.filename}"
-        with open(audio_path, "wb") as f:
-            f.write(await file.read())
+        reader = MultipartFileReader(request.headers, request.stream())
+        await reader.open()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Upload to S3
-        s3_key = f"uploads/{uuid.uuid4()}_{file.filename}"
-        s3_client.upload_file(audio_path, S3_BUCKET, s3_key)
-        s3_uri = f"s3://{S3_BUCKET}/{s3_key}"
+    try:
+        # Unique key per upload, so concurrent uploads of the same filename never collide
+        filename = os.path.basename(reader.filename or "") or "audio"
+        s3_key = f"uploads/{uuid.uuid4()}_{filename}"
+        with timed("s3_upload"):
+            upload = await upload_stream(get_client("s3"), S3_BUCKET, s3_key, reader.chunks(),
+                                         content_type=reader.content_type)
 
         # Start transcription job with S3 URI
-        transcription = await start_transcription(transcribe_client, s3_uri)
+        with timed("transcription_job"):
+            transcription = await start_transcription(
+                get_client("transcribe"), upload.uri, media_format=upload.media_format,
+                media_seconds=estimate_media_seconds(upload.size, upload.media_format)
+            )
         transcript_url = transcription["Transcript"]
 
         # Fetch transcript text from S3 URL
-        transcript_text = get_transcript_text(transcript_url)
+        with timed("transcript_fetch"):
+            transcript_text = await asyncio.to_thread(get_transcript_text, transcript_url)
 
         # Analyze transcription with Comprehend
-        insights = analyze_text(comprehend_client, transcript_text)
+        insights = await analyze_text_async(get_client("comprehend"), transcript_text)
 
         return JSONResponse({
             "transcription": transcript_text,
@@ -64,7 +89,28 @@ async def transcribe_audio(file: UploadFile = File(...)):
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "worker": WORKER_ID,
+        "aws_clients": get_client_stats(),
+        "live_sessions": manager.memory_report(),
+        "pipelines": manager.pipeline_report(),
+        "outbound": manager.outbound_report(),
+        "jitter": manager.jitter_report(),
+        "aws_scheduler": get_scheduler().stats(),
+        "voice_activity": vad_report(),
+        "transcription_jobs": job_tracker_stats()
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Stage latencies, counters and gauges in Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Hit/miss counters for the insight caches"""
+    return get_cache_stats()
 
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -77,39 +123,72 @@ async def get_manifest():
 
 # Live call insights endpoints
 @app.post("/start-live-call/")
-async def start_live_call():
-    """Start a new live call session"""
+async def start_live_call(backend: Optional[str] = None, codec: Optional[str] = None,
+                          sample_rate: Optional[int] = None, channels: Optional[int] = None):
+    """
+    Start a new live call session
+    backend picks the transcription used when audio is sent with
+    use_real_transcription: aws, local (on-CPU), fake or simulation.
+    codec, sample_rate and channels set the format of JSON audio_data
+    (see the "audio" field of the response for what is accepted)
+    """
     session_id = str(uuid.uuid4())
+    try:
+        backend = validate_backend(backend)
+        audio = validate_audio_config(codec, sample_rate, channels) if codec else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Shared so whichever worker accepts the WebSocket picks the backend up
+    await get_session_store().create_session(session_id, {
+        "backend": backend,
+        "audio": audio,
+        "status": "ready",
+        "created_at": time.time()
+    })
+    # The aggregate is created when the WebSocket connects
     return {
         "session_id": session_id,
         "websocket_url": f"ws://localhost:8000/ws/live-call/{session_id}",
+        "transcription_backend": backend,
+        "available_backends": available_backends(),
+        "audio": dict(negotiation(), config=audio),
         "status": "ready"
     }
 
 @app.get("/call-insights/{session_id}")
-async def get_call_insights(session_id: str):
+async def call_insights(session_id: str):
     """Get insights for a specific call session"""
-    # This would return insights from the session
+    store = get_session_store()
+    session = await store.get_session(session_id)
+    aggregate = get_call_insights(session_id)
+    if aggregate is not None and aggregate.chunks:
+        insights = aggregate.snapshot()
+    else:
+        # Handled by another worker (or finished): use the shared snapshot
+        insights = await store.load_insights(session_id)
+        if insights is None and aggregate is not None:
+            insights = aggregate.snapshot()
+    if insights is None:
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Unknown session {session_id}")
+        insights = CallInsightsAggregate(session_id).snapshot()
+    vad = session_vads.get(session_id)
+    # One assembler per hypothesis source
+    assemblers = {source: session_assemblers.get(channel_key(session_id, source)) for source in HYPOTHESIS_SOURCES}
     return {
         "session_id": session_id,
-        "insights": {
-            "total_duration": "00:05:30",
-            "customer_sentiment": "positive",
-            "urgency_level": "medium",
-            "action_items": ["refund", "escalation"],
-            "keywords": ["billing", "payment", "issue"]
-        }
+        "session": session,
+        "insights": insights,
+        "voice_activity": vad.stats() if vad else None,
+        "transcript_assembly": {source: assembler.stats() for source, assembler in assemblers.items()
+                                if assembler} or None,
+        "jitter": manager.jitter_report().get(session_id)
     }
 
-def get_transcript_text(transcript_url):
-    response = requests.get(transcript_url)
-    data = response.json()
-    return data['results']['transcripts'][0]['transcript']
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
     # Test AWS permissions
-    client = boto3.client("sts")
+    client = get_client("sts")
     print(client.get_caller_identity()) 
\ No newline at end of file
@@ -0,0 +1,30 @@
+from typing import Optional
+
+# Standard library only: the Lambda handler imports this without the
+# server's dependencies (python-multipart is not in the deployment zip)
+
+# Bytes needed to recognise every container below
+SNIFF_BYTES = 12
+
+def detect_media_format(head: bytes) -> Optional[str]:
+    """Transcribe MediaFormat from the first bytes of a recording, or None"""
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head.startswith(b"fLaC"):
+        return "flac"
+    if head.startswith(b"OggS"):
+        return "ogg"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    if head.startswith(b"#!AMR"):
+        return "amr"
+    if head[4:8] == b"ftyp":
+        return "m4a" if head[8:11] == b"M4A" else "mp4"
+    return None
+
+def media_format_from_key(key: str) -> Optional[str]:
+    """Fall back to the file extension when the bytes are not available"""
+    extension = key.rsplit(".", 1)[-1].lower() if "." in key else ""
+    return extension if extension in ("mp3", "mp4", "wav", "flac", "ogg", "amr", "webm", "m4a") else None
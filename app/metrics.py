@@ -0,0 +1,148 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets (seconds) shared by every stage histogram: 0.5 ms .. 10 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Metric:
+    """
+    Base for the Prometheus-style metrics below
+    Values are kept per tuple of label values; updates take a per-metric lock
+    (stages also run in worker threads) and cost well under a microsecond,
+    so instrumentation stays on in production
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _label_text(self, values: Tuple, extra: str = "") -> str:
+        pairs = [f'{label}="{value}"' for label, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {value}" for key, value in list(self.values.items())]
+
+class Gauge(Metric):
+    """Gauge set directly, or read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labels)
+        self.values: Dict[Tuple, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, *label_values):
+        self.values[label_values] = value
+
+    def samples(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                return [f"{self.name} {self.callback()}"]
+            except Exception:
+                return []
+        return [f"{self.name}{self._label_text(key)} {value}" for key, value in list(self.values.items())]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self.values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in list(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = self._label_text(key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+REGISTRY: List[Metric] = []
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+STAGE_LATENCY = Histogram("call_insights_stage_latency_seconds",
+                          "Time spent in each processing stage", ["stage"])
+STAGE_ERRORS = Counter("call_insights_stage_errors_total", "Exceptions raised per stage", ["stage"])
+AUDIO_CHUNKS = Counter("call_insights_audio_chunks_total", "Audio messages received", ["encoding"])
+AUDIO_BYTES = Counter("call_insights_audio_bytes_total", "Audio payload bytes received", ["encoding"])
+TRANSCRIPTS = Counter("call_insights_transcripts_total", "Transcript chunks analyzed", ["source"])
+DROPS = Counter("call_insights_dropped_total", "Audio or messages dropped under load", ["reason"])
+VAD_FRAMES = Counter("call_insights_vad_frames_total", "Decoded PCM frames by VAD decision", ["decision"])
+AWS_WAIT = Histogram("call_insights_aws_wait_seconds", "Time AWS requests waited for API quota",
+                     ["api", "priority"])
+SIMULATION_FALLBACKS = Counter("call_insights_simulation_fallbacks_total",
+                               "Real transcription requests that fell back to simulation")
+
+# Stage timings of the message being processed, when its session asked for a trace
+current_trace: contextvars.ContextVar[Optional[Dict[str, float]]] = \
+    contextvars.ContextVar("current_trace", default=None)
+
+@contextmanager
+def timed(stage: str):
+    """Record a stage's latency (and add it to the current trace, if any)"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+def observe_stage(stage: str, seconds: float):
+    STAGE_LATENCY.observe(seconds, stage)
+    trace = current_trace.get()
+    if trace is not None:
+        trace[stage] = round(trace.get(stage, 0.0) + seconds * 1000, 3)
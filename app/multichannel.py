@@ -0,0 +1,43 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Speaker of each channel, in channel order: stereo call recordings and the
+# meet-transcriber client put the agent's microphone first and the remote
+# party (the customer) second. Override per session with ?speakers=a,b
+SPEAKERS = ("agent", "customer")
+# Capture sources of dual-stream clients and the channel each one feeds
+SOURCE_CHANNELS = {"microphone": 0, "meet": 1}
+MAX_CHANNELS = 8
+
+def speaker_name(channel: int, speakers: Sequence[str] = SPEAKERS) -> str:
+    return speakers[channel] if channel < len(speakers) else f"channel{channel}"
+
+def channel_key(session_id: str, speaker: str) -> str:
+    """Id under which a channel's decoder, VAD and transcription state is kept"""
+    return f"{session_id}:{speaker}"
+
+def parse_speakers(value: Optional[str]) -> Sequence[str]:
+    if not value:
+        return SPEAKERS
+    speakers = tuple(name.strip() for name in value.split(",") if name.strip())
+    return speakers[:MAX_CHANNELS] or SPEAKERS
+
+def split_channels(pcm, channels: int) -> List[np.ndarray]:
+    """
+    Split interleaved s16le PCM into one int16 array per channel
+    Each array is a strided view into the input (no samples are copied);
+    a trailing partial sample group is ignored
+    """
+    samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype="<i2")
+    usable = len(samples) - len(samples) % channels
+    interleaved = samples[:usable].reshape(-1, channels)
+    return [interleaved[:, channel] for channel in range(channels)]
+
+def downmix(pcm, channels: int) -> np.ndarray:
+    """Interleaved s16le PCM as mono int16, the mean of its channels (a trailing odd byte is ignored)"""
+    samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype="<i2", count=len(pcm) // 2)
+    if channels == 1:
+        return samples
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1, dtype=np.float32).astype("<i2")
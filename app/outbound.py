@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from .metrics import DROPS, timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Updates arriving within this window of the first pending one share a frame
+OUTBOUND_COALESCE_SECONDS = float(os.environ.get("OUTBOUND_COALESCE_MS", "50")) / 1000
+# Messages waiting for a slow client before the oldest are dropped
+MAX_PENDING_MESSAGES = 32
+
+def encode_json(message: Dict) -> str:
+    """Serialize with orjson when installed (several times faster), else json"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(message, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+        except TypeError:
+            pass
+    return json.dumps(message)
+
+def provisional(message: Dict) -> bool:
+    """A partial hypothesis that finalized nothing; the next update supersedes it"""
+    return message.get("is_final") is False and not message.get("finalized")
+
+def merge_insights(queued: Dict, newer: Dict) -> Dict:
+    """
+    Insights of two coalesced results: lists are unioned in order, nested
+    dicts merged the same way, and other values taken from the newer one;
+    urgency keeps the more urgent of the two
+    """
+    merged = dict(queued)
+    for key, value in newer.items():
+        previous = merged.get(key)
+        if isinstance(value, list) and isinstance(previous, list):
+            merged[key] = previous + [item for item in value if item not in previous]
+        elif isinstance(value, dict) and isinstance(previous, dict):
+            if key == "urgency" and previous.get("score", 0) > value.get("score", 0):
+                previous, value = value, previous
+            merged[key] = merge_insights(previous, value)
+        else:
+            merged[key] = value
+    return merged
+
+class OutboundScheduler:
+    """
+    Single writer for one WebSocket
+    Callers enqueue without waiting for the socket. live_insights updates of
+    the same speaker queued within the coalescing window merge into one
+    message: a queued partial is replaced by the next update, while finalized
+    results are combined (finalized sentences and finished transcripts are
+    concatenated, list-valued insights unioned), and a partial never
+    overwrites finalized results. Insights are sent as a delta of the fields
+    that changed since the last frame. The backlog is bounded: a slow client
+    makes updates merge, and other messages beyond MAX_PENDING_MESSAGES drop
+    the oldest.
+    """
+
+    def __init__(self, websocket, on_error: Callable[[Exception], None],
+                 window: float = OUTBOUND_COALESCE_SECONDS, delta: bool = True,
+                 max_pending: int = MAX_PENDING_MESSAGES,
+                 encode: Callable[[Dict], str] = encode_json):
+        self.websocket = websocket
+        self.on_error = on_error
+        self.window = window
+        self.delta = delta
+        self.max_pending = max_pending
+        self.encode = encode
+        self.pending: deque = deque()
+        self.has_pending = asyncio.Event()
+        # Insight fields as last sent, the base of the next delta
+        self.sent_insights: Dict = {}
+        self.worker: Optional[asyncio.Task] = None
+        # Counters
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.frames = 0
+        self.bytes_sent = 0
+
+    def start(self):
+        self.worker = asyncio.create_task(self._run())
+
+    def send(self, message: Dict):
+        """Queue a message for the client (never blocks)"""
+        self.enqueued += 1
+        if message.get("type") == "live_insights" and self.pending \
+                and self.pending[-1].get("type") == "live_insights" \
+                and self.pending[-1].get("speaker") == message.get("speaker") \
+                and not (provisional(message) and not provisional(self.pending[-1])):
+            self._merge(self.pending[-1], message)
+            self.coalesced += 1
+            DROPS.inc("outbound_coalesced")
+            return
+        if len(self.pending) >= self.max_pending:
+            self.pending.popleft()
+            self.dropped += 1
+            DROPS.inc("outbound_dropped")
+        # A copy, since later updates are merged into it in place
+        self.pending.append(dict(message))
+        self.has_pending.set()
+
+    @staticmethod
+    def _merge(queued: Dict, message: Dict):
+        coalesced = queued.get("coalesced", 1) + 1
+        if provisional(queued):
+            # Superseded by the newer hypothesis
+            queued.clear()
+            queued.update(message)
+        else:
+            finalized = queued.get("finalized", []) + message.get("finalized", [])
+            transcript = message.get("transcript")
+            if queued.get("is_final") is not False:
+                # The queued utterance is finished: keep both transcripts
+                transcript = " ".join(text for text in (queued.get("transcript"), transcript) if text)
+            insights = merge_insights(queued.get("insights", {}), message.get("insights", {}))
+            queued.update(message)
+            queued.update(finalized=finalized, transcript=transcript, insights=insights)
+        queued["coalesced"] = coalesced
+
+    def _delta(self, message: Dict) -> Dict:
+        insights = message.get("insights")
+        if not self.delta or insights is None:
+            return message
+        changed = {key: value for key, value in insights.items() if self.sent_insights.get(key) != value}
+        self.sent_insights.update(insights)
+        return dict(message, insights=changed, delta=True)
+
+    async def _run(self):
+        try:
+            while True:
+                await self.has_pending.wait()
+                if self.window and self.pending[0].get("type") == "live_insights":
+                    # Let closely spaced updates merge into this frame
+                    await asyncio.sleep(self.window)
+                while self.pending:
+                    message = self._delta(self.pending.popleft())
+                    with timed("encode"):
+                        text = self.encode(message)
+                    with timed("send"):
+                        await self.websocket.send_text(text)
+                    self.frames += 1
+                    self.bytes_sent += len(text)
+                self.has_pending.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.on_error(e)
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "pending": len(self.pending),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "frames": self.frames,
+            "bytes_sent": self.bytes_sent
+        }
@@ -0,0 +1,84 @@
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+
+from .audio_decoder import PCM_SAMPLE_RATE
+
+# Filter half-length in zero crossings of the lowpass sinc; more is sharper
+# and slower (10 keeps the transition band within ~5% of the new Nyquist)
+RESAMPLER_ZERO_CROSSINGS = 10
+# Kaiser window beta: ~80 dB stopband attenuation
+RESAMPLER_KAISER_BETA = 8.6
+# Passband edge as a fraction of the lower Nyquist frequency
+RESAMPLER_ROLLOFF = 0.95
+
+@lru_cache(maxsize=16)
+def polyphase_filter(up: int, down: int, zero_crossings: int = RESAMPLER_ZERO_CROSSINGS,
+                     beta: float = RESAMPLER_KAISER_BETA) -> np.ndarray:
+    """
+    Kaiser-windowed sinc lowpass for resampling by up/down, split into phases
+    Row p holds the taps applied to the input for output phase p, reversed
+    so they line up with a forward window of input samples
+    """
+    factor = max(up, down)
+    half = zero_crossings * factor
+    n = np.arange(-half, half + 1, dtype=np.float64)
+    cutoff = RESAMPLER_ROLLOFF / factor
+    taps = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), beta) * up
+    per_phase = -(-len(taps) // up)
+    taps = np.concatenate([taps, np.zeros(per_phase * up - len(taps))])
+    return np.ascontiguousarray(taps.reshape(per_phase, up).T[:, ::-1], dtype=np.float32)
+
+class PolyphaseResampler:
+    """
+    Streaming rational-ratio resampler for interleaved PCM
+    The ratio is reduced to up/down by the rates' gcd (48000 -> 16000 is 1/3,
+    44100 -> 16000 is 160/441) and each output sample is one polyphase dot
+    product, computed for a whole chunk at once with NumPy. Filter history is
+    kept between chunks, so a stream can be fed in any packet sizes.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int = PCM_SAMPLE_RATE, channels: int = 1):
+        divisor = gcd(in_rate, out_rate)
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.phases = polyphase_filter(self.up, self.down)
+        self.taps = self.phases.shape[1]
+        # Input not yet fully used, channel-major, starting with taps - 1
+        # samples of history (zeros before the stream starts); buffer_start is
+        # the absolute input index of its first sample, next_out the next
+        # output index
+        self.buffer = np.zeros((channels, self.taps - 1), dtype=np.float32)
+        self.buffer_start = -(self.taps - 1)
+        self.next_out = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample float32 frames shaped (n, channels); returns the output ready so far"""
+        self.buffer = np.concatenate([self.buffer, samples.T], axis=1)
+        available = self.buffer_start + self.buffer.shape[1]
+        end = (available * self.up - 1) // self.down + 1
+        if end <= self.next_out:
+            return np.zeros((0, self.channels), dtype=np.float32)
+
+        # Output n uses input samples k - taps + 1 .. k with k = n * down // up
+        windows = np.lib.stride_tricks.sliding_window_view(self.buffer, self.taps, axis=1)
+        if self.up == 1:
+            # Integer decimation (48 kHz, 32 kHz): one phase, and the windows
+            # are a strided view, so this is a single matrix-vector product
+            first = self.next_out * self.down - self.taps + 1 - self.buffer_start
+            out = windows[:, first::self.down][:, :end - self.next_out] @ self.phases[0]
+        else:
+            positions = np.arange(self.next_out, end, dtype=np.int64) * self.down
+            starts = positions // self.up - self.taps + 1 - self.buffer_start
+            out = np.einsum("cnt,nt->cn", windows[:, starts], self.phases[positions % self.up])
+        out = out.T
+
+        self.next_out = end
+        keep_from = (end * self.down) // self.up - self.taps + 1 - self.buffer_start
+        self.buffer = self.buffer[:, keep_from:]
+        self.buffer_start += keep_from
+        return out
@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+
+# Retention of each live call's audio history (memory is 32 KB per second)
+AUDIO_RETENTION_SECONDS = float(os.environ.get("AUDIO_RETENTION_SECONDS", "30"))
+# 16 kHz 16-bit mono, the pipeline's PCM format
+AUDIO_BYTES_PER_SECOND = 32000
+AUDIO_BYTES_PER_SAMPLE = 2
+
+class AudioRingBuffer:
+    """
+    Fixed-size ring buffer holding the most recent audio of one session
+    The buffer holds 16 kHz s16le mono PCM (decoded or downmixed before it is
+    written), so sizes and seconds are exact. Storage is preallocated once;
+    a read that wraps past the end of the storage is copied into one
+    contiguous array, any other read is a zero-copy view. Memory stays
+    constant however long the call runs.
+    """
+
+    def __init__(self, retention_seconds: float = AUDIO_RETENTION_SECONDS,
+                 bytes_per_second: int = AUDIO_BYTES_PER_SECOND):
+        self.retention_seconds = retention_seconds
+        self.bytes_per_second = bytes_per_second
+        # Whole samples only, so reads never split one
+        self.capacity = max(AUDIO_BYTES_PER_SAMPLE, int(retention_seconds * bytes_per_second)
+                            // AUDIO_BYTES_PER_SAMPLE * AUDIO_BYTES_PER_SAMPLE)
+        self.data = np.zeros(self.capacity, dtype=np.uint8)
+        self.write_pos = 0
+        self.size = 0
+        self.total_written = 0
+
+    def extend(self, chunk):
+        """Append bytes-like PCM, overwriting the oldest data when full"""
+        src = np.frombuffer(chunk, dtype=np.uint8)
+        self.total_written += len(src)
+        if len(src) >= self.capacity:
+            src = src[-self.capacity:]
+        n = len(src)
+        if n == 0:
+            return
+
+        capacity = self.capacity
+        pos = self.write_pos
+        first = min(n, capacity - pos)
+        self.data[pos:pos + first] = src[:first]
+        rest = n - first
+        if rest:
+            self.data[:rest] = src[first:]
+
+        self.write_pos = (pos + n) % capacity
+        self.size = min(capacity, self.size + n)
+
+    def last_bytes(self, nbytes: int) -> np.ndarray:
+        """
+        Read-only array of the newest nbytes, oldest first
+        Unless the read wraps, this is a view that aliases the buffer, so copy
+        it if it must outlive later writes
+        """
+        nbytes = min(max(0, int(nbytes)), self.size)
+        start = self.write_pos - nbytes
+        if start >= 0:
+            out = self.data[start:self.write_pos]
+        else:
+            out = np.concatenate([self.data[start:], self.data[:self.write_pos]])
+        out.flags.writeable = False
+        return out
+
+    def last(self, seconds: float) -> np.ndarray:
+        """Read-only array of the newest seconds of audio (whole samples)"""
+        samples = int(seconds * self.bytes_per_second) // AUDIO_BYTES_PER_SAMPLE
+        return self.last_bytes(samples * AUDIO_BYTES_PER_SAMPLE)
+
+    def clear(self):
+        self.write_pos = 0
+        self.size = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the buffer's storage"""
+        return self.data.nbytes
+
+    def __len__(self):
+        return self.size
+
+    def stats(self) -> dict:
+        return {
+            "retention_seconds": self.retention_seconds,
+            "buffered_bytes": self.size,
+            "buffered_seconds": self.size / self.bytes_per_second,
+            "total_bytes": self.total_written,
+            "memory_bytes": self.nbytes
+        }
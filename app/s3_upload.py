@@ -0,0 +1,207 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+from .media_format import SNIFF_BYTES, detect_media_format
+
+# S3 requires every part but the last to be at least 5 MiB
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+# Parts uploaded concurrently per request; memory per upload is bounded by
+# roughly (MULTIPART_MAX_PARALLEL + 1) * MULTIPART_PART_SIZE
+MULTIPART_MAX_PARALLEL = 4
+
+class S3MultipartUpload:
+    """
+    Streams bytes into an S3 multipart upload without holding the whole object
+    Data is buffered up to part_size, then each part is uploaded in a worker
+    thread; at most max_parallel parts are in flight, and write() waits for a
+    slot before buffering more, so memory stays bounded and the event loop
+    never blocks on S3. The media format is sniffed from the first bytes.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int = MULTIPART_PART_SIZE,
+                 max_parallel: int = MULTIPART_MAX_PARALLEL, content_type: Optional[str] = None):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.content_type = content_type
+        self.upload_id: Optional[str] = None
+        self.media_format: Optional[str] = None
+        self.size = 0
+        self._head = b""
+        self._buffer = bytearray()
+        self._slots = asyncio.Semaphore(max_parallel)
+        self._tasks: List[asyncio.Task] = []
+        self._parts: List[Dict] = []
+
+    @property
+    def uri(self) -> str:
+        return f"s3://{self.bucket}/{self.key}"
+
+    async def start(self):
+        extra = {"ContentType": self.content_type} if self.content_type else {}
+        response = await asyncio.to_thread(
+            self.client.create_multipart_upload, Bucket=self.bucket, Key=self.key, **extra
+        )
+        self.upload_id = response["UploadId"]
+
+    async def write(self, data: bytes):
+        if not data:
+            return
+        if self.upload_id is None:
+            await self.start()
+        if len(self._head) < SNIFF_BYTES:
+            self._head += bytes(data[:SNIFF_BYTES - len(self._head)])
+            if len(self._head) >= SNIFF_BYTES:
+                self.media_format = detect_media_format(self._head)
+        self.size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            await self._submit(part)
+
+    async def _submit(self, body: bytes):
+        # Wait for a free slot first, so buffered parts never pile up
+        await self._slots.acquire()
+        for task in self._tasks:
+            if task.done() and task.exception():
+                self._slots.release()
+                raise task.exception()
+        part_number = len(self._tasks) + 1
+        self._tasks.append(asyncio.create_task(self._upload_part(part_number, body)))
+
+    async def _upload_part(self, part_number: int, body: bytes):
+        try:
+            response = await asyncio.to_thread(
+                self.client.upload_part, Bucket=self.bucket, Key=self.key,
+                UploadId=self.upload_id, PartNumber=part_number, Body=body
+            )
+            self._parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+        finally:
+            self._slots.release()
+
+    async def complete(self) -> str:
+        """Upload the remaining bytes, finish the upload and return its S3 URI"""
+        if self.upload_id is None:
+            await self.start()
+        if self._head and self.media_format is None:
+            self.media_format = detect_media_format(self._head)
+        if self._buffer or not self._tasks:
+            # The last part may be smaller than the minimum part size
+            await self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        await asyncio.gather(*self._tasks)
+        await asyncio.to_thread(
+            self.client.complete_multipart_upload, Bucket=self.bucket, Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": sorted(self._parts, key=lambda part: part["PartNumber"])}
+        )
+        return self.uri
+
+    async def abort(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.upload_id is not None:
+            await asyncio.to_thread(
+                self.client.abort_multipart_upload, Bucket=self.bucket, Key=self.key,
+                UploadId=self.upload_id
+            )
+
+async def upload_stream(client, bucket: str, key: str, chunks: AsyncIterator[bytes],
+                        **options) -> S3MultipartUpload:
+    """Copy an async byte stream into S3; aborts the multipart upload on failure"""
+    upload = S3MultipartUpload(client, bucket, key, **options)
+    try:
+        async for chunk in chunks:
+            await upload.write(chunk)
+        await upload.complete()
+    except BaseException:
+        await upload.abort()
+        raise
+    return upload
+
+class MultipartFileReader:
+    """
+    Incremental reader for one file field of a multipart/form-data body
+    open() consumes the body until the field's headers arrive and exposes its
+    filename and content type; chunks() then yields the file bytes as they
+    stream in, without spooling the upload to memory or disk
+    """
+
+    def __init__(self, headers, body: AsyncIterator[bytes], field_name: str = "file"):
+        content_type, params = parse_options_header(headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise ValueError("Expected a multipart/form-data upload")
+        self.body = body.__aiter__()
+        self.field_name = field_name
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self._header_field = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._in_file = False
+        self._done = False
+        self._pending: List[bytes] = []
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        field = self._header_field.lower()
+        self._headers[field] = self._headers.get(field, b"") + data[start:end]
+
+    def _on_header_end(self):
+        self._header_field = b""
+
+    def _on_headers_finished(self):
+        _, disposition = parse_options_header(self._headers.get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("latin-1")
+        if self.filename is None and name == self.field_name and b"filename" in disposition:
+            self._in_file = True
+            self.filename = disposition[b"filename"].decode("utf-8", "replace")
+            self.content_type = self._headers.get(b"content-type", b"").decode("latin-1") or None
+
+    def _on_part_data(self, data, start, end):
+        if self._in_file:
+            self._pending.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        if self._in_file:
+            self._in_file = False
+            self._done = True
+
+    async def _read(self) -> bool:
+        try:
+            chunk = await self.body.__anext__()
+        except StopAsyncIteration:
+            return False
+        self._parser.write(chunk)
+        return True
+
+    async def open(self):
+        while self.filename is None:
+            if not await self._read():
+                raise ValueError(f"Missing file field '{self.field_name}'")
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            pending, self._pending = self._pending, []
+            for data in pending:
+                yield data
+            if self._done or not await self._read():
+                return
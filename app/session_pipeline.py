@@ -0,0 +1,161 @@
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from .metrics import DROPS
+
+# Pool for blocking stage work (heuristics, decoding helpers): "thread" or "process"
+STAGE_EXECUTOR = os.environ.get("STAGE_EXECUTOR", "thread")
+STAGE_WORKERS = int(os.environ.get("STAGE_WORKERS", "4"))
+
+# Per-session queue between the WebSocket reader and the processing pipeline
+SESSION_QUEUE_SIZE = int(os.environ.get("SESSION_QUEUE_SIZE", "32"))
+# What to do when a session's queue is full: drop_oldest, coalesce or pushback
+SESSION_OVERLOAD_POLICY = os.environ.get("SESSION_OVERLOAD_POLICY", "coalesce")
+
+OVERLOAD_POLICIES = ("drop_oldest", "coalesce", "pushback")
+
+_executor: Optional[Executor] = None
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if STAGE_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=STAGE_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="stage")
+    return _executor
+
+async def run_blocking(func, *args):
+    """Run blocking or CPU-bound stage work off the event loop"""
+    return await asyncio.get_event_loop().run_in_executor(get_executor(), func, *args)
+
+class SessionPipeline:
+    """
+    Bounded queue plus worker task between a session's WebSocket reader and
+    its processing stages
+    The reader only parses and enqueues, so a slow stage stalls just its own
+    session. When the queue is full the overload policy decides what happens:
+    drop_oldest discards the stalest message, coalesce merges the new message
+    into the newest queued one, and pushback stops reading from the socket
+    (and tells the client) until there is room.
+    """
+
+    def __init__(self, client_id: str, handler: Callable[[dict], Awaitable[None]],
+                 max_size: int = SESSION_QUEUE_SIZE, policy: str = SESSION_OVERLOAD_POLICY,
+                 on_pushback: Callable[[bool, int], Awaitable[None]] = None):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy: {policy}")
+        self.client_id = client_id
+        self.handler = handler
+        self.max_size = max_size
+        self.policy = policy
+        self.on_pushback = on_pushback
+        self.items: deque = deque()
+        self.has_items = asyncio.Event()
+        self.has_room = asyncio.Event()
+        self.has_room.set()
+        self.processed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.pushbacks = 0
+        self.max_depth = 0
+        self.last_lag = 0.0
+        self.avg_lag = 0.0
+        self.worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.worker = asyncio.create_task(self._run())
+
+    async def put(self, item: dict):
+        """Enqueue a message for processing, applying the overload policy when full"""
+        item["enqueued_at"] = time.monotonic()
+        if len(self.items) >= self.max_size:
+            if self.policy == "pushback":
+                self.pushbacks += 1
+                if self.on_pushback:
+                    await self.on_pushback(True, len(self.items))
+                # Resume only once the queue has drained to half, so the
+                # client is not toggled on and off for every message
+                while len(self.items) > self.max_size // 2:
+                    self.has_room.clear()
+                    await self.has_room.wait()
+                if self.on_pushback:
+                    await self.on_pushback(False, len(self.items))
+            elif self.policy == "coalesce" and self._coalesce(item):
+                self.coalesced += 1
+                DROPS.inc("pipeline_coalesced")
+                return
+            else:
+                self.items.popleft()
+                self.dropped += 1
+                DROPS.inc("pipeline_dropped")
+
+        self.items.append(item)
+        self.max_depth = max(self.max_depth, len(self.items))
+        self.has_items.set()
+
+    def _coalesce(self, item: dict) -> bool:
+        # Merge into the newest queued message of the same kind, keeping its
+        # enqueue time so lag still reflects the oldest data it carries
+        last = self.items[-1]
+        if last["type"] != item["type"] or last.get("use_real_transcription") != item.get("use_real_transcription"):
+            return False
+        if any(last.get(key) != item.get(key) for key in ("channels", "channel", "codec", "sample_rate")):
+            return False
+        if item["type"] == "audio_data":
+            if item.get("codec") == "opus":
+                # Opus packets only decode one at a time
+                return False
+            last["data"] = bytes(last["data"]) + bytes(item["data"])
+        elif item["type"] == "transcript_data":
+            # Each hypothesis restates its utterance, so a newer one supersedes
+            # a queued partial; a queued final must still be delivered
+            if last.get("is_final"):
+                return False
+            last["data"] = item["data"]
+            last["is_final"] = item.get("is_final", False)
+        else:
+            return False
+        return True
+
+    async def _run(self):
+        while True:
+            while not self.items:
+                self.has_items.clear()
+                await self.has_items.wait()
+            item = self.items.popleft()
+            self.has_room.set()
+
+            self.last_lag = time.monotonic() - item["enqueued_at"]
+            self.avg_lag = 0.9 * self.avg_lag + 0.1 * self.last_lag if self.processed else self.last_lag
+            try:
+                await self.handler(item)
+            except Exception as e:
+                print(f"Pipeline error for client {self.client_id}: {e}")
+            self.processed += 1
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+        self.items.clear()
+        # Release a reader blocked by pushback
+        self.has_room.set()
+
+    def stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "queue_depth": len(self.items),
+            "max_depth": self.max_depth,
+            "queue_size": self.max_size,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "pushbacks": self.pushbacks,
+            "last_lag_ms": self.last_lag * 1000,
+            "avg_lag_ms": self.avg_lag * 1000,
+            "oldest_queued_ms": (time.monotonic() - self.items[0]["enqueued_at"]) * 1000 if self.items else 0.0
+        }
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional, Set
+
+# Where shared session state lives: unset for in-process memory (single
+# worker), or a redis:// URL so every worker and node sees every session
+SESSION_STORE_URL = os.environ.get("SESSION_STORE_URL", "")
+# Session metadata and insight snapshots expire this long after their last update
+SESSION_TTL_SECONDS = 24 * 3600
+# In-memory store bound, oldest sessions evicted first
+MAX_MEMORY_SESSIONS = 10000
+# Messages buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Identifies the process handling a session, e.g. in /call-insights
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+class SessionStore(ABC):
+    """
+    Session state shared between API workers
+    Holds session metadata (backend, status, owning worker), the latest insight
+    snapshot of each call, and a pub/sub channel per session for fanning
+    insights out to watchers connected to any worker
+    """
+
+    @abstractmethod
+    async def create_session(self, session_id: str, metadata: Dict):
+        ...
+
+    @abstractmethod
+    async def update_session(self, session_id: str, fields: Dict):
+        ...
+
+    @abstractmethod
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def save_insights(self, session_id: str, snapshot: Dict):
+        ...
+
+    @abstractmethod
+    async def load_insights(self, session_id: str) -> Optional[Dict]:
+        ...
+
+    @abstractmethod
+    async def publish(self, session_id: str, message: Dict):
+        ...
+
+    @abstractmethod
+    def subscribe(self, session_id: str) -> AsyncIterator[Dict]:
+        ...
+
+    async def close(self):
+        pass
+
+class MemorySessionStore(SessionStore):
+    """Single-process store; fine for one uvicorn worker and for tests"""
+
+    def __init__(self, ttl: float = SESSION_TTL_SECONDS, max_sessions: int = MAX_MEMORY_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        # session id -> (expires, metadata, insights)
+        self.sessions: "OrderedDict[str, list]" = OrderedDict()
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def _entry(self, session_id: str, create: bool = False) -> Optional[list]:
+        entry = self.sessions.get(session_id)
+        if entry is not None and entry[0] < time.time():
+            del self.sessions[session_id]
+            entry = None
+        if entry is None and create:
+            entry = self.sessions[session_id] = [0.0, {}, None]
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        if entry is not None:
+            entry[0] = time.time() + self.ttl
+            self.sessions.move_to_end(session_id)
+        return entry
+
+    async def create_session(self, session_id: str, metadata: Dict):
+        self._entry(session_id, create=True)[1] = dict(metadata)
+
+    async def update_session(self, session_id: str, fields: Dict):
+        self._entry(session_id, create=True)[1].update(fields)
+
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        entry = self._entry(session_id)
+        return dict(entry[1]) if entry else None
+
+    async def save_insights(self, session_id: str, snapshot: Dict):
+        self._entry(session_id, create=True)[2] = snapshot
+
+    async def load_insights(self, session_id: str) -> Optional[Dict]:
+        entry = self._entry(session_id)
+        return entry[2] if entry else None
+
+    async def publish(self, session_id: str, message: Dict):
+        for queue in self.subscribers.get(session_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def subscribe(self, session_id: str) -> AsyncIterator[Dict]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.setdefault(session_id, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers[session_id].discard(queue)
+            if not self.subscribers[session_id]:
+                del self.subscribers[session_id]
+
+class RedisSessionStore(SessionStore):
+    """
+    Store on any Redis-protocol server (Redis, Valkey, ElastiCache)
+    Metadata is a hash per session (one JSON value per field, so workers can
+    update fields independently), snapshots are plain keys, and fan-out uses
+    PUBLISH/SUBSCRIBE. Needs `pip install redis`; pass client= to use another
+    redis.asyncio-compatible client such as fakeredis in tests
+    """
+
+    def __init__(self, url: str = SESSION_STORE_URL, client=None, ttl: int = SESSION_TTL_SECONDS):
+        if client is None:
+            import redis.asyncio
+
+            client = redis.asyncio.from_url(url, decode_responses=True)
+        self.redis = client
+        self.ttl = ttl
+
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        return f"call-session:{session_id}"
+
+    @staticmethod
+    def _insights_key(session_id: str) -> str:
+        return f"call-insights:{session_id}"
+
+    @staticmethod
+    def _channel(session_id: str) -> str:
+        return f"call-insights-live:{session_id}"
+
+    async def create_session(self, session_id: str, metadata: Dict):
+        key = self._session_key(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.hset(key, mapping={field: json.dumps(value) for field, value in metadata.items()})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def update_session(self, session_id: str, fields: Dict):
+        key = self._session_key(session_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={field: json.dumps(value) for field, value in fields.items()})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        fields = await self.redis.hgetall(self._session_key(session_id))
+        return {field: json.loads(value) for field, value in fields.items()} if fields else None
+
+    async def save_insights(self, session_id: str, snapshot: Dict):
+        await self.redis.set(self._insights_key(session_id), json.dumps(snapshot), ex=self.ttl)
+
+    async def load_insights(self, session_id: str) -> Optional[Dict]:
+        value = await self.redis.get(self._insights_key(session_id))
+        return json.loads(value) if value else None
+
+    async def publish(self, session_id: str, message: Dict):
+        await self.redis.publish(self._channel(session_id), json.dumps(message))
+
+    async def subscribe(self, session_id: str) -> AsyncIterator[Dict]:
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(self._channel(session_id))
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+    async def close(self):
+        await self.redis.aclose()
+
+_store: Optional[SessionStore] = None
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        _store = RedisSessionStore(SESSION_STORE_URL) if SESSION_STORE_URL else MemorySessionStore()
+    return _store
+
+def set_session_store(store: SessionStore):
+    """Swap the process-wide store (tests, or wiring a preconfigured client)"""
+    global _store
+    _store = store
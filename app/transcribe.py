@@ -1,28 +1,238 @@
-import boto3
 import time
+import uuid
 import asyncio
+import weakref
+import json
+import urllib.request
+from typing import Dict, List, Optional
+from .media_format import media_format_from_key
+from .metrics import Gauge
+from .aws_scheduler import DeadlineExceeded, get_scheduler, request_priority
 
-async def start_transcription(client, audio_file_path):
-    job_name = f"transcription-{int(time.time())}"
-    try:
-        client.start_transcription_job(
+# Poll interval bounds for in-flight jobs
+MIN_POLL_SECONDS = 1.0
+MAX_POLL_SECONDS = 15.0
+POLL_BACKOFF = 1.5
+# Initial guess of job wall time per second of media; refined from finished jobs
+EXPECTED_SECONDS_PER_MEDIA_SECOND = 0.3
+# Fixed job overhead (queueing, model start) on top of the per-second cost
+EXPECTED_JOB_OVERHEAD_SECONDS = 8.0
+# Consecutive poll errors (e.g. throttling) before a job is given up on
+MAX_POLL_ERRORS = 5
+# Rough bytes per second of audio, to estimate duration from upload size
+FORMAT_BYTES_PER_SECOND = {
+    "mp3": 16000, "mp4": 16000, "m4a": 16000, "ogg": 8000, "webm": 4000,
+    "amr": 1600, "wav": 32000, "flac": 20000
+}
+
+def new_job_name(prefix: str = "transcription") -> str:
+    """Collision-free job name (Transcribe job names must be unique per account)"""
+    return f"{prefix}-{int(time.time())}-{uuid.uuid4().hex[:12]}"
+
+def estimate_media_seconds(size_bytes: int, media_format: Optional[str]) -> Optional[float]:
+    bytes_per_second = FORMAT_BYTES_PER_SECOND.get(media_format or "")
+    return size_bytes / bytes_per_second if bytes_per_second and size_bytes else None
+
+class TrackedJob:
+    __slots__ = ("name", "client", "future", "media_seconds", "submitted_at",
+                 "next_poll", "interval", "polls", "errors", "priority")
+
+    def __init__(self, name, client, future, media_seconds, first_poll):
+        self.name = name
+        # Polls keep the priority of the request that submitted the job
+        self.priority = request_priority.get()
+        self.client = client
+        self.future = future
+        self.media_seconds = media_seconds
+        self.submitted_at = time.monotonic()
+        self.next_poll = self.submitted_at + first_poll
+        self.interval = MIN_POLL_SECONDS
+        self.polls = 0
+        self.errors = 0
+
+class TranscriptionJobTracker:
+    """
+    Owns every in-flight Transcribe batch job of one event loop
+    A single poller task checks all jobs that are due, concurrently, and
+    resolves the future each caller awaits. The first poll is scheduled for
+    when a job of that media duration is expected to finish (learned from
+    completed jobs); after that the interval backs off up to MAX_POLL_SECONDS.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, TrackedJob] = {}
+        # Futures stay here until awaited, so wait() works after completion too
+        self.futures: Dict[str, asyncio.Future] = {}
+        self._wakeup = asyncio.Event()
+        self._poller: Optional[asyncio.Task] = None
+        self.seconds_per_media_second = EXPECTED_SECONDS_PER_MEDIA_SECOND
+        # Counters
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.polls = 0
+        self.completion_times: List[float] = []
+
+    def expected_duration(self, media_seconds: Optional[float]) -> float:
+        if not media_seconds:
+            return MIN_POLL_SECONDS
+        return EXPECTED_JOB_OVERHEAD_SECONDS + media_seconds * self.seconds_per_media_second
+
+    async def submit(self, client, media_uri: str, media_format: Optional[str] = None,
+                     media_seconds: Optional[float] = None, language_code: str = "en-IN",
+                     job_name: Optional[str] = None) -> str:
+        """Start a transcription job and track it; returns the job name"""
+        job_name = job_name or new_job_name()
+        # Detected from the upload when known, else from the extension;
+        # if neither works Transcribe identifies the format itself
+        media_format = media_format or media_format_from_key(media_uri)
+        job_args = {"MediaFormat": media_format} if media_format else {}
+        await get_scheduler().call(
+            "transcribe.start_transcription_job",
+            client.start_transcription_job,
             TranscriptionJobName=job_name,
-            LanguageCode="en-IN",
-            MediaFormat="mp3",  # Adjust based on your audio format
-            Media={"MediaFileUri": audio_file_path}  # Pass S3 URI directly
+            LanguageCode=language_code,
+            Media={"MediaFileUri": media_uri},  # Pass S3 URI directly
+            **job_args
         )
+        future = asyncio.get_running_loop().create_future()
+        self.futures[job_name] = future
+        self.jobs[job_name] = TrackedJob(job_name, client, future, media_seconds,
+                                         self.expected_duration(media_seconds))
+        self.submitted += 1
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_loop())
+        self._wakeup.set()
+        return job_name
+
+    async def wait(self, job_name: str) -> Dict:
+        """Wait for a tracked job; returns its TranscriptionJob description"""
+        future = self.futures.get(job_name)
+        if future is None:
+            raise KeyError(f"Unknown transcription job {job_name}")
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self.futures.pop(job_name, None)
 
-        # Poll for transcription completion
-        while True:
-            status = client.get_transcription_job(TranscriptionJobName=job_name)
-            if status["TranscriptionJob"]["TranscriptionJobStatus"] in ["COMPLETED", "FAILED"]:
-                break
-            await asyncio.sleep(5)
+    async def _poll_loop(self):
+        while self.jobs:
+            now = time.monotonic()
+            due = [job for job in self.jobs.values() if job.next_poll <= now]
+            if due:
+                await asyncio.gather(*(self._poll(job) for job in due))
+                continue
+            self._wakeup.clear()
+            delay = min(job.next_poll for job in self.jobs.values()) - now
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
 
-        if status["TranscriptionJob"]["TranscriptionJobStatus"] == "COMPLETED":
-            transcript = status["TranscriptionJob"]["Transcript"]["TranscriptFileUri"]
-            return {"Transcript": transcript, "JobName": job_name}
+    async def _poll(self, job: TrackedJob):
+        self.polls += 1
+        job.polls += 1
+        try:
+            # A poll still waiting for quota at the next poll time is stale
+            await get_scheduler().acquire("transcribe.get_transcription_job", *job.priority,
+                                          deadline_seconds=job.interval)
+        except DeadlineExceeded:
+            self._reschedule(job)
+            return
+        try:
+            response = await asyncio.to_thread(job.client.get_transcription_job,
+                                               TranscriptionJobName=job.name)
+        except Exception as e:
+            job.errors += 1
+            if job.errors >= MAX_POLL_ERRORS:
+                self._finish(job, error=e)
+            else:
+                self._reschedule(job)
+            return
+        job.errors = 0
+        status = response["TranscriptionJob"]
+        if status["TranscriptionJobStatus"] == "COMPLETED":
+            self._finish(job, result=status)
+        elif status["TranscriptionJobStatus"] == "FAILED":
+            self._finish(job, error=Exception(
+                f"Transcription job failed: {status.get('FailureReason', 'unknown reason')}"))
         else:
-            raise Exception("Transcription job failed")
+            self._reschedule(job)
+
+    def _reschedule(self, job: TrackedJob):
+        job.next_poll = time.monotonic() + job.interval
+        job.interval = min(job.interval * POLL_BACKOFF, MAX_POLL_SECONDS)
+
+    def _finish(self, job: TrackedJob, result: Optional[Dict] = None, error: Optional[Exception] = None):
+        self.jobs.pop(job.name, None)
+        elapsed = time.monotonic() - job.submitted_at
+        if error is not None:
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(error)
+            return
+        self.completed += 1
+        self.completion_times = (self.completion_times + [elapsed])[-100:]
+        if job.media_seconds:
+            # Learn how long jobs take per media second, for future first polls
+            observed = max(0.0, elapsed - EXPECTED_JOB_OVERHEAD_SECONDS) / job.media_seconds
+            self.seconds_per_media_second = 0.8 * self.seconds_per_media_second + 0.2 * observed
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        times = sorted(self.completion_times)
+        return {
+            "in_flight": len(self.jobs),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "polls": self.polls,
+            "seconds_per_media_second": round(self.seconds_per_media_second, 3),
+            "time_to_completion_p50": round(times[len(times) // 2], 2) if times else None,
+            "time_to_completion_max": round(times[-1], 2) if times else None,
+            "jobs": {
+                name: {"elapsed": round(now - job.submitted_at, 1), "polls": job.polls}
+                for name, job in self.jobs.items()
+            }
+        }
+
+# One tracker per event loop (the server loop, or Lambda's reused loop)
+_trackers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TranscriptionJobTracker]" = \
+    weakref.WeakKeyDictionary()
+
+def get_job_tracker() -> TranscriptionJobTracker:
+    loop = asyncio.get_running_loop()
+    tracker = _trackers.get(loop)
+    if tracker is None:
+        tracker = _trackers[loop] = TranscriptionJobTracker()
+    return tracker
+
+TRANSCRIPTION_JOBS = Gauge("call_insights_transcription_jobs_in_flight", "Batch Transcribe jobs being tracked",
+                           callback=lambda: sum(len(tracker.jobs) for tracker in list(_trackers.values())))
+
+def job_tracker_stats() -> Dict:
+    trackers = list(_trackers.values())
+    return trackers[0].stats() if len(trackers) == 1 else {
+        str(index): tracker.stats() for index, tracker in enumerate(trackers)
+    }
+
+async def start_transcription(client, audio_file_path, media_format=None, media_seconds=None):
+    try:
+        tracker = get_job_tracker()
+        job_name = await tracker.submit(client, audio_file_path, media_format=media_format,
+                                        media_seconds=media_seconds)
+        status = await tracker.wait(job_name)
+        transcript = status["Transcript"]["TranscriptFileUri"]
+        return {"Transcript": transcript, "JobName": job_name}
     except Exception as e:
-        raise Exception(f"Transcription error: {str(e)}") 
\ No newline at end of file
+        raise Exception(f"Transcription error: {str(e)}")
+
+def get_transcript_text(transcript_url):
+    # urllib rather than requests: one plain GET does not justify the extra
+    # import time on every Lambda cold start
+    with urllib.request.urlopen(transcript_url, timeout=30) as response:
+        data = json.load(response)
+    return data['results']['transcripts'][0]['transcript']
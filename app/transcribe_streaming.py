@@ -1,210 +1,570 @@
 import asyncio
-import boto3
+import importlib.util
 import json
-import websockets
+import os
+import threading
 import numpy as np
-from botocore.exceptions import ClientError
 import random
 import time
-import base64
-import subprocess
-import io
-import tempfile
-import os
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from .aws_clients import DEFAULT_REGION
+from .aws_scheduler import get_scheduler, scheduling, session_priority
+from .audio_decoder import PCM_SAMPLE_RATE, StreamingDecoder, get_session_decoder, close_session_decoder
+from .vad import get_session_vad, close_session_vad
+from .metrics import DROPS, STAGE_ERRORS, VAD_FRAMES, observe_stage, timed
+from .multichannel import split_channels
+
+# Seconds of speech each simulated session has heard since its last transcript
+speech_since_transcript: Dict[str, float] = {}
+# Longest stretch of continuous speech before a simulated transcript is emitted
+SIMULATED_UTTERANCE_SECONDS = 2.0
+# Encoded audio is simulated without decoding it, at most this often per session
+SIMULATED_ENCODED_SECONDS = 0.5
+# When each session last got a simulated transcript of encoded audio
+last_transcription_time: Dict[str, float] = {}
+
+SAMPLE_TRANSCRIPTIONS = {
+    "high": [
+        "I need help immediately with my order!",
+        "This is very urgent, please help me now!",
+        "I'm extremely frustrated with this service!",
+        "This is unacceptable, I want to speak to a manager!",
+        "I've been waiting for hours, this is ridiculous!",
+        "My order is completely wrong!",
+        "This is the worst customer service ever!",
+        "I demand to speak to someone right now!",
+        "This is absolutely ridiculous!",
+        "I'm never using this service again!"
+    ],
+    "medium": [
+        "Hello, I'm calling about my order.",
+        "I need help with my account.",
+        "There's an issue with my payment.",
+        "Can you help me with this problem?",
+        "I have a question about my service.",
+        "I'd like to check on my order status.",
+        "Can you tell me about my account?",
+        "I need to update my information.",
+        "What are my payment options?",
+        "How do I cancel my subscription?"
+    ],
+    "low": [
+        "Hello, how are you today?",
+        "I was wondering about my order.",
+        "Could you please help me?",
+        "I have a small question.",
+        "Thank you for your time.",
+        "Excuse me, I have a question.",
+        "I'm calling about my account.",
+        "Can you assist me please?",
+        "I need some information.",
+        "Thanks for your help."
+    ]
+}
+
+# Transcribe closes a stream after 4 hours; rotate a little before that
+MAX_STREAM_SECONDS = 4 * 3600 - 300
+# Transcribe drops streams that go ~15s without audio; close ours first
+STREAM_IDLE_SECONDS = 10
+# Backlog of PCM frames per session while a stream (re)connects, 10s of audio
+STREAM_QUEUE_FRAMES = 100
+# A stream (re)open still waiting for quota after this long is given up and
+# retried; the audio queued for it is being dropped by then anyway
+STREAM_OPEN_DEADLINE_SECONDS = STREAM_QUEUE_FRAMES * 0.1
+# Consecutive failed stream opens after which a session reports itself
+# failed (callers fall back to simulation), and how long until it retries
+MAX_OPEN_FAILURES = 3
+OPEN_RETRY_SECONDS = 30.0
+
+# Default streaming backend for sessions that don't pick one: "aws", "local"
+# (on-CPU recognizer), or "fake" to run offline
+TRANSCRIBE_STREAMING_BACKEND = os.environ.get("TRANSCRIBE_STREAMING_BACKEND", "aws")
+# Vosk model directory for the local backend, e.g. vosk-model-small-en-us-0.15
+LOCAL_ASR_MODEL_PATH = os.environ.get("LOCAL_ASR_MODEL_PATH", "models/vosk-model-small-en-us-0.15")
+
+class AWSTranscribeStream:
+    """One Amazon Transcribe streaming request (amazon-transcribe SDK)"""
+
+    client = None
+
+    def __init__(self, sample_rate: int = PCM_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.stream = None
+
+    async def open(self):
+        from amazon_transcribe.client import TranscribeStreamingClient
+
+        if AWSTranscribeStream.client is None:
+            AWSTranscribeStream.client = TranscribeStreamingClient(region=DEFAULT_REGION)
+        await get_scheduler().acquire("transcribe.start_stream_transcription")
+        self.stream = await AWSTranscribeStream.client.start_stream_transcription(
+            language_code="en-US",
+            media_sample_rate_hz=self.sample_rate,
+            media_encoding="pcm",
+            show_speaker_label=True,
+            enable_partial_results_stabilization=True,
+            partial_results_stability="high"
+        )
+        return self
+
+    async def send(self, pcm: bytes):
+        await self.stream.input_stream.send_audio_event(audio_chunk=bytes(pcm))
+
+    async def end(self):
+        await self.stream.input_stream.end_stream()
 
-# In-memory storage for audio chunks (in production, use Redis or similar)
-audio_chunks = {}
-# Track last transcription time to prevent spam
-last_transcription_time = {}
+    async def results(self) -> AsyncIterator[Tuple[str, bool]]:
+        from amazon_transcribe.model import TranscriptEvent
 
-async def start_streaming_transcription(client, session_id):
+        async for event in self.stream.output_stream:
+            if isinstance(event, TranscriptEvent):
+                for result in event.transcript.results:
+                    for alt in result.alternatives[:1]:
+                        yield alt.transcript, not result.is_partial
+
+class FakeTranscribeStream:
     """
-    Start real-time streaming transcription using AWS Transcribe
+    Local stand-in for a Transcribe stream, for offline tests and demos
+    Every sentence_seconds of audio becomes one sentence, revealed word by
+    word as partial results and then sent as a final result
     """
-    try:
-        # Create streaming transcription session
-        response = client.start_stream_transcription(
-            LanguageCode='en-US',
-            MediaEncoding='pcm',
-            MediaSampleRateHertz=16000,
-            AudioStream=create_audio_stream(session_id),
-            VocabularyName='CallInsightsVocabulary',  # Optional custom vocabulary
-            ShowSpeakerLabels=True,
-            MaxSpeakerLabels=2,  # For customer and agent
-            EnablePartialResultsStabilization=True,
-            PartialResultsStability='HIGH'
-        )
-        
-        # Process streaming results
-        async for event in response['TranscriptResultStream']:
-            if 'TranscriptEvent' in event:
-                transcript = event['TranscriptEvent']['Transcript']
-                
-                # Extract partial results
-                for result in transcript['Results']:
-                    if not result['IsPartial']:
-                        # Final result
-                        for alt in result['Alternatives']:
-                            yield alt['Transcript']
-                    else:
-                        # Partial result for real-time display
-                        for alt in result['Alternatives']:
-                            yield f"[PARTIAL] {alt['Transcript']}"
-                            
-    except ClientError as e:
-        print(f"Transcription error: {e}")
-        yield f"Error: {str(e)}"
-
-def create_audio_stream(session_id):
+
+    sentence_index = 0
+
+    def __init__(self, sample_rate: int = PCM_SAMPLE_RATE, sentence_seconds: float = 2.0,
+                 partial_seconds: float = 0.5):
+        self.bytes_per_second = sample_rate * 2
+        self.sentence_bytes = int(sentence_seconds * self.bytes_per_second)
+        self.partial_bytes = int(partial_seconds * self.bytes_per_second)
+        self.results_queue: asyncio.Queue = asyncio.Queue()
+        self.received = 0
+        self.sentence = self._next_sentence()
+
+    async def open(self):
+        return self
+
+    async def send(self, pcm: bytes):
+        before = self.received
+        self.received += len(pcm)
+        if before // self.partial_bytes == self.received // self.partial_bytes:
+            return
+        position = self.received % self.sentence_bytes
+        if self.received // self.sentence_bytes > before // self.sentence_bytes:
+            self.results_queue.put_nowait((self.sentence, True))
+            self.sentence = self._next_sentence()
+        elif position:
+            words = self.sentence.split()
+            shown = max(1, len(words) * position // self.sentence_bytes)
+            self.results_queue.put_nowait((" ".join(words[:shown]), False))
+
+    async def end(self):
+        if self.received % self.sentence_bytes >= self.partial_bytes:
+            self.results_queue.put_nowait((self.sentence, True))
+        self.results_queue.put_nowait(None)
+
+    async def results(self) -> AsyncIterator[Tuple[str, bool]]:
+        while True:
+            result = await self.results_queue.get()
+            if result is None:
+                return
+            yield result
+
+    def _next_sentence(self) -> str:
+        sentences = SAMPLE_TRANSCRIPTIONS["medium"]
+        sentence = sentences[FakeTranscribeStream.sentence_index % len(sentences)]
+        FakeTranscribeStream.sentence_index += 1
+        return sentence
+
+class LocalASRStream:
     """
-    Create a generator to stream audio data
-    This would be connected to your audio input source
+    On-CPU streaming recognizer (Vosk/Kaldi), no network round trip or per-minute cost
+    The small quantized English model (~40 MB) runs faster than real time on
+    one core. The model is loaded once per process and shared; each stream
+    gets its own recognizer, fed incrementally in a worker thread. Needs
+    `pip install vosk` and a model at LOCAL_ASR_MODEL_PATH
     """
-    # This is a placeholder - you'd connect this to your audio source
-    # For example: microphone, phone system, or call recording
-    async def audio_generator():
-        # In a real implementation, this would stream audio from:
-        # - Phone system integration
-        # - Microphone input
-        # - Call recording system
-        # - VoIP stream
-        pass
-    
-    return audio_generator()
+
+    model = None
+    model_lock = threading.Lock()
+
+    def __init__(self, sample_rate: int = PCM_SAMPLE_RATE, model_path: str = LOCAL_ASR_MODEL_PATH,
+                 partial_seconds: float = 0.5):
+        self.sample_rate = sample_rate
+        self.model_path = model_path
+        self.partial_bytes = int(partial_seconds * sample_rate * 2)
+        self.recognizer = None
+        self.results_queue: asyncio.Queue = asyncio.Queue()
+        self.since_partial = 0
+        self.last_partial = ""
+
+    @classmethod
+    def load_model(cls, model_path: str = LOCAL_ASR_MODEL_PATH):
+        with cls.model_lock:
+            if cls.model is None:
+                import vosk
+
+                vosk.SetLogLevel(-1)
+                cls.model = vosk.Model(model_path)
+        return cls.model
+
+    @staticmethod
+    def available(model_path: str = LOCAL_ASR_MODEL_PATH) -> bool:
+        return importlib.util.find_spec("vosk") is not None and os.path.isdir(model_path)
+
+    async def open(self):
+        import vosk
+
+        model = await asyncio.to_thread(self.load_model, self.model_path)
+        self.recognizer = vosk.KaldiRecognizer(model, self.sample_rate)
+        return self
+
+    async def send(self, pcm: bytes):
+        result = await asyncio.to_thread(self._accept, bytes(pcm))
+        if result is not None:
+            self.results_queue.put_nowait(result)
+
+    def _accept(self, pcm: bytes) -> Optional[Tuple[str, bool]]:
+        if self.recognizer.AcceptWaveform(pcm):
+            # Endpoint detected: the utterance is final
+            self.last_partial = ""
+            self.since_partial = 0
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            return (text, True) if text else None
+        self.since_partial += len(pcm)
+        if self.since_partial < self.partial_bytes:
+            return None
+        self.since_partial = 0
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        if not partial or partial == self.last_partial:
+            return None
+        self.last_partial = partial
+        return partial, False
+
+    async def end(self):
+        text = json.loads(await asyncio.to_thread(self.recognizer.FinalResult)).get("text", "")
+        if text:
+            self.results_queue.put_nowait((text, True))
+        self.results_queue.put_nowait(None)
+
+    async def results(self) -> AsyncIterator[Tuple[str, bool]]:
+        while True:
+            result = await self.results_queue.get()
+            if result is None:
+                return
+            yield result
+
+STREAM_BACKENDS = {
+    "aws": AWSTranscribeStream,
+    "local": LocalASRStream,
+    "fake": FakeTranscribeStream
+}
+# "simulation" is the process_audio_chunk path; the others stream PCM
+TRANSCRIPTION_BACKENDS = ("simulation",) + tuple(STREAM_BACKENDS)
+
+def backend_available(backend: str) -> bool:
+    if backend == "local":
+        return LocalASRStream.available()
+    return backend in TRANSCRIPTION_BACKENDS
+
+def available_backends() -> List[str]:
+    return [backend for backend in TRANSCRIPTION_BACKENDS if backend_available(backend)]
+
+async def open_transcribe_stream(backend: Optional[str] = None):
+    return await STREAM_BACKENDS[backend or TRANSCRIBE_STREAMING_BACKEND]().open()
+
+def validate_backend(backend: Optional[str] = None) -> str:
+    """Resolve a requested backend (default if None); raises ValueError if unusable"""
+    backend = backend or TRANSCRIBE_STREAMING_BACKEND
+    if not backend_available(backend):
+        raise ValueError(f"Transcription backend '{backend}' is not available "
+                         f"(available: {', '.join(available_backends())})")
+    return backend
+
+_TIMED_OUT = object()
+
+class TranscribeStreamSession:
+    """
+    Long-lived streaming transcription for one live call
+    PCM frames go through a bounded queue into a single Transcribe stream,
+    and partial and final results are passed to on_result(text, is_final)
+    as they arrive. The stream is opened when audio first arrives, closed
+    when the call goes quiet, and rotated before the service's duration
+    limit; audio queued during a reconnect is sent on the new stream.
+    After max_open_failures opens fail in a row, the queued audio is dropped
+    and the session is failed for retry_seconds: callers then fall back to
+    simulation, and the next audio after that tries a stream again.
+    """
+
+    def __init__(self, session_id: str, on_result: Callable[[str, bool], Awaitable[None]],
+                 open_stream: Callable[[], Awaitable[object]] = None,
+                 queue_frames: int = STREAM_QUEUE_FRAMES,
+                 max_stream_seconds: float = MAX_STREAM_SECONDS,
+                 idle_seconds: float = STREAM_IDLE_SECONDS,
+                 max_open_failures: int = MAX_OPEN_FAILURES,
+                 retry_seconds: float = OPEN_RETRY_SECONDS):
+        self.session_id = session_id
+        self.on_result = on_result
+        self.open_stream = open_stream or open_transcribe_stream
+        self.backend = TRANSCRIBE_STREAMING_BACKEND
+        self.max_stream_seconds = max_stream_seconds
+        self.idle_seconds = idle_seconds
+        self.max_open_failures = max_open_failures
+        self.retry_seconds = retry_seconds
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_frames)
+        self.closed = False
+        self.streams_opened = 0
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.errors = 0
+        self.open_failures = 0
+        self.failed_until = 0.0
+        self.last_error = ""
+        self.last_sent_at = 0.0
+        self._runner: Optional[asyncio.Task] = None
+        self._readers: set = set()
+
+    @property
+    def failed(self) -> bool:
+        """Streams could not be opened; audio should go elsewhere for now"""
+        return time.monotonic() < self.failed_until
+
+    def send_audio(self, pcm: bytes):
+        """Queue a PCM frame without blocking; the oldest frame is dropped when full"""
+        if self.closed:
+            return
+        self._put(pcm)
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._put(None)
+        if self._runner is not None:
+            await self._runner
+        if self._readers:
+            # Give in-flight streams a moment to deliver their last finals
+            await asyncio.wait(self._readers, timeout=5)
+        print(f"Closed transcription stream for session {self.session_id} "
+              f"({self.streams_opened} streams, {self.frames_sent} frames sent, "
+              f"{self.frames_dropped} dropped, {self.errors} errors)")
+
+    def _put(self, frame: Optional[bytes]):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.frames_dropped += 1
+            DROPS.inc("transcribe_queue")
+        self.queue.put_nowait(frame)
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        # Streams open lazily, so a call with no audio holds no connection
+        frame = await self.queue.get()
+        backoff = 0.5
+        while frame is not None:
+            try:
+                # Quota for (re)opening streams goes to the most urgent calls first
+                with scheduling(*session_priority(self.session_id),
+                                deadline_seconds=STREAM_OPEN_DEADLINE_SECONDS):
+                    stream = await self.open_stream()
+            except Exception as e:
+                self.errors += 1
+                self.open_failures += 1
+                self.last_error = str(e)
+                STAGE_ERRORS.inc("transcribe_open")
+                print(f"Could not open transcription stream for session {self.session_id}: {e}")
+                if self.closed:
+                    break
+                if self.open_failures >= self.max_open_failures:
+                    self.failed_until = time.monotonic() + self.retry_seconds
+                    frame = await self._drop_queued()
+                    backoff = 0.5
+                    continue
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10)
+                continue
+
+            self.streams_opened += 1
+            self.open_failures = 0
+            self.failed_until = 0.0
+            backoff = 0.5
+            reader = asyncio.create_task(self._read_results(stream))
+            self._readers.add(reader)
+            reader.add_done_callback(self._readers.discard)
+
+            deadline = loop.time() + self.max_stream_seconds
+            try:
+                while frame is not None:
+                    with timed("transcribe_send"):
+                        await stream.send(frame)
+                    self.frames_sent += 1
+                    self.last_sent_at = time.perf_counter()
+                    frame = None
+                    # Stop at the idle timeout or the rotation deadline; the
+                    # next frame then opens a fresh stream
+                    timeout = min(deadline - loop.time(), self.idle_seconds)
+                    if timeout <= 0:
+                        break
+                    frame = await self._next_frame(timeout)
+                    if frame is _TIMED_OUT:
+                        frame = None
+                        break
+                    if frame is None:
+                        self.closed = True
+            except Exception as e:
+                self.errors += 1
+                STAGE_ERRORS.inc("transcribe_stream")
+                frame = None
+                print(f"Transcription stream error for session {self.session_id}: {e}, reconnecting")
+            finally:
+                try:
+                    await stream.end()
+                except Exception:
+                    pass
+
+            if frame is None and not self.closed:
+                frame = await self.queue.get()
+
+    async def _drop_queued(self):
+        # The audio waiting for a stream is being handled by the fallback
+        # now; returns the next frame that arrives after it (None on close)
+        self.frames_dropped += 1
+        DROPS.inc("transcribe_open_failed")
+        while not self.queue.empty():
+            frame = self.queue.get_nowait()
+            if frame is None:
+                return None
+            self.frames_dropped += 1
+            DROPS.inc("transcribe_open_failed")
+        return await self.queue.get()
+
+    async def _next_frame(self, timeout: float):
+        # asyncio.wait rather than wait_for, which can hang a shutting-down
+        # loop when cancelled mid-get on Python 3.11
+        getter = asyncio.ensure_future(self.queue.get())
+        try:
+            done, _ = await asyncio.wait({getter}, timeout=timeout)
+        finally:
+            if not getter.done():
+                getter.cancel()
+        return getter.result() if done else _TIMED_OUT
+
+    async def _read_results(self, stream):
+        try:
+            async for text, is_final in stream.results():
+                if text:
+                    # Turnaround since the latest audio reached the stream
+                    observe_stage("transcribe_result", time.perf_counter() - self.last_sent_at)
+                    await self.on_result(text, is_final)
+        except Exception as e:
+            self.errors += 1
+            STAGE_ERRORS.inc("transcribe_results")
+            print(f"Transcription result error for session {self.session_id}: {e}")
+
+# Active streaming sessions by session id (one per WebSocket client)
+transcribe_sessions: Dict[str, TranscribeStreamSession] = {}
+# Tasks moving decoded PCM from each session's decoder into its stream,
+# with the decoder each one drains (a decoder's only consumer)
+decoder_pumps: Dict[str, Tuple[StreamingDecoder, asyncio.Task]] = {}
+
+def open_transcribe_session(session_id: str, on_result,
+                            backend: Optional[str] = None) -> TranscribeStreamSession:
+    """Open a session on its chosen backend ("simulation" never opens a stream)"""
+    backend = backend or TRANSCRIBE_STREAMING_BACKEND
+    session = TranscribeStreamSession(session_id, on_result,
+                                      open_stream=lambda: open_transcribe_stream(backend))
+    session.backend = backend
+    transcribe_sessions[session_id] = session
+    return session
+
+async def close_transcribe_session(session_id: str):
+    session = transcribe_sessions.pop(session_id, None)
+    _, pump = decoder_pumps.pop(session_id, (None, None))
+    await close_session_decoder(session_id)
+    if pump is not None:
+        await pump
+    if session is not None:
+        await session.close()
+    close_session_vad(session_id)
+    speech_since_transcript.pop(session_id, None)
+    last_transcription_time.pop(session_id, None)
+
+async def _pump_decoder(decoder, session: TranscribeStreamSession):
+    # Silence and steady background sound never reach (or bill) Transcribe
+    vad = get_session_vad(session.session_id)
+    async for frame in decoder.frames():
+        with timed("vad"):
+            speech = vad.contains_speech(frame)
+        VAD_FRAMES.inc("speech" if speech else "silence")
+        if speech:
+            session.send_audio(frame)
+
+def _send_channels(pcm, sessions: List[TranscribeStreamSession]):
+    # Each channel is VAD-gated on its own strided view; only its speech
+    # frames are copied out, to hand contiguous PCM to the stream
+    for session, samples in zip(sessions, split_channels(pcm, len(sessions))):
+        with timed("vad"):
+            speech = get_session_vad(session.session_id).contains_speech(samples)
+        VAD_FRAMES.inc("speech" if speech else "silence")
+        if speech:
+            session.send_audio(samples.tobytes())
+
+async def _pump_channels(decoder, sessions: List[TranscribeStreamSession]):
+    async for frame in decoder.frames():
+        _send_channels(frame, sessions)
 
 async def process_audio_chunk(audio_data, session_id, is_pcm=False):
     """
     Process individual audio chunks for real-time transcription
-    If is_pcm is True, treat audio_data as PCM; otherwise, convert from WebM/Opus
+    If is_pcm is True, treat audio_data as 16 kHz PCM (bytes or an int16
+    array, e.g. one channel's view): the session's VAD decides what is
+    speech, and a transcript is produced when an utterance ends, or every
+    SIMULATED_UTTERANCE_SECONDS of continuous speech. WebM/Opus is not
+    decoded for simulation (no ffmpeg, and the session's decoder is left
+    to its streaming pump); see simulate_encoded
     """
     try:
-        current_time = time.time()
-        if session_id in last_transcription_time:
-            if current_time - last_transcription_time[session_id] < 0.5:  # Reduced to 0.5 seconds
-                return ""
-        await asyncio.sleep(0.1)  # Reduced delay
-        if len(audio_data) > 50:  # Reduced threshold
-            transcript = simulate_transcription(audio_data)
-            if transcript:
-                last_transcription_time[session_id] = current_time
-            return transcript
+        if not is_pcm:
+            return simulate_encoded(audio_data, session_id)
+        pcm = audio_data if isinstance(audio_data, np.ndarray) else bytes(audio_data)
+        if not len(pcm):
+            return ""
+
+        vad = get_session_vad(session_id)
+        with timed("vad"):
+            speech = vad.process(pcm)
+        if not len(speech):
+            return ""
+        heard = speech_since_transcript.get(session_id, 0.0) + speech.sum() * vad.frame_seconds
+        if heard and (not vad.in_speech or heard >= SIMULATED_UTTERANCE_SECONDS):
+            speech_since_transcript[session_id] = 0.0
+            samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype="<i2")
+            samples = samples[:len(speech) * vad.frame_samples]
+            frames = samples.reshape(len(speech), vad.frame_samples)
+            with timed("simulate"):
+                return simulate_transcription(frames[speech] if speech.any() else frames)
+        speech_since_transcript[session_id] = heard
         return ""
     except Exception as e:
         print(f"Error processing audio chunk: {e}")
         return ""
 
-def convert_webm_to_pcm(webm_bytes):
-    """
-    Convert WebM/Opus audio bytes to PCM 16kHz mono using ffmpeg subprocess
-    Returns raw PCM bytes
-    """
-    try:
-        print(f"Converting {len(webm_bytes)} bytes of WebM audio to PCM...")
-        
-        # Check if the data looks like a valid WebM file
-        if len(webm_bytes) < 4 or webm_bytes[:4] != b'\x1a\x45\xdf\xa3':
-            print("Warning: Data doesn't look like a valid WebM file")
-            # Try to create a proper WebM container
-            webm_bytes = create_webm_container(webm_bytes)
-        
-        # Create temporary files for input and output
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as input_file:
-            input_file.write(webm_bytes)
-            input_path = input_file.name
-        
-        with tempfile.NamedTemporaryFile(suffix='.pcm', delete=False) as output_file:
-            output_path = output_file.name
-        
-        # Use ffmpeg to convert WebM to PCM
-        cmd = [
-            'ffmpeg',
-            '-i', input_path,
-            '-f', 's16le',  # 16-bit little-endian
-            '-ar', '16000',  # 16kHz sample rate
-            '-ac', '1',      # mono
-            '-y',            # overwrite output
-            output_path
-        ]
-        
-        print(f"Running ffmpeg command: {' '.join(cmd)}")
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            print(f"FFmpeg error: {result.stderr}")
-            # Try alternative approach - treat as raw audio
-            return convert_raw_audio_to_pcm(webm_bytes)
-        
-        # Read the PCM data
-        with open(output_path, 'rb') as f:
-            pcm_data = f.read()
-        
-        print(f"Successfully converted to {len(pcm_data)} bytes of PCM audio")
-        
-        # Clean up temporary files
-        os.unlink(input_path)
-        os.unlink(output_path)
-        
-        return pcm_data
-        
-    except Exception as e:
-        print(f"Audio conversion error: {e}")
-        return b""
-
-def create_webm_container(audio_data):
+def simulate_encoded(audio_data, session_id) -> str:
     """
-    Create a minimal WebM container for audio data
+    Simulated transcript for a chunk of encoded audio, at most every
+    SIMULATED_ENCODED_SECONDS per session
+    The loudness of encoded bytes is unknown, so transcripts are drawn
+    from the medium level
     """
-    # This is a simplified WebM container structure
-    # In production, you'd use a proper WebM library
-    webm_header = b'\x1a\x45\xdf\xa3'  # EBML header
-    webm_data = webm_header + audio_data
-    return webm_data
-
-def convert_raw_audio_to_pcm(audio_data):
-    """
-    Fallback: Convert raw audio data to PCM
-    """
-    try:
-        print("Attempting raw audio conversion...")
-        
-        # Create temporary files
-        with tempfile.NamedTemporaryFile(suffix='.raw', delete=False) as input_file:
-            input_file.write(audio_data)
-            input_path = input_file.name
-        
-        with tempfile.NamedTemporaryFile(suffix='.pcm', delete=False) as output_file:
-            output_path = output_file.name
-        
-        # Try to convert as raw audio
-        cmd = [
-            'ffmpeg',
-            '-f', 'webm',  # Try webm format
-            '-i', input_path,
-            '-f', 's16le',
-            '-ar', '16000',
-            '-ac', '1',
-            '-y',
-            output_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            with open(output_path, 'rb') as f:
-                pcm_data = f.read()
-            
-            os.unlink(input_path)
-            os.unlink(output_path)
-            return pcm_data
-        
-        # If that fails, return empty
-        os.unlink(input_path)
-        os.unlink(output_path)
-        return b""
-        
-    except Exception as e:
-        print(f"Raw audio conversion error: {e}")
-        return b""
+    now = time.monotonic()
+    last = last_transcription_time.get(session_id)
+    if last is not None and now - last < SIMULATED_ENCODED_SECONDS:
+        return ""
+    if len(audio_data) <= 50 or random.random() < 0.4:
+        return ""
+    last_transcription_time[session_id] = now
+    return random.choice(SAMPLE_TRANSCRIPTIONS["medium"])
 
 def simulate_transcription(audio_data):
     """
@@ -217,52 +577,22 @@ def simulate_transcription(audio_data):
     # 2. Send to AWS Transcribe streaming API
     # 3. Receive and return the transcription
     
-    # For demo purposes, return a sample transcription based on audio intensity
-    audio_intensity = np.mean(audio_data) if len(audio_data) > 0 else 0
+    # For demo purposes, return a sample transcription based on speech loudness
+    # (RMS level of the PCM speech frames, in dBFS)
+    samples = np.asarray(audio_data, dtype=np.float32)
+    rms = np.sqrt(np.mean(samples * samples)) if samples.size else 0.0
+    audio_intensity = 20 * np.log10(rms / 32768.0 + 1e-10)
     
     # More varied and realistic transcriptions
-    if audio_intensity > 150:
+    if audio_intensity > -15:
         # High intensity - customer might be urgent
-        sample_transcriptions = [
-            "I need help immediately with my order!",
-            "This is very urgent, please help me now!",
-            "I'm extremely frustrated with this service!",
-            "This is unacceptable, I want to speak to a manager!",
-            "I've been waiting for hours, this is ridiculous!",
-            "My order is completely wrong!",
-            "This is the worst customer service ever!",
-            "I demand to speak to someone right now!",
-            "This is absolutely ridiculous!",
-            "I'm never using this service again!"
-        ]
-    elif audio_intensity > 100:
+        sample_transcriptions = SAMPLE_TRANSCRIPTIONS["high"]
+    elif audio_intensity > -30:
         # Medium intensity - normal conversation
-        sample_transcriptions = [
-            "Hello, I'm calling about my order.",
-            "I need help with my account.",
-            "There's an issue with my payment.",
-            "Can you help me with this problem?",
-            "I have a question about my service.",
-            "I'd like to check on my order status.",
-            "Can you tell me about my account?",
-            "I need to update my information.",
-            "What are my payment options?",
-            "How do I cancel my subscription?"
-        ]
+        sample_transcriptions = SAMPLE_TRANSCRIPTIONS["medium"]
     else:
         # Low intensity - quiet speech
-        sample_transcriptions = [
-            "Hello, how are you today?",
-            "I was wondering about my order.",
-            "Could you please help me?",
-            "I have a small question.",
-            "Thank you for your time.",
-            "Excuse me, I have a question.",
-            "I'm calling about my account.",
-            "Can you assist me please?",
-            "I need some information.",
-            "Thanks for your help."
-        ]
+        sample_transcriptions = SAMPLE_TRANSCRIPTIONS["low"]
     
     # Add some randomness to make it more realistic
     if random.random() < 0.4:  # 40% chance to return empty
@@ -270,41 +600,47 @@ def simulate_transcription(audio_data):
     
     return random.choice(sample_transcriptions)
 
-async def start_real_transcription(audio_data, session_id):
+async def start_real_transcription(audio_data, session_id, is_pcm=False):
     """
     Start real AWS Transcribe streaming
-    Accepts WebM bytes, converts to PCM, streams to AWS
+    Feeds WebM bytes to the session's ffmpeg decoder, whose PCM flows into the
+    session's long-lived Transcribe stream (16 kHz PCM with is_pcm goes there
+    directly). Transcripts are delivered through the session's on_result
+    callback as they arrive.
+    Returns False if the session has no streaming transcription, or its
+    streams keep failing to open
     """
-    try:
-        # audio_data is already bytes from WebM blob
-        webm_bytes = audio_data
-        pcm_bytes = convert_webm_to_pcm(webm_bytes)
-        if not pcm_bytes:
-            return ""
-        # AWS Transcribe streaming expects a generator yielding PCM chunks
-        def pcm_stream():
-            chunk_size = 3200  # 100ms of 16kHz 16-bit mono
-            for i in range(0, len(pcm_bytes), chunk_size):
-                yield pcm_bytes[i:i+chunk_size]
-        transcribe_client = boto3.client('transcribe', region_name='ap-south-1')
-        response = transcribe_client.start_stream_transcription(
-            LanguageCode='en-US',
-            MediaEncoding='pcm',
-            MediaSampleRateHertz=16000,
-            AudioStream=pcm_stream(),
-            ShowSpeakerLabels=True,
-            MaxSpeakerLabels=2,
-            EnablePartialResultsStabilization=True,
-            PartialResultsStability='HIGH'
-        )
-        for event in response['TranscriptResultStream']:
-            if 'TranscriptEvent' in event:
-                transcript = event['TranscriptEvent']['Transcript']
-                for result in transcript['Results']:
-                    if not result['IsPartial']:
-                        for alt in result['Alternatives']:
-                            return alt['Transcript']
-        return ""
-    except Exception as e:
-        print(f"Real transcription error: {e}")
-        return "" 
\ No newline at end of file
+    session = transcribe_sessions.get(session_id)
+    if session is None or session.backend == "simulation" or session.failed:
+        return False
+    if is_pcm:
+        _send_channels(audio_data, [session])
+        return True
+    decoder = get_session_decoder(session_id)
+    with timed("decode"):
+        await decoder.feed(audio_data)
+    if decoder_pumps.get(session_id, (None,))[0] is not decoder:
+        # A replaced decoder's pump ends once it has flushed
+        decoder_pumps[session_id] = (decoder, asyncio.create_task(_pump_decoder(decoder, session)))
+    return True
+
+async def start_multichannel_transcription(audio_data, session_id: str, channel_keys: List[str],
+                                           is_pcm: bool = False) -> bool:
+    """
+    Stream each channel of interleaved audio to its own transcription session
+    channel_keys are the per-channel session ids, in channel order, opened
+    with open_transcribe_session. Returns False if any has no streaming
+    backend or is failing to open streams
+    """
+    sessions = [transcribe_sessions.get(key) for key in channel_keys]
+    if any(session is None or session.backend == "simulation" or session.failed for session in sessions):
+        return False
+    if is_pcm:
+        _send_channels(audio_data, sessions)
+        return True
+    decoder = get_session_decoder(session_id, channels=len(sessions))
+    with timed("decode"):
+        await decoder.feed(audio_data)
+    if decoder_pumps.get(session_id, (None,))[0] is not decoder:
+        decoder_pumps[session_id] = (decoder, asyncio.create_task(_pump_channels(decoder, sessions)))
+    return True
@@ -0,0 +1,103 @@
+from typing import Dict, List
+
+# Words ending a sentence (trailing quotes/brackets are ignored)
+SENTENCE_END = (".", "!", "?")
+# Commit a stable run of unpunctuated words once it reaches this length, so
+# recognizers without punctuation (e.g. browser speech recognition) still
+# yield insights before the utterance ends
+MAX_PENDING_WORDS = 25
+MAX_RETAINED_SESSIONS = 1000
+
+def _ends_sentence(word: str) -> bool:
+    return word.rstrip("\"')]").endswith(SENTENCE_END)
+
+class TranscriptAssembler:
+    """
+    Turns a stream of partial/final hypotheses into finalized sentences
+    Streaming recognizers resend the whole current utterance on every partial
+    and may still revise its tail. A word is stable once two consecutive
+    hypotheses agree on it; a sentence is finalized when its closing word and
+    the word after it are stable, or when the utterance ends. Each finalized
+    sentence is handed out exactly once, so analysis never repeats words.
+    """
+
+    def __init__(self, max_pending_words: int = MAX_PENDING_WORDS):
+        self.max_pending_words = max_pending_words
+        # Words of the current utterance already finalized
+        self.committed = 0
+        self.previous: List[str] = []
+        # Counters
+        self.hypotheses = 0
+        self.words_seen = 0
+        self.words_finalized = 0
+        self.sentences = 0
+
+    def feed(self, text: str, is_final: bool) -> List[str]:
+        """Take the latest hypothesis; returns sentences finalized by it"""
+        words = text.split()
+        self.hypotheses += 1
+        self.words_seen += len(words)
+        if is_final:
+            finalized = self._split(words[self.committed:])
+            self.committed = 0
+            self.previous = []
+        else:
+            stable = 0
+            for current, previous in zip(words, self.previous):
+                if current != previous:
+                    break
+                stable += 1
+            self.previous = words
+            # If the recognizer revised words that were already finalized
+            # (stable < committed), nothing is re-emitted
+            end = self.committed
+            for index in range(self.committed, stable - 1):
+                if _ends_sentence(words[index]):
+                    end = index + 1
+            if end == self.committed and stable - self.committed >= self.max_pending_words:
+                end = stable
+            finalized = self._split(words[self.committed:end])
+            self.committed = max(self.committed, end)
+        self.sentences += len(finalized)
+        self.words_finalized += sum(len(sentence.split()) for sentence in finalized)
+        return finalized
+
+    def tail(self, text: str) -> str:
+        """The still-revisable part of a partial hypothesis"""
+        return " ".join(text.split()[self.committed:])
+
+    @staticmethod
+    def _split(words: List[str]) -> List[str]:
+        sentences, start = [], 0
+        for index, word in enumerate(words):
+            if _ends_sentence(word):
+                sentences.append(" ".join(words[start:index + 1]))
+                start = index + 1
+        if start < len(words):
+            sentences.append(" ".join(words[start:]))
+        return sentences
+
+    def stats(self) -> Dict:
+        return {
+            "hypotheses": self.hypotheses,
+            "sentences_finalized": self.sentences,
+            "words_seen": self.words_seen,
+            "words_finalized": self.words_finalized,
+            # Words that would have been analyzed per word actually analyzed
+            "analysis_reduction": round(self.words_seen / self.words_finalized, 2)
+            if self.words_finalized else None
+        }
+
+# Assemblers of live sessions
+session_assemblers: Dict[str, TranscriptAssembler] = {}
+
+def get_session_assembler(session_id: str) -> TranscriptAssembler:
+    assembler = session_assemblers.get(session_id)
+    if assembler is None:
+        while len(session_assemblers) >= MAX_RETAINED_SESSIONS:
+            session_assemblers.pop(next(iter(session_assemblers)))
+        assembler = session_assemblers[session_id] = TranscriptAssembler()
+    return assembler
+
+def close_session_assembler(session_id: str):
+    session_assemblers.pop(session_id, None)
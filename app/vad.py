@@ -0,0 +1,125 @@
+from typing import Dict
+
+import numpy as np
+
+from .audio_decoder import PCM_SAMPLE_RATE
+
+# 20 ms analysis frames, the usual VAD granularity
+VAD_FRAME_MS = 20
+# Frames must be this far above the noise floor to count as speech
+VAD_ENERGY_MARGIN_DB = 12.0
+# ...and never quieter than this, whatever the floor
+VAD_MIN_ENERGY_DB = -50.0
+# Zero-crossing rate (crossings per sample) above which a frame is hiss/noise
+VAD_MAX_ZCR = 0.35
+# Keep passing audio this long after the last speech frame (word endings, pauses)
+VAD_HANGOVER_MS = 300
+# How fast the noise floor creeps up under steady sound such as hold music
+VAD_FLOOR_RISE_DB_PER_S = 0.5
+
+class VoiceActivityDetector:
+    """
+    Vectorized energy/zero-crossing voice activity detector for 16-bit PCM
+    Each call classifies every complete 20 ms frame at once: a frame is speech
+    when its energy clears an adaptive noise floor and its zero-crossing rate
+    is below the noise range. Hangover keeps short gaps inside an utterance
+    open. State (leftover samples, floor, hangover) carries across calls, so
+    audio can arrive in chunks of any size.
+    """
+
+    def __init__(self, sample_rate: int = PCM_SAMPLE_RATE, frame_ms: int = VAD_FRAME_MS,
+                 energy_margin_db: float = VAD_ENERGY_MARGIN_DB,
+                 min_energy_db: float = VAD_MIN_ENERGY_DB, max_zcr: float = VAD_MAX_ZCR,
+                 hangover_ms: int = VAD_HANGOVER_MS,
+                 floor_rise_db_per_s: float = VAD_FLOOR_RISE_DB_PER_S):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_seconds = self.frame_samples / sample_rate
+        self.energy_margin_db = energy_margin_db
+        self.min_energy_db = min_energy_db
+        self.max_zcr = max_zcr
+        self.hangover_frames = hangover_ms // frame_ms
+        self.floor_rise_per_frame = floor_rise_db_per_s * self.frame_seconds
+        self.noise_floor_db = -90.0
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._last_speech = -self.hangover_frames - 1
+        self.in_speech = False
+        # Counters
+        self.frames = 0
+        self.speech_frames = 0
+        self.segments = 0
+
+    def process(self, pcm) -> np.ndarray:
+        """
+        Classify s16le PCM; returns one bool per complete frame
+        Takes bytes-like PCM or an int16 array, including a strided view of
+        one channel of interleaved audio (framed without copying)
+        """
+        samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype="<i2")
+        if len(self._pending):
+            samples = np.concatenate((self._pending, samples))
+        n = len(samples) // self.frame_samples
+        self._pending = samples[n * self.frame_samples:].copy()
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+
+        frames = samples[:n * self.frame_samples].reshape(n, self.frame_samples)
+        as_float = frames.astype(np.float32)
+        power = np.einsum("ij,ij->i", as_float, as_float) / (self.frame_samples * 32768.0 ** 2)
+        energy_db = 10.0 * np.log10(power + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (self.frame_samples - 1)
+
+        # Minimum-tracking noise floor: falls immediately, rises slowly
+        self.noise_floor_db = min(self.noise_floor_db + self.floor_rise_per_frame * n,
+                                  float(energy_db.min()))
+        threshold = max(self.noise_floor_db + self.energy_margin_db, self.min_energy_db)
+        raw = (energy_db > threshold) & (zcr < self.max_zcr)
+
+        # Hangover: a frame is speech if a raw speech frame occurred within
+        # hangover_frames before it (carried over from previous calls)
+        index = np.arange(self.frames, self.frames + n)
+        last_speech = np.maximum.accumulate(np.where(raw, index, self._last_speech))
+        speech = index - last_speech <= self.hangover_frames
+        self._last_speech = int(last_speech[-1])
+
+        previous = np.empty(n, dtype=bool)
+        previous[0] = self.in_speech
+        previous[1:] = speech[:-1]
+        self.segments += int(np.count_nonzero(speech & ~previous))
+        self.in_speech = bool(speech[-1])
+        self.frames += n
+        self.speech_frames += int(np.count_nonzero(speech))
+        return speech
+
+    def contains_speech(self, pcm) -> bool:
+        return bool(self.process(pcm).any())
+
+    @property
+    def speech_ratio(self) -> float:
+        return self.speech_frames / self.frames if self.frames else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "audio_seconds": round(self.frames * self.frame_seconds, 2),
+            "speech_seconds": round(self.speech_frames * self.frame_seconds, 2),
+            "speech_ratio": round(self.speech_ratio, 3),
+            "silence_ratio": round(1.0 - self.speech_ratio, 3) if self.frames else 0.0,
+            "speech_segments": self.segments,
+            "noise_floor_db": round(self.noise_floor_db, 1)
+        }
+
+# One detector per live call
+session_vads: Dict[str, VoiceActivityDetector] = {}
+
+def get_session_vad(session_id: str) -> VoiceActivityDetector:
+    vad = session_vads.get(session_id)
+    if vad is None:
+        vad = session_vads[session_id] = VoiceActivityDetector()
+    return vad
+
+def close_session_vad(session_id: str):
+    session_vads.pop(session_id, None)
+
+def vad_report() -> Dict:
+    return {session_id: vad.stats() for session_id, vad in session_vads.items()}
@@ -1,152 +1,697 @@
 import asyncio
 import json
-import boto3
-import numpy as np
 from fastapi import WebSocket, WebSocketDisconnect
-from .transcribe_streaming import start_streaming_transcription, process_audio_chunk, start_real_transcription
-from .comprehend import analyze_text_chunk
+from .transcribe_streaming import (
+    process_audio_chunk, start_real_transcription, open_transcribe_session, close_transcribe_session,
+    backend_available, start_multichannel_transcription
+)
+from .audio_decoder import PCM_FRAME_BYTES, PCM_SAMPLE_RATE, pcm_listeners
+from .comprehend import analyze_text_chunk, speculative_insights
+from .audio_protocol import CODEC_NAMES, parse_frame
+from .multichannel import (
+    MAX_CHANNELS, SOURCE_CHANNELS, SPEAKERS, channel_key, downmix, parse_speakers, speaker_name,
+    split_channels
+)
+from .ring_buffer import AudioRingBuffer
+from .jitter_buffer import JITTER_TARGET_SECONDS, FrameRepacketizer, JitterBuffer
+from .audio_ingest import PCM_CODECS, RAW_CODECS, AudioIngest, negotiation, validate_audio_config
+from .session_pipeline import SessionPipeline, run_blocking
+from .call_insights import get_call_insights, get_or_create_call_insights, record_insights
+from .session_store import WORKER_ID, get_session_store
+from .transcript_assembler import close_session_assembler, get_session_assembler
+from .outbound import OUTBOUND_COALESCE_SECONDS, OutboundScheduler, encode_json
+from .metrics import (
+    AUDIO_BYTES, AUDIO_CHUNKS, DROPS, SIMULATION_FALLBACKS, TRANSCRIPTS, Gauge, current_trace,
+    observe_stage, timed
+)
 import uuid
 import base64
+import time
+from contextlib import suppress
+
+# Minimum seconds between insight snapshots written to the session store
+INSIGHTS_PERSIST_SECONDS = 1.0
+# Where hypotheses come from: client-side recognition (transcript_data) or
+# the session's streaming transcription
+HYPOTHESIS_SOURCES = ("client", "stream")
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: dict = {}
-        self.transcribe_clients: dict = {}
+        self.transcribe_sessions: dict = {}
         self.audio_buffers: dict = {}
+        self.pipelines: dict = {}
+        self.outbound: dict = {}
+        # Sessions whose responses carry a per-stage timing trace
+        self.traced_sessions: set = set()
+        self.last_persisted: dict = {}
+        # Pending speculative partial results, superseded by the next hypothesis
+        self.speculations: dict = {}
+        # Speaker of each audio channel, and the channels heard so far
+        self.session_speakers: dict = {}
+        self.channel_speakers: dict = {}
+        # Per session: jitter target, and per audio stream (None for the
+        # mixed/interleaved stream, else the dual-stream source channel) its
+        # jitter buffer, last released item and PCM repacketizer
+        self.jitter_targets: dict = {}
+        self.jitter_buffers: dict = {}
+        self.jitter_flushers: dict = {}
+        self.jitter_locks: dict = {}
+        self.last_audio: dict = {}
+        self.repacketizers: dict = {}
+        # Per session: the negotiated format of JSON audio_data, and per
+        # audio stream the in-process converter of raw PCM/Opus
+        self.audio_configs: dict = {}
+        self.ingests: dict = {}
         
-    async def connect(self, websocket: WebSocket, client_id: str):
+    async def connect(self, websocket: WebSocket, client_id: str, trace: bool = False,
+                      backend: str = None, coalesce_window: float = OUTBOUND_COALESCE_SECONDS,
+                      delta: bool = True, speakers=SPEAKERS, jitter_target: float = JITTER_TARGET_SECONDS):
         await websocket.accept()
         self.active_connections[client_id] = websocket
-        self.transcribe_clients[client_id] = boto3.client("transcribe", region_name="ap-south-1")
-        self.audio_buffers[client_id] = []
+        self.outbound[client_id] = OutboundScheduler(
+            websocket, lambda e: self._send_failed(client_id, e), window=coalesce_window, delta=delta
+        )
+        self.outbound[client_id].start()
+        if trace:
+            self.traced_sessions.add(client_id)
+        self.session_speakers[client_id] = speakers
+        self.jitter_targets[client_id] = jitter_target
+        self.jitter_buffers[client_id] = {}
+        self.jitter_locks[client_id] = asyncio.Lock()
+        self.last_audio[client_id] = {}
+        self.repacketizers[client_id] = {}
+        self.ingests[client_id] = {}
+        # The session may have been created by /start-live-call/ on another worker
+        metadata = await self._store_call("get_session", client_id) or {}
+        backend = backend or metadata.get("backend")
+        if metadata.get("audio"):
+            self.audio_configs[client_id] = metadata["audio"]
+        if backend and not backend_available(backend):
+            print(f"Transcription backend {backend} unavailable for client {client_id}, using default")
+            backend = None
+        self.transcribe_sessions[client_id] = open_transcribe_session(
+            client_id, lambda text, is_final: self.send_transcript(text, is_final, client_id),
+            backend=backend
+        )
+        await self._store_call("update_session", client_id, {
+            "status": "active",
+            "worker": WORKER_ID,
+            "backend": self.transcribe_sessions[client_id].backend,
+            "connected_at": time.time()
+        })
+        self.audio_history(client_id)
+        self.pipelines[client_id] = SessionPipeline(
+            client_id,
+            lambda item: process_message(client_id, item),
+            on_pushback=lambda active, depth: self.send_personal_message({
+                "type": "backpressure",
+                "active": active,
+                "queue_depth": depth
+            }, client_id)
+        )
+        self.pipelines[client_id].start()
+        get_or_create_call_insights(client_id)
         print(f"Client {client_id} connected")
         
     def disconnect(self, client_id: str):
         if client_id in self.active_connections:
             del self.active_connections[client_id]
-        if client_id in self.transcribe_clients:
-            del self.transcribe_clients[client_id]
-        if client_id in self.audio_buffers:
-            del self.audio_buffers[client_id]
+        if client_id in self.outbound:
+            self.outbound.pop(client_id).close()
+        self.traced_sessions.discard(client_id)
+        self.session_speakers.pop(client_id, None)
+        self.jitter_targets.pop(client_id, None)
+        for stream in self.jitter_buffers.pop(client_id, {}):
+            flusher = self.jitter_flushers.pop((client_id, stream), None)
+            if flusher is not None:
+                flusher.cancel()
+        self.jitter_locks.pop(client_id, None)
+        self.last_audio.pop(client_id, None)
+        self.repacketizers.pop(client_id, None)
+        self.audio_configs.pop(client_id, None)
+        self.ingests.pop(client_id, None)
+        for speaker in self.channel_speakers.pop(client_id, ()):
+            key = channel_key(client_id, speaker)
+            self.transcribe_sessions.pop(key, None)
+            self.audio_buffers.pop(key, None)
+            pcm_listeners.pop(key, None)
+            self._close_hypotheses(key)
+            asyncio.get_event_loop().create_task(close_transcribe_session(key))
+        if client_id in self.transcribe_sessions:
+            del self.transcribe_sessions[client_id]
+            # Stop the session's stream and decoder without blocking the caller
+            asyncio.get_event_loop().create_task(close_transcribe_session(client_id))
+        self.audio_buffers.pop(client_id, None)
+        pcm_listeners.pop(client_id, None)
+        if client_id in self.pipelines:
+            self.pipelines.pop(client_id).close()
+            get_or_create_call_insights(client_id).end()
+            self._close_hypotheses(client_id)
+            asyncio.get_event_loop().create_task(self._end_session(client_id))
         print(f"Client {client_id} disconnected")
+
+    async def _store_call(self, method: str, client_id: str, *args):
+        # The store is shared state, not the call itself: an outage is logged
+        # and the live session carries on
+        try:
+            return await getattr(get_session_store(), method)(client_id, *args)
+        except Exception as e:
+            print(f"Session store {method} failed for client {client_id}: {e}")
+            return None
+
+    async def _end_session(self, client_id: str):
+        self.last_persisted.pop(client_id, None)
+        aggregate = get_call_insights(client_id)
+        if aggregate is not None:
+            await self._store_call("save_insights", client_id, aggregate.snapshot())
+        await self._store_call("update_session", client_id, {"status": "ended", "ended_at": time.time()})
+
+    async def publish_insights(self, client_id: str, message: dict):
+        """Fan a result out to watchers on any worker and keep the shared snapshot fresh"""
+        await self._store_call("publish", client_id, message)
+        aggregate = get_call_insights(client_id)
+        now = time.monotonic()
+        if aggregate is not None and now - self.last_persisted.get(client_id, 0.0) >= INSIGHTS_PERSIST_SECONDS:
+            self.last_persisted[client_id] = now
+            await self._store_call("save_insights", client_id, aggregate.snapshot())
+
+    def audio_history(self, key: str) -> AudioRingBuffer:
+        """Recent audio of a session, or of one dual-stream source (its channel key)"""
+        buffer = self.audio_buffers.get(key)
+        if buffer is None:
+            buffer = self.audio_buffers[key] = AudioRingBuffer()
+            # WebM is recorded as the decoder produces PCM
+            pcm_listeners[key] = lambda pcm, channels: self.record_audio(key, pcm, channels)
+        return buffer
+
+    def record_audio(self, key: str, pcm, channels: int = 1):
+        """Keep decoded 16 kHz PCM in the audio history, downmixed to mono"""
+        buffer = self.audio_buffers.get(key)
+        if buffer is not None:
+            with timed("ring_buffer"):
+                buffer.extend(downmix(pcm, channels))
+
+    def memory_report(self) -> dict:
+        """Audio buffer memory per session; constant per call regardless of length"""
+        sessions = {client_id: buffer.stats() for client_id, buffer in self.audio_buffers.items()}
+        return {
+            "sessions": len(sessions),
+            "total_memory_bytes": sum(s["memory_bytes"] for s in sessions.values()),
+            "by_session": sessions
+        }
+
+    def jitter_report(self) -> dict:
+        """Reordering, late and lost frame counts per session and audio stream"""
+        return {
+            client_id: {"mixed" if stream is None else f"channel{stream}": buffer.stats()
+                        for stream, buffer in buffers.items()}
+            for client_id, buffers in self.jitter_buffers.items() if buffers
+        }
+
+    async def enqueue_audio(self, client_id: str, sequence, item: dict):
+        """
+        Reader side: queue an audio message for the session pipeline in
+        sequence order, through the stream's jitter buffer
+        Messages without a sequence number, or with ?jitter_ms=0, are queued
+        as they arrive
+        """
+        target = self.jitter_targets.get(client_id, JITTER_TARGET_SECONDS)
+        if sequence is None or not target:
+            await self.pipelines[client_id].put(item)
+            return
+        stream = item.get("channel")
+        buffers = self.jitter_buffers[client_id]
+        buffer = buffers.get(stream)
+        if buffer is None:
+            buffer = buffers[stream] = JitterBuffer(target)
+        async with self.jitter_locks[client_id]:
+            await self._release_audio(client_id, stream, buffer.push(sequence, item))
+        if buffer.held and (client_id, stream) not in self.jitter_flushers:
+            self.jitter_flushers[(client_id, stream)] = asyncio.create_task(
+                self._flush_jitter(client_id, stream, buffer)
+            )
+
+    async def _flush_jitter(self, client_id: str, stream, buffer: JitterBuffer):
+        # Releases held frames once the gap before them is given up on, when
+        # no later frame arrives to do it
+        try:
+            while buffer.held:
+                await asyncio.sleep(max(0.0, buffer.next_deadline() - time.monotonic()))
+                async with self.jitter_locks[client_id]:
+                    await self._release_audio(client_id, stream, buffer.flush())
+        finally:
+            self.jitter_flushers.pop((client_id, stream), None)
+
+    async def _release_audio(self, client_id: str, stream, released):
+        pipeline = self.pipelines[client_id]
+        last_audio = self.last_audio[client_id]
+        for _, item in released:
+            if item is None:
+                # Conceal a lost PCM frame with silence of the same length, so
+                # the stream's timeline stays continuous. Encoded WebM cannot
+                # be patched; ffmpeg resynchronizes on the next cluster
+                # (an empty Opus packet makes its decoder conceal the loss)
+                last = last_audio.get(stream)
+                if last is None or last.get("codec") not in RAW_CODECS:
+                    continue
+                data = bytes(len(last["data"])) if last["codec"] in PCM_CODECS else b""
+                item = dict(last, data=data, concealed=True)
+            last_audio[stream] = item
+            await pipeline.put(item)
+
+    def configure_audio(self, client_id: str, message: dict) -> dict:
+        """Codec negotiation: set the format of the session's JSON audio_data"""
+        config = validate_audio_config(message.get("codec"), message.get("sample_rate"), message.get("channels"))
+        self.audio_configs[client_id] = config
+        return config
+
+    def ingest(self, client_id: str, channel, codec: str, sample_rate: int, channels: int, payload) -> bytes:
+        """16 kHz s16le PCM from raw PCM or Opus, converted in-process per audio stream"""
+        ingests = self.ingests.setdefault(client_id, {})
+        ingest = ingests.get(channel)
+        if ingest is None or (ingest.codec, ingest.sample_rate, ingest.channels) != (codec, sample_rate, channels):
+            ingest = ingests[channel] = AudioIngest(codec, sample_rate, channels)
+        return ingest.convert(payload)
+
+    def repacketize(self, client_id: str, channel, channels: int, pcm) -> bytes:
+        """Whole 100 ms frames (per channel) of a PCM stream, whatever the client's packet size"""
+        repacketizers = self.repacketizers.get(client_id)
+        if repacketizers is None:
+            return bytes(pcm)
+        repacketizer = repacketizers.get(channel)
+        if repacketizer is None or repacketizer.frame_bytes != PCM_FRAME_BYTES * channels:
+            repacketizer = repacketizers[channel] = FrameRepacketizer(PCM_FRAME_BYTES * channels)
+        return repacketizer.push(pcm)
+
+    def pipeline_report(self) -> dict:
+        """Queue depth and processing lag per session"""
+        return {client_id: pipeline.stats() for client_id, pipeline in self.pipelines.items()}
+
+    async def send_transcript(self, text: str, is_final: bool, client_id: str, speaker: str = None):
+        """Push a streaming transcription result"""
+        token = current_trace.set({} if client_id in self.traced_sessions else None)
+        try:
+            await self.handle_hypothesis(client_id, text, is_final, "stream", speaker=speaker)
+        finally:
+            current_trace.reset(token)
+
+    async def handle_hypothesis(self, client_id: str, text: str, is_final: bool, source: str,
+                                speaker: str = None):
+        """
+        Analyze the sentences a partial or final hypothesis finalizes, once each
+        A partial that finalizes nothing only gets speculative hints for its
+        revisable tail, sent from a task the next hypothesis cancels.
+        Each speaker's channel and each source has its own hypothesis stream
+        """
+        # Client-side and streaming ASR revise their own hypotheses, so each
+        # source keeps its own stable prefix
+        key = channel_key(channel_key(client_id, speaker) if speaker else client_id, source)
+        assembler = get_session_assembler(key)
+        with timed("assemble"):
+            sentences = assembler.feed(text, is_final)
+        self._cancel_speculation(key)
+        message = {
+            "type": "live_insights",
+            "transcript": text,
+            "is_final": is_final,
+            "insights": {},
+            "finalized": sentences,
+            "timestamp": asyncio.get_event_loop().time()
+        }
+        if speaker:
+            message["speaker"] = speaker
+        if sentences:
+            TRANSCRIPTS.inc(source, amount=len(sentences))
+            finalized_text = " ".join(sentences)
+            with timed("analyze_chunk"):
+                message["insights"] = await run_blocking(analyze_text_chunk, finalized_text)
+            record_insights(client_id, message["insights"], speaker=speaker, text=finalized_text)
+        if is_final or sentences:
+            await self.send_personal_message(message, client_id)
+        else:
+            self.speculations[key] = asyncio.create_task(
+                self._speculate(client_id, message, assembler.tail(text)))
+
+    def open_channel_sessions(self, client_id: str, speakers) -> bool:
+        """Open a transcription session per speaker on the call's backend"""
+        session = self.transcribe_sessions.get(client_id)
+        if session is None or session.backend == "simulation":
+            return False
+        for speaker in speakers:
+            key = channel_key(client_id, speaker)
+            if key not in self.transcribe_sessions:
+                self.transcribe_sessions[key] = open_transcribe_session(
+                    key, lambda text, is_final, speaker=speaker: self.send_transcript(
+                        text, is_final, client_id, speaker=speaker),
+                    backend=session.backend
+                )
+        return True
+
+    async def _speculate(self, client_id: str, message: dict, tail: str):
+        with timed("speculate"):
+            message["speculative"] = speculative_insights(tail)
+        # Once sending has started it completes even if superseded
+        await asyncio.shield(self.send_personal_message(message, client_id))
+
+    def _close_hypotheses(self, key: str):
+        """Drop the hypothesis streams of a session or speaker channel, from every source"""
+        for source in HYPOTHESIS_SOURCES:
+            self._cancel_speculation(channel_key(key, source))
+            close_session_assembler(channel_key(key, source))
+
+    def _cancel_speculation(self, key: str):
+        task = self.speculations.pop(key, None)
+        if task is not None and not task.done():
+            task.cancel()
+            DROPS.inc("speculation_superseded")
             
     async def send_personal_message(self, message: dict, client_id: str):
-        if client_id in self.active_connections:
-            try:
-                await self.active_connections[client_id].send_text(json.dumps(message))
-            except Exception as e:
-                print(f"Error sending message to client {client_id}: {e}")
-                self.disconnect(client_id)
+        # Queued on the connection's outbound scheduler, which does the
+        # encoding and socket writes
+        scheduler = self.outbound.get(client_id)
+        if scheduler is not None:
+            trace = current_trace.get()
+            if trace:
+                message["trace"] = dict(trace)
+            scheduler.send(message)
+        if message.get("type") == "live_insights" and message.get("transcript"):
+            with timed("publish"):
+                await self.publish_insights(client_id, message)
+
+    def _send_failed(self, client_id: str, error: Exception):
+        print(f"Error sending message to client {client_id}: {error}")
+        self.disconnect(client_id)
+
+    def outbound_report(self) -> dict:
+        return {client_id: scheduler.stats() for client_id, scheduler in self.outbound.items()}
 
 manager = ConnectionManager()
 
+ACTIVE_SESSIONS = Gauge("call_insights_active_sessions", "Open live-call WebSockets",
+                        callback=lambda: len(manager.active_connections))
+BUFFERED_AUDIO = Gauge("call_insights_buffered_audio_bytes", "Audio held in session ring buffers",
+                       callback=lambda: sum(len(buffer) for buffer in manager.audio_buffers.values()))
+QUEUED_MESSAGES = Gauge("call_insights_queued_messages", "Messages waiting in session pipelines",
+                        callback=lambda: sum(len(pipeline.items) for pipeline in manager.pipelines.values()))
+OUTBOUND_PENDING = Gauge("call_insights_outbound_pending_messages", "Messages waiting to be written to clients",
+                         callback=lambda: sum(len(scheduler.pending) for scheduler in manager.outbound.values()))
+
+async def handle_audio_data(client_id: str, audio_data_bytes, use_real_transcription: bool,
+                            channels: int = 1, channel: int = None, is_pcm: bool = False,
+                            codec: str = None, sample_rate: int = PCM_SAMPLE_RATE):
+    """
+    Run one chunk of audio through transcription and insights
+    audio_data_bytes may be bytes or a zero-copy memoryview of a binary frame;
+    is_pcm marks 16 kHz s16le PCM. Raw PCM at other rates or formats and raw
+    Opus packets (codec) are converted to it in-process; anything else is
+    decoded as WebM/Opus by ffmpeg.
+    Interleaved multi-channel audio, or a mono chunk of one channel of a
+    dual-stream client, goes through per-speaker pipelines
+    """
+    if codec in RAW_CODECS:
+        with timed("ingest"):
+            audio_data_bytes = manager.ingest(client_id, channel, codec, sample_rate, channels, audio_data_bytes)
+        is_pcm = True
+
+    history = client_id
+    if channel is not None:
+        history = channel_key(client_id, speaker_name(channel, manager.session_speakers.get(client_id, SPEAKERS)))
+        manager.audio_history(history)
+
+    if is_pcm:
+        # Keep the recent audio history (bounded ring buffer); WebM is kept
+        # as the session's decoder produces PCM
+        manager.record_audio(history, audio_data_bytes, channels)
+        # VAD and transcription work on whole 100 ms frames; a partial frame
+        # waits for the next chunk
+        audio_data_bytes = manager.repacketize(client_id, channel, channels, audio_data_bytes)
+        if not audio_data_bytes:
+            return
+
+    if channels > 1 or channel is not None:
+        await handle_multichannel_audio(client_id, audio_data_bytes, use_real_transcription,
+                                        channels, channel, is_pcm)
+        return
+    
+    # Process audio chunk for transcription
+    transcript_chunk = ""
+    session = manager.transcribe_sessions.get(client_id)
+    if use_real_transcription and (session is None or session.backend != "simulation"):
+        try:
+            # Results arrive asynchronously through send_transcript
+            streaming = await start_real_transcription(audio_data_bytes, client_id, is_pcm=is_pcm)
+            if not streaming:
+                print("Real transcription failed, falling back to simulation")
+                SIMULATION_FALLBACKS.inc()
+                # Fallback to simulation if real transcription fails
+                transcript_chunk = await process_audio_chunk(audio_data_bytes, client_id, is_pcm=is_pcm)
+        except Exception as e:
+            print(f"Real transcription error: {e}, falling back to simulation")
+            SIMULATION_FALLBACKS.inc()
+            # Fallback to simulation
+            transcript_chunk = await process_audio_chunk(audio_data_bytes, client_id, is_pcm=is_pcm)
+    else:
+        # Use simulation
+        transcript_chunk = await process_audio_chunk(audio_data_bytes, client_id, is_pcm=is_pcm)
+    
+    if transcript_chunk and transcript_chunk.strip():
+        # Analyze transcript for insights
+        TRANSCRIPTS.inc("simulation")
+        with timed("analyze_chunk"):
+            insights = await run_blocking(analyze_text_chunk, transcript_chunk)
+        record_insights(client_id, insights)
+        
+        # Send real-time results
+        await manager.send_personal_message({
+            "type": "live_insights",
+            "transcript": transcript_chunk,
+            "insights": insights,
+            "timestamp": asyncio.get_event_loop().time()
+        }, client_id)
+    # No message otherwise: idle connections are kept alive by the server's
+    # WebSocket pings (uvicorn --ws-ping-interval), not empty insights
+
+async def handle_multichannel_audio(client_id: str, audio_data_bytes, use_real_transcription: bool,
+                                   channels: int, channel: int, is_pcm: bool):
+    """
+    Audio with the speakers already apart: interleaved channels, or one source
+    of a dual-stream client. Each speaker's channel has its own VAD,
+    transcription and insight pipeline, and the channels run concurrently
+    """
+    if not 1 <= channels <= MAX_CHANNELS or (channel is not None and not 0 <= channel < MAX_CHANNELS):
+        raise ValueError(f"Unsupported channel layout: {channels} channels, channel {channel}")
+    speakers = manager.session_speakers.get(client_id, SPEAKERS)
+    if channel is not None:
+        targets = [speaker_name(channel, speakers)]
+    else:
+        targets = [speaker_name(index, speakers) for index in range(channels)]
+    manager.channel_speakers.setdefault(client_id, set()).update(targets)
+    keys = [channel_key(client_id, speaker) for speaker in targets]
+
+    if use_real_transcription and manager.open_channel_sessions(client_id, targets):
+        try:
+            # Results arrive asynchronously through send_transcript, per speaker
+            if channel is not None:
+                streaming = await start_real_transcription(audio_data_bytes, keys[0], is_pcm=is_pcm)
+            else:
+                streaming = await start_multichannel_transcription(audio_data_bytes, client_id, keys,
+                                                                   is_pcm=is_pcm)
+            if streaming:
+                return
+            print("Real transcription failed, falling back to simulation")
+        except Exception as e:
+            print(f"Real transcription error: {e}, falling back to simulation")
+        SIMULATION_FALLBACKS.inc()
+
+    if channel is not None:
+        chunks = [audio_data_bytes]
+    elif is_pcm:
+        chunks = split_channels(audio_data_bytes, channels)
+    else:
+        # Encoded audio is simulated per speaker without decoding
+        chunks = [audio_data_bytes] * channels
+    await asyncio.gather(*(
+        simulate_channel(client_id, speaker, key, chunk, is_pcm)
+        for speaker, key, chunk in zip(targets, keys, chunks)
+    ))
+
+async def simulate_channel(client_id: str, speaker: str, key: str, audio, is_pcm: bool):
+    """Simulated transcription and insights for one speaker's channel"""
+    transcript_chunk = await process_audio_chunk(audio, key, is_pcm=is_pcm)
+    if transcript_chunk and transcript_chunk.strip():
+        TRANSCRIPTS.inc("simulation")
+        with timed("analyze_chunk"):
+            insights = await run_blocking(analyze_text_chunk, transcript_chunk)
+        record_insights(client_id, insights, speaker=speaker, text=transcript_chunk)
+        await manager.send_personal_message({
+            "type": "live_insights",
+            "speaker": speaker,
+            "transcript": transcript_chunk,
+            "insights": insights,
+            "timestamp": asyncio.get_event_loop().time()
+        }, client_id)
+
+async def handle_transcript_data(client_id: str, transcript_text: str, is_final: bool):
+    """Analyze transcript text produced by client-side speech recognition"""
+    if transcript_text and transcript_text.strip():
+        await manager.handle_hypothesis(client_id, transcript_text, is_final, "client")
+
+async def process_message(client_id: str, item: dict):
+    """Pipeline stage: handle one queued audio or transcript message"""
+    # Runs inside the pipeline worker task, so the trace is per message
+    current_trace.set({} if client_id in manager.traced_sessions else None)
+    observe_stage("queue_wait", time.monotonic() - item["enqueued_at"])
+    if item["type"] == "audio_data":
+        try:
+            await handle_audio_data(client_id, item["data"], item["use_real_transcription"],
+                                    channels=item.get("channels", 1), channel=item.get("channel"),
+                                    codec=item.get("codec"), sample_rate=item.get("sample_rate", PCM_SAMPLE_RATE))
+        except Exception as e:
+            print(f"Error processing audio data: {e}")
+            # Send error message but keep connection alive
+            await manager.send_personal_message({
+                "type": "error",
+                "message": f"Audio processing error: {str(e)}"
+            }, client_id)
+    elif item["type"] == "transcript_data":
+        try:
+            await handle_transcript_data(client_id, item["data"], item["is_final"])
+        except Exception as e:
+            print(f"Error processing transcript data: {e}")
+            await manager.send_personal_message({
+                "type": "error",
+                "message": f"Transcript processing error: {str(e)}"
+            }, client_id)
+
 async def websocket_endpoint(websocket: WebSocket, client_id: str = None):
     if not client_id:
         client_id = str(uuid.uuid4())
     
-    await manager.connect(websocket, client_id)
+    # ?trace=1 adds a per-stage timing trace to every response
+    # ?backend= overrides the backend chosen through /start-live-call/
+    # ?coalesce_ms= sets the outbound coalescing window, ?delta=0 sends full insights
+    # ?speakers=agent,customer names the audio channels in order
+    # ?jitter_ms= sets how long out-of-order audio frames are waited for
+    params = websocket.query_params
+    try:
+        coalesce_window = float(params["coalesce_ms"]) / 1000 if "coalesce_ms" in params \
+            else OUTBOUND_COALESCE_SECONDS
+    except ValueError:
+        coalesce_window = OUTBOUND_COALESCE_SECONDS
+    try:
+        jitter_target = float(params["jitter_ms"]) / 1000 if "jitter_ms" in params \
+            else JITTER_TARGET_SECONDS
+    except ValueError:
+        jitter_target = JITTER_TARGET_SECONDS
+    await manager.connect(websocket, client_id,
+                          trace=params.get("trace") in ("1", "true"),
+                          backend=params.get("backend"),
+                          coalesce_window=max(0.0, coalesce_window),
+                          delta=params.get("delta") not in ("0", "false"),
+                          speakers=parse_speakers(params.get("speakers")),
+                          jitter_target=max(0.0, jitter_target))
+    pipeline = manager.pipelines[client_id]
     
     try:
         # Send connection confirmation
         await manager.send_personal_message({
             "type": "connection_established",
             "client_id": client_id,
+            "transcription_backend": manager.transcribe_sessions[client_id].backend,
+            # Codec negotiation: pick one with an audio_config message
+            "audio": dict(negotiation(), config=manager.audio_configs.get(client_id)),
             "message": "Connected to live call insights"
         }, client_id)
         
-        # Listen for messages from client
+        # Reader: parse and enqueue; the session pipeline does the processing
         while True:
             try:
-                data = await websocket.receive_text()
-                message = json.loads(data)
+                received = await websocket.receive()
+                if received["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(received.get("code", 1000))
                 
-                if message.get("type") == "audio_data":
-                    # Process incoming audio data
+                if received.get("bytes") is not None:
+                    # Binary audio frame: header plus raw payload, no base64
                     try:
-                        # Decode base64 audio data
-                        audio_data_base64 = message["data"]
-                        audio_data_bytes = base64.b64decode(audio_data_base64)
-                        use_real_transcription = message.get("use_real_transcription", False)
-                        
-                        # Add to buffer
-                        manager.audio_buffers[client_id].extend(audio_data_bytes)
-                        
-                        # Process audio chunk for transcription
-                        transcript_chunk = ""
-                        if use_real_transcription:
-                            try:
-                                transcript_chunk = await start_real_transcription(audio_data_bytes, client_id)
-                                if not transcript_chunk:
-                                    print("Real transcription failed, falling back to simulation")
-                                    # Fallback to simulation if real transcription fails
-                                    audio_data_array = np.frombuffer(audio_data_bytes, dtype=np.uint8)
-                                    transcript_chunk = await process_audio_chunk(audio_data_array, client_id)
-                            except Exception as e:
-                                print(f"Real transcription error: {e}, falling back to simulation")
-                                # Fallback to simulation
-                                audio_data_array = np.frombuffer(audio_data_bytes, dtype=np.uint8)
-                                transcript_chunk = await process_audio_chunk(audio_data_array, client_id)
-                        else:
-                            # Use simulation
-                            audio_data_array = np.frombuffer(audio_data_bytes, dtype=np.uint8)
-                            transcript_chunk = await process_audio_chunk(audio_data_array, client_id)
-                        
-                        if transcript_chunk and transcript_chunk.strip():
-                            # Analyze transcript for insights
-                            insights = analyze_text_chunk(transcript_chunk)
-                            
-                            # Send real-time results
-                            await manager.send_personal_message({
-                                "type": "live_insights",
-                                "transcript": transcript_chunk,
-                                "insights": insights,
-                                "timestamp": asyncio.get_event_loop().time()
-                            }, client_id)
-                        else:
-                            # Send empty transcript to keep connection alive
-                            await manager.send_personal_message({
-                                "type": "live_insights",
-                                "transcript": "",
-                                "insights": {},
-                                "timestamp": asyncio.get_event_loop().time()
-                            }, client_id)
-                            
-                    except Exception as e:
-                        print(f"Error processing audio data: {e}")
-                        # Send error message but keep connection alive
+                        with timed("parse_frame"):
+                            frame = parse_frame(received["bytes"])
+                    except ValueError as e:
+                        print(f"Invalid binary frame from client {client_id}: {e}")
                         await manager.send_personal_message({
                             "type": "error",
                             "message": f"Audio processing error: {str(e)}"
                         }, client_id)
-                        
-                elif message.get("type") == "transcript_data":
-                    # Process incoming transcript data from speech recognition
+                        continue
+                    AUDIO_CHUNKS.inc("binary")
+                    AUDIO_BYTES.inc("binary", amount=len(frame.payload))
+                    await manager.enqueue_audio(client_id, frame.sequence, {
+                        "type": "audio_data",
+                        "data": frame.payload,
+                        "use_real_transcription": frame.use_real_transcription,
+                        "channels": max(1, frame.channels),
+                        "channel": frame.source_channel,
+                        "codec": CODEC_NAMES[frame.codec],
+                        "sample_rate": frame.sample_rate
+                    })
+                    continue
+                
+                with timed("parse_json"):
+                    message = json.loads(received["text"])
+                
+                if message.get("type") == "audio_data":
+                    # Decode base64 audio data
+                    with timed("decode_base64"):
+                        audio = base64.b64decode(message["data"])
+                    AUDIO_CHUNKS.inc("json")
+                    AUDIO_BYTES.inc("json", amount=len(audio))
+                    # Optional: "channels" for interleaved audio, "source"
+                    # (microphone/meet) or "channel" for one stream of a
+                    # dual-stream client, "codec" (or "encoding") and
+                    # "sample_rate" when not the negotiated format, "sequence"
+                    # to have out-of-order chunks put back in order
+                    config = manager.audio_configs.get(client_id, {})
+                    await manager.enqueue_audio(client_id, message.get("sequence"), {
+                        "type": "audio_data",
+                        "data": audio,
+                        "use_real_transcription": message.get("use_real_transcription", False),
+                        "channels": int(message.get("channels", config.get("channels", 1))),
+                        "channel": message.get("channel", SOURCE_CHANNELS.get(message.get("source"))),
+                        "codec": message.get("codec", message.get("encoding", config.get("codec", "webm_opus"))),
+                        "sample_rate": int(message.get("sample_rate", config.get("sample_rate", PCM_SAMPLE_RATE)))
+                    })
+
+                elif message.get("type") == "audio_config":
+                    # Codec negotiation: the format of later JSON audio_data
                     try:
-                        transcript_text = message["data"]
-                        is_final = message.get("is_final", False)
-                        
-                        if transcript_text and transcript_text.strip():
-                            # Analyze transcript for insights
-                            insights = analyze_text_chunk(transcript_text)
-                            
-                            # Send real-time results
-                            await manager.send_personal_message({
-                                "type": "live_insights",
-                                "transcript": transcript_text,
-                                "insights": insights,
-                                "timestamp": asyncio.get_event_loop().time()
-                            }, client_id)
-                            
-                    except Exception as e:
-                        print(f"Error processing transcript data: {e}")
+                        config = manager.configure_audio(client_id, message)
+                    except (ValueError, TypeError) as e:
                         await manager.send_personal_message({
-                            "type": "error",
-                            "message": f"Transcript processing error: {str(e)}"
+                            "type": "audio_config",
+                            "accepted": False,
+                            "error": str(e),
+                            "codecs": negotiation()["codecs"]
                         }, client_id)
+                        continue
+                    await manager.send_personal_message({
+                        "type": "audio_config",
+                        "accepted": True,
+                        "config": config
+                    }, client_id)
+                        
+                elif message.get("type") == "transcript_data":
+                    # Transcript data from client-side speech recognition
+                    await pipeline.put({
+                        "type": "transcript_data",
+                        "data": message["data"],
+                        "is_final": message.get("is_final", False)
+                    })
                 
             except json.JSONDecodeError as e:
                 print(f"Invalid JSON received from client {client_id}: {e}")
                 continue
+            except WebSocketDisconnect:
+                raise
             except Exception as e:
                 print(f"Error processing message from client {client_id}: {e}")
                 # Send error but keep connection alive
@@ -165,4 +710,33 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str = None):
             "type": "error",
             "message": str(e)
         }, client_id)
-        manager.disconnect(client_id) 
\ No newline at end of file
+        manager.disconnect(client_id)
+
+async def watch_endpoint(websocket: WebSocket, session_id: str):
+    """
+    Stream a call's live insights to an observer (e.g. a supervisor dashboard)
+    Works from any worker: messages arrive through the session store's pub/sub
+    """
+    await websocket.accept()
+    store = get_session_store()
+    await websocket.send_text(encode_json({
+        "type": "watching",
+        "session_id": session_id,
+        "session": await store.get_session(session_id),
+        "insights": await store.load_insights(session_id)
+    }))
+
+    async def forward():
+        async for message in store.subscribe(session_id):
+            await websocket.send_text(encode_json(message))
+
+    forwarder = asyncio.create_task(forward())
+    try:
+        while True:
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                break
+    finally:
+        forwarder.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await forwarder
@@ -0,0 +1,102 @@
+"""
+Benchmark: real-time factor and result latency of the transcription backends
+Feeds the same 16 kHz PCM (synthetic speech-plus-silence, or --wav) through
+every available backend in 100 ms frames. RTF is processing time divided by
+audio duration (below 1 is faster than real time); latency is the time from
+the most recent audio frame being sent to each final result arriving.
+AWS is only measured with --aws, since it needs credentials and bills per second.
+Run from the repo root: python -m benchmarks.bench_asr_backends [--wav call.wav] [--realtime]
+"""
+import argparse
+import asyncio
+import time
+import wave
+
+import numpy as np
+
+from app.audio_decoder import PCM_FRAME_BYTES, PCM_SAMPLE_RATE
+from app.transcribe_streaming import STREAM_BACKENDS, available_backends, process_audio_chunk
+from benchmarks.bench_vad import synthetic_call
+
+def load_pcm(path, seconds):
+    if path is None:
+        samples, _ = synthetic_call(seconds)
+        return samples.tobytes()
+    with wave.open(path) as wav:
+        if wav.getframerate() != PCM_SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+            raise SystemExit("--wav must be 16 kHz mono 16-bit PCM")
+        return wav.readframes(wav.getnframes())
+
+def latency_summary(latencies):
+    if not latencies:
+        return {"finals": 0}
+    data = np.asarray(latencies) * 1000
+    return {"finals": len(latencies), "latency_p50_ms": float(np.percentile(data, 50)),
+            "latency_p95_ms": float(np.percentile(data, 95))}
+
+async def bench_simulation(pcm, realtime):
+    latencies = []
+    start = time.perf_counter()
+    for n, offset in enumerate(range(0, len(pcm), PCM_FRAME_BYTES)):
+        if realtime:
+            await asyncio.sleep(max(0.0, start + n * 0.1 - time.perf_counter()))
+        sent = time.perf_counter()
+        if await process_audio_chunk(pcm[offset:offset + PCM_FRAME_BYTES], "bench-sim", is_pcm=True):
+            latencies.append(time.perf_counter() - sent)
+    return time.perf_counter() - start, latencies
+
+async def bench_stream(backend, pcm, realtime):
+    latencies = []
+    last_sent = [time.perf_counter()]
+    stream = await STREAM_BACKENDS[backend]().open()
+
+    async def collect():
+        async for _, is_final in stream.results():
+            if is_final:
+                latencies.append(time.perf_counter() - last_sent[0])
+
+    collector = asyncio.create_task(collect())
+    start = time.perf_counter()
+    for n, offset in enumerate(range(0, len(pcm), PCM_FRAME_BYTES)):
+        if realtime:
+            await asyncio.sleep(max(0.0, start + n * 0.1 - time.perf_counter()))
+        await stream.send(pcm[offset:offset + PCM_FRAME_BYTES])
+        last_sent[0] = time.perf_counter()
+    await stream.end()
+    await collector
+    return time.perf_counter() - start, latencies
+
+async def run_all(args):
+    pcm = load_pcm(args.wav, args.seconds)
+    audio_seconds = len(pcm) / (2 * PCM_SAMPLE_RATE)
+    backends = [b for b in available_backends() if b != "aws" or args.aws]
+    results = {}
+    for backend in backends:
+        if backend == "simulation":
+            elapsed, latencies = await bench_simulation(pcm, args.realtime)
+        else:
+            elapsed, latencies = await bench_stream(backend, pcm, args.realtime)
+        results[backend] = dict(latency_summary(latencies), rtf=elapsed / audio_seconds)
+        if args.realtime:
+            # Wall time is pinned to the audio clock; RTF is not meaningful
+            results[backend]["rtf"] = None
+        summary = results[backend]
+        rtf = "  n/a " if summary["rtf"] is None else f"{summary['rtf']:.4f}"
+        latency = (f"p50 {summary['latency_p50_ms']:8.2f} ms  p95 {summary['latency_p95_ms']:8.2f} ms"
+                   if summary["finals"] else "no finals")
+        print(f"{backend:<11} rtf {rtf}  {summary['finals']:4d} finals  {latency}")
+    skipped = [b for b in ("local", "aws") if b not in backends]
+    if skipped:
+        print(f"(not measured: {', '.join(skipped)})")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--wav", help="16 kHz mono 16-bit WAV to transcribe")
+    parser.add_argument("--seconds", type=int, default=60, help="length of the synthetic audio")
+    parser.add_argument("--realtime", action="store_true", help="pace audio at real time")
+    parser.add_argument("--aws", action="store_true", help="include AWS Transcribe streaming")
+    return asyncio.run(run_all(parser.parse_args(argv)))
+
+if __name__ == "__main__":
+    main()
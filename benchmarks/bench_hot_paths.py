@@ -0,0 +1,141 @@
+"""
+Micro-benchmarks for the per-chunk hot functions of comprehend.py and
+transcribe_streaming.py (plus the VAD they now sit behind) and of outbound
+message encoding
+Run from the repo root: python -m benchmarks.bench_hot_paths
+"""
+import asyncio
+import json
+import timeit
+
+import numpy as np
+
+from app.comprehend import (
+    CHUNK_CACHE, COMPREHEND_CACHE, LEXICON, analyze_text_async, analyze_text_chunk,
+    merge_sentiment, split_text_segments
+)
+from app.transcribe_streaming import (
+    SAMPLE_TRANSCRIPTIONS, FakeTranscribeStream, process_audio_chunk, simulate_transcription
+)
+from app.multichannel import split_channels
+from app.outbound import encode_json
+from app.vad import VoiceActivityDetector
+from benchmarks.bench_vad import synthetic_call
+
+CHUNKS = [sentence for sentences in SAMPLE_TRANSCRIPTIONS.values() for sentence in sentences]
+TRANSCRIPT = " ".join(CHUNKS * 40)
+
+class FakeComprehend:
+    """Answers batch_detect_* instantly, so only our own overhead is measured"""
+
+    def batch_detect_sentiment(self, TextList, LanguageCode):
+        return {"ResultList": [
+            {"Index": i, "Sentiment": "NEUTRAL", "SentimentScore": {
+                "Positive": 0.1, "Negative": 0.1, "Neutral": 0.7, "Mixed": 0.1}}
+            for i in range(len(TextList))
+        ], "ErrorList": []}
+
+    def batch_detect_entities(self, TextList, LanguageCode):
+        return {"ResultList": [
+            {"Index": i, "Entities": [{"Text": "order", "Type": "OTHER", "Score": 0.9,
+                                       "BeginOffset": 0, "EndOffset": 5}]}
+            for i in range(len(TextList))
+        ], "ErrorList": []}
+
+    def batch_detect_key_phrases(self, TextList, LanguageCode):
+        return {"ResultList": [
+            {"Index": i, "KeyPhrases": [{"Text": "my order", "Score": 0.9,
+                                         "BeginOffset": 0, "EndOffset": 8}]}
+            for i in range(len(TextList))
+        ], "ErrorList": []}
+
+def per_call_us(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+def bench_comprehend():
+    chunk_iter = iter(range(10 ** 9))
+    segments = split_text_segments(TRANSCRIPT)
+    sentiments = [{"Sentiment": "NEUTRAL", "SentimentScore": {
+        "Positive": 0.1, "Negative": 0.1, "Neutral": 0.7, "Mixed": 0.1}}] * len(segments)
+    client = FakeComprehend()
+
+    def analyze_uncached():
+        # A unique suffix defeats the chunk cache
+        return analyze_text_chunk(f"{CHUNKS[0]} {next(chunk_iter)}")
+
+    def analyze_full_transcript():
+        COMPREHEND_CACHE.clear()
+        return asyncio.run(analyze_text_async(client, TRANSCRIPT))
+
+    CHUNK_CACHE.clear()
+    analyze_text_chunk(CHUNKS[0])
+    return {
+        "analyze_text_chunk_cached_us": per_call_us(lambda: analyze_text_chunk(CHUNKS[0]), 20000),
+        "analyze_text_chunk_uncached_us": per_call_us(analyze_uncached, 5000),
+        "lexicon_analyze_us": per_call_us(lambda: LEXICON.analyze(CHUNKS[1]), 5000),
+        "split_text_segments_us": per_call_us(lambda: split_text_segments(TRANSCRIPT), 50),
+        "merge_sentiment_us": per_call_us(lambda: merge_sentiment(segments, sentiments), 2000),
+        "analyze_text_async_fake_client_ms": per_call_us(analyze_full_transcript, 5) / 1000,
+        "transcript_chars": len(TRANSCRIPT),
+    }
+
+def bench_transcribe_streaming():
+    samples, _ = synthetic_call(seconds=30)
+    pcm = samples.tobytes()
+    frame = pcm[:3200]
+    pcm_int16 = samples[:16000]
+
+    async def fake_stream_10s():
+        stream = FakeTranscribeStream()
+        for offset in range(0, 32000 * 10, 3200):
+            await stream.send(pcm[offset:offset + 3200])
+
+    async def process_pcm_chunks():
+        for offset in range(0, len(pcm), 3200):
+            await process_audio_chunk(pcm[offset:offset + 3200], "bench", is_pcm=True)
+
+    stereo_frame = np.repeat(pcm_int16[:1600], 2).tobytes()
+    channel_vads = [VoiceActivityDetector(), VoiceActivityDetector()]
+
+    def stereo_vad():
+        for channel_vad, samples in zip(channel_vads, split_channels(stereo_frame, 2)):
+            channel_vad.process(samples)
+
+    vad = VoiceActivityDetector()
+    return {
+        "simulate_transcription_us": per_call_us(lambda: simulate_transcription(pcm_int16), 2000),
+        "vad_100ms_frame_us": per_call_us(lambda: vad.process(frame), 5000),
+        "split_channels_stereo_100ms_us": per_call_us(lambda: split_channels(stereo_frame, 2), 20000),
+        "vad_stereo_100ms_frame_us": per_call_us(stereo_vad, 5000),
+        "fake_stream_10s_audio_us": per_call_us(lambda: asyncio.run(fake_stream_10s()), 20),
+        "process_audio_chunk_30s_pcm_ms": per_call_us(lambda: asyncio.run(process_pcm_chunks()), 3) / 1000,
+    }
+
+def bench_outbound():
+    message = {
+        "type": "live_insights",
+        "transcript": CHUNKS[1],
+        "is_final": True,
+        "insights": analyze_text_chunk(CHUNKS[1]),
+        "finalized": [CHUNKS[1]],
+        "timestamp": 12345.678
+    }
+    return {
+        "json_dumps_us": per_call_us(lambda: json.dumps(message), 20000),
+        "encode_json_us": per_call_us(lambda: encode_json(message), 20000),
+    }
+
+def run():
+    results = {
+        "comprehend": bench_comprehend(),
+        "transcribe_streaming": bench_transcribe_streaming(),
+        "outbound": bench_outbound(),
+    }
+    for group, values in results.items():
+        print(group)
+        for name, value in values.items():
+            print(f"  {name:<36} {value:12.2f}")
+    return results
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,101 @@
+"""
+Benchmark: CPU per second of audio to get 16 kHz PCM, ffmpeg vs in-process ingest
+The ffmpeg path is WebM/Opus through the session's StreamingDecoder (this
+process plus the ffmpeg child); the others are app.audio_ingest.AudioIngest:
+PCM resampled with NumPy, and raw Opus packets when opuslib is installed
+Run from the repo root: python -m benchmarks.bench_ingest
+"""
+import asyncio
+import resource
+import subprocess
+import time
+
+import numpy as np
+
+from app.audio_decoder import PCM_SAMPLE_RATE, StreamingDecoder
+from app.audio_ingest import AudioIngest, opus_available
+from benchmarks.bench_vad import synthetic_call
+
+WEBM_CHUNK_SECONDS = 0.25
+PCM_PACKET_SECONDS = 0.1
+OPUS_PACKET_SECONDS = 0.02
+
+def at_rate(samples: np.ndarray, rate: int) -> np.ndarray:
+    """The synthetic call as float samples in [-1, 1) at another rate"""
+    source = samples.astype(np.float32) / 32768
+    if rate == PCM_SAMPLE_RATE:
+        return source
+    positions = np.arange(int(len(source) * rate / PCM_SAMPLE_RATE)) * PCM_SAMPLE_RATE / rate
+    return np.interp(positions, np.arange(len(source)), source).astype(np.float32)
+
+def packets(data: bytes, size: int):
+    return [data[offset:offset + size] for offset in range(0, len(data), size)]
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+async def decode_with_ffmpeg(chunks):
+    decoder = StreamingDecoder("bench-ingest")
+
+    async def drain():
+        async for _ in decoder.frames():
+            pass
+
+    drainer = asyncio.create_task(drain())
+    for chunk in chunks:
+        await decoder.feed(chunk)
+    await decoder.close()
+    await drainer
+
+def ffmpeg_cpu(webm: bytes, audio_seconds: float) -> float:
+    chunks = packets(webm, int(len(webm) * WEBM_CHUNK_SECONDS / audio_seconds))
+    start, start_children = time.process_time(), children_cpu()
+    asyncio.run(decode_with_ffmpeg(chunks))
+    return time.process_time() - start + children_cpu() - start_children
+
+def ingest_cpu(codec: str, sample_rate: int, messages) -> float:
+    ingest = AudioIngest(codec, sample_rate)
+    start = time.process_time()
+    for message in messages:
+        ingest.convert(message)
+    return time.process_time() - start
+
+def opus_packets(samples: np.ndarray):
+    import opuslib
+
+    encoder = opuslib.Encoder(48000, 1, opuslib.APPLICATION_VOIP)
+    pcm = (at_rate(samples, 48000) * 32767).astype("<i2")
+    frame = int(48000 * OPUS_PACKET_SECONDS)
+    return [encoder.encode(pcm[offset:offset + frame].tobytes(), frame)
+            for offset in range(0, len(pcm) - frame + 1, frame)]
+
+def run(seconds=120):
+    samples, _ = synthetic_call(seconds)
+    webm = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "s16le", "-ar", "16000", "-ac", "1",
+         "-i", "pipe:0", "-ar", "48000", "-c:a", "libopus", "-b:a", "32k", "-f", "webm", "pipe:1"],
+        input=samples.tobytes(), capture_output=True, check=True
+    ).stdout
+
+    results = {"ffmpeg webm/opus": ffmpeg_cpu(webm, seconds)}
+    for codec, rate in (("pcm_s16le", 16000), ("pcm_s16le", 48000), ("pcm_s16le", 8000),
+                        ("pcm_f32le", 44100), ("pcm_f32le", 48000)):
+        audio = at_rate(samples, rate)
+        data = (audio * 32767).astype("<i2").tobytes() if codec == "pcm_s16le" else audio.astype("<f4").tobytes()
+        size = int(rate * PCM_PACKET_SECONDS) * (2 if codec == "pcm_s16le" else 4)
+        results[f"{codec} {rate // 1000 if rate % 1000 == 0 else rate / 1000} kHz"] = \
+            ingest_cpu(codec, rate, packets(data, size))
+    if opus_available():
+        results["raw opus 20 ms packets"] = ingest_cpu("opus", 48000, opus_packets(samples))
+    else:
+        print("(raw opus not measured: opuslib/libopus not installed)")
+
+    baseline = results["ffmpeg webm/opus"]
+    for name, cpu in results.items():
+        print(f"{name:<24} {cpu / seconds * 1000:8.3f} ms CPU per audio second  "
+              f"({baseline / cpu:6.1f}x vs ffmpeg)")
+    return {name: cpu / seconds for name, cpu in results.items()}
+
+if __name__ == "__main__":
+    run()
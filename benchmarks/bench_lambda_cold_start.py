@@ -0,0 +1,50 @@
+"""
+Benchmark: Lambda cold-start import time against lambda_function.IMPORT_BUDGET_MS
+Each run is a fresh interpreter that imports the handler module and loads its
+pipeline, as the first invocation of a new container does
+Run from the repo root: python -m benchmarks.bench_lambda_cold_start
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = """
+import sys, time
+started = time.perf_counter()
+sys.path[:0] = [{root!r}, {lambda_dir!r}]
+import lambda_function
+lambda_function.get_pipeline()
+print("total_ms", (time.perf_counter() - started) * 1000)
+"""
+
+def cold_start() -> dict:
+    code = COLD_START.format(root=ROOT, lambda_dir=os.path.join(ROOT, "lambda"))
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"))
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            check=True, env=env).stdout
+    report = {}
+    for line in output.splitlines():
+        if line.startswith("{"):
+            report.update(json.loads(line))
+        elif line.startswith("total_ms"):
+            report["total_ms"] = float(line.split()[1])
+    return report
+
+def run(runs=10):
+    reports = [cold_start() for _ in range(runs)]
+    results = {
+        key: statistics.median(report[key] for report in reports)
+        for key in ("import_ms", "clients_ms", "total_ms")
+    }
+    results["import_budget_ms"] = reports[0]["import_budget_ms"]
+    results["over_budget_runs"] = sum(report["over_budget"] for report in reports)
+    for name, value in results.items():
+        print(f"{name:<20} {value:10.1f}")
+    return results
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,111 @@
+"""
+Micro-benchmark: single-pass LexiconEngine vs the original per-lexicon scans
+Run from the repo root: python -m benchmarks.bench_lexicon
+"""
+import random
+import timeit
+
+from app.comprehend import (
+    LEXICON, URGENCY_WORDS, POSITIVE_WORDS, NEGATIVE_WORDS, PRODUCT_WORDS,
+    ISSUE_WORDS, ACTION_INDICATORS, EMOTION_INDICATORS
+)
+
+SAMPLE_CHUNKS = [
+    "I need help immediately with my order!",
+    "This is very urgent, please help me now!",
+    "I'm extremely frustrated with this service!",
+    "There's an issue with my payment.",
+    "Can you help me with this problem?",
+    "I need to update my information.",
+    "Thank you for your time.",
+    "I was wondering about my order.",
+    "My account is broken and billing is not working, fix this right now, it's critical.",
+    "Hello, how are you today?",
+]
+
+# Reference copies of the original substring-based heuristics
+def legacy_detect_urgency(text):
+    text_lower = text.lower()
+    urgency_score = sum(1 for word in URGENCY_WORDS if word in text_lower)
+    return {
+        "level": "high" if urgency_score > 2 else "medium" if urgency_score > 0 else "low",
+        "score": urgency_score,
+        "indicators": [word for word in URGENCY_WORDS if word in text_lower]
+    }
+
+def legacy_quick_sentiment_check(text):
+    text_lower = text.lower()
+    positive_count = sum(1 for word in POSITIVE_WORDS if word in text_lower)
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in text_lower)
+    if positive_count > negative_count:
+        return "positive"
+    elif negative_count > positive_count:
+        return "negative"
+    return "neutral"
+
+def legacy_extract_keywords(text):
+    keywords = []
+    for word in PRODUCT_WORDS:
+        if word in text.lower():
+            keywords.append(word)
+    for word in ISSUE_WORDS:
+        if word in text.lower():
+            keywords.append(word)
+    return keywords
+
+def legacy_detect_action_items(text):
+    text_lower = text.lower()
+    return [indicator for indicator in ACTION_INDICATORS if indicator in text_lower]
+
+def legacy_analyze_customer_emotion(text):
+    text_lower = text.lower()
+    emotion_scores = {}
+    for emotion, words in EMOTION_INDICATORS.items():
+        score = sum(1 for word in words if word in text_lower)
+        if score > 0:
+            emotion_scores[emotion] = score
+    return max(emotion_scores, key=emotion_scores.get) if emotion_scores else "neutral"
+
+def legacy_analyze(text):
+    return {
+        "urgency": legacy_detect_urgency(text),
+        "sentiment": legacy_quick_sentiment_check(text),
+        "keywords": legacy_extract_keywords(text),
+        "action_items": legacy_detect_action_items(text),
+        "customer_emotion": legacy_analyze_customer_emotion(text)
+    }
+
+def run(n_chunks=2000, repeat=5):
+    rng = random.Random(42)
+    chunks = [rng.choice(SAMPLE_CHUNKS) for _ in range(n_chunks)]
+
+    # A whole call's transcript, analyzed as one text
+    transcript = " ".join(chunks)
+
+    cases = {
+        "legacy per-chunk": lambda: [legacy_analyze(c) for c in chunks],
+        "engine per-chunk": lambda: [LEXICON.analyze(c) for c in chunks],
+        "engine batch": lambda: LEXICON.analyze_many(chunks),
+    }
+    long_cases = {
+        "legacy transcript": lambda: legacy_analyze(transcript),
+        "engine transcript": lambda: LEXICON.analyze(transcript),
+    }
+
+    results = {}
+    for name, fn in cases.items():
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        results[name] = best
+        print(f"{name:<20} {best * 1e6 / n_chunks:8.2f} us/chunk  ({n_chunks / best:,.0f} chunks/s)")
+
+    baseline = results["legacy per-chunk"]
+    for name in cases:
+        print(f"{name:<20} {baseline / results[name]:5.2f}x vs legacy")
+
+    for name, fn in long_cases.items():
+        results[name] = min(timeit.repeat(fn, number=10, repeat=repeat)) / 10
+        print(f"{name:<20} {results[name] * 1e3:8.3f} ms for {len(transcript):,} chars")
+    return results
+
+if __name__ == "__main__":
+    run()
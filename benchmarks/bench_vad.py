@@ -0,0 +1,79 @@
+"""
+Benchmark: voice-activity gate on synthetic speech-plus-silence audio
+Reports frames classified per second, the fraction of audio kept from the
+transcriber, and agreement with the ground-truth speech mask
+Run from the repo root: python -m benchmarks.bench_vad
+"""
+import time
+
+import numpy as np
+
+from app.audio_decoder import PCM_FRAME_BYTES, PCM_SAMPLE_RATE
+from app.vad import VoiceActivityDetector
+
+def synthetic_call(seconds=600, speech_fraction=0.4, seed=0):
+    """
+    Alternating utterances and pauses over a low noise floor
+    Speech is a 4 Hz amplitude-modulated harmonic stack with a wandering pitch,
+    loosely shaped like voiced speech. Returns (int16 samples, per-sample truth)
+    """
+    rng = np.random.default_rng(seed)
+    n = seconds * PCM_SAMPLE_RATE
+    truth = np.zeros(n, dtype=bool)
+    t = np.arange(n) / PCM_SAMPLE_RATE
+    pos = 0
+    while pos < n:
+        talk = int(rng.uniform(0.8, 4.0) * PCM_SAMPLE_RATE)
+        pause = int(talk * (1 - speech_fraction) / speech_fraction * rng.uniform(0.5, 1.5))
+        truth[pos:pos + talk] = True
+        pos += talk + pause
+
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / PCM_SAMPLE_RATE
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 8))
+    envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * 4 * t))
+    speech = 0.1 * voiced * envelope
+    noise = rng.normal(0, 10 ** (-60 / 20), n)
+    audio = np.where(truth, speech, 0) + noise
+    return np.clip(audio * 32767, -32768, 32767).astype(np.int16), truth
+
+def run(seconds=600):
+    samples, truth = synthetic_call(seconds)
+    pcm = samples.tobytes()
+    chunks = [pcm[i:i + PCM_FRAME_BYTES] for i in range(0, len(pcm), PCM_FRAME_BYTES)]
+
+    vad = VoiceActivityDetector()
+    start = time.perf_counter()
+    kept = [chunk for chunk in chunks if vad.contains_speech(chunk)]
+    elapsed = time.perf_counter() - start
+
+    frame_truth = truth[:vad.frames * vad.frame_samples].reshape(vad.frames, -1).any(axis=1)
+    check = VoiceActivityDetector()
+    mask = check.process(pcm)
+    missed = np.count_nonzero(frame_truth & ~mask) / max(1, np.count_nonzero(frame_truth))
+    false_alarm = np.count_nonzero(~frame_truth & mask) / max(1, np.count_nonzero(~frame_truth))
+
+    start = time.perf_counter()
+    VoiceActivityDetector().process(pcm)
+    whole = time.perf_counter() - start
+
+    results = {
+        "audio_seconds": seconds,
+        "true_speech_fraction": float(truth.mean()),
+        "frames_per_second_100ms_chunks": vad.frames / elapsed,
+        "frames_per_second_one_call": vad.frames / whole,
+        "realtime_factor": seconds / elapsed,
+        "audio_skipped_fraction": 1 - len(kept) / len(chunks),
+        "speech_missed_fraction": missed,
+        "silence_passed_fraction": false_alarm,
+    }
+    print(f"{seconds} s of audio, {truth.mean():.0%} speech")
+    print(f"  100 ms chunks : {results['frames_per_second_100ms_chunks']:12,.0f} frames/s "
+          f"({results['realtime_factor']:,.0f}x real time)")
+    print(f"  single call   : {results['frames_per_second_one_call']:12,.0f} frames/s")
+    print(f"  skipped       : {results['audio_skipped_fraction']:.1%} of audio not sent to transcription")
+    print(f"  speech missed : {missed:.2%}   silence passed: {false_alarm:.2%}")
+    return results
+
+if __name__ == "__main__":
+    run()
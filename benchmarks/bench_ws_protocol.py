@@ -0,0 +1,77 @@
+"""
+Benchmark: server-side CPU per second of audio, JSON/base64 vs binary frames
+Run from the repo root: python -m benchmarks.bench_ws_protocol
+"""
+import base64
+import json
+import os
+import time
+
+import numpy as np
+
+from app.audio_protocol import CODEC_PCM_S16LE, CODEC_WEBM_OPUS, encode_frame, parse_frame
+
+# (name, codec, bytes per second of audio, sample rate)
+STREAMS = [
+    ("webm/opus 32 kbps", CODEC_WEBM_OPUS, 4000, 48000),
+    ("pcm s16le 16 kHz", CODEC_PCM_S16LE, 32000, 16000),
+    ("pcm s16le 48 kHz", CODEC_PCM_S16LE, 96000, 48000),
+]
+
+FRAME_SECONDS = 0.25
+
+def json_ingest(message: str):
+    """What websocket_endpoint does with a JSON audio_data message"""
+    payload = json.loads(message)
+    audio = base64.b64decode(payload["data"])
+    return np.frombuffer(audio, dtype=np.uint8), payload.get("use_real_transcription", False)
+
+def binary_ingest(message: bytes):
+    """What websocket_endpoint does with a binary audio frame"""
+    frame = parse_frame(message)
+    return np.frombuffer(frame.payload, dtype=np.uint8), frame.use_real_transcription
+
+def cpu_per_audio_second(ingest, messages, audio_seconds, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        for message in messages:
+            ingest(message)
+        best = min(best, time.process_time() - start)
+    return best / audio_seconds
+
+def run(audio_seconds=600):
+    n_frames = int(audio_seconds / FRAME_SECONDS)
+    results = {}
+    for name, codec, bytes_per_second, sample_rate in STREAMS:
+        payload = os.urandom(int(bytes_per_second * FRAME_SECONDS))
+        json_messages = [
+            json.dumps({
+                "type": "audio_data",
+                "data": base64.b64encode(payload).decode(),
+                "use_real_transcription": True
+            })
+            for _ in range(n_frames)
+        ]
+        binary_messages = [
+            encode_frame(payload, seq, codec=codec, sample_rate=sample_rate, use_real_transcription=True)
+            for seq in range(n_frames)
+        ]
+
+        json_cpu = cpu_per_audio_second(json_ingest, json_messages, audio_seconds)
+        binary_cpu = cpu_per_audio_second(binary_ingest, binary_messages, audio_seconds)
+        json_bytes = len(json_messages[0].encode())
+        binary_bytes = len(binary_messages[0])
+        results[name] = {
+            "json_cpu_us_per_audio_s": json_cpu * 1e6,
+            "binary_cpu_us_per_audio_s": binary_cpu * 1e6,
+            "json_bytes_per_frame": json_bytes,
+            "binary_bytes_per_frame": binary_bytes,
+        }
+        print(f"{name:<20} json {json_cpu * 1e6:8.1f} us/s  binary {binary_cpu * 1e6:8.1f} us/s  "
+              f"({json_cpu / binary_cpu:5.1f}x less CPU, "
+              f"{(json_bytes - binary_bytes) / json_bytes:.0%} less bandwidth)")
+    return results
+
+if __name__ == "__main__":
+    run()
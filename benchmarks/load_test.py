@@ -0,0 +1,273 @@
+"""
+Load test: N concurrent live-call WebSocket sessions against one server
+Starts `uvicorn app.main:app` with stubbed AWS (fake Transcribe streaming,
+heuristic insights, dummy credentials), streams WebM/Opus audio and
+client-side transcript frames at real-time pace from every session, and
+records latency percentiles, throughput and server RSS/CPU. Results are
+written as JSON so runs can be compared across commits.
+Run from the repo root:
+
+    python -m benchmarks.load_test --sessions 50 --duration 60 --out load.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+import numpy as np
+import websockets
+
+from benchmarks.bench_vad import synthetic_call
+
+# MediaRecorder-style timeslice for audio messages
+AUDIO_FRAME_SECONDS = 0.25
+TRANSCRIPT_SENTENCES = [
+    "Hello, I'm calling about my order.",
+    "There's an issue with my payment.",
+    "This is very urgent, please help me now!",
+    "Thank you, that fixed my problem.",
+]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def make_webm(seconds: float) -> bytes:
+    """Synthetic speech-plus-silence, encoded like a browser would send it"""
+    samples, _ = synthetic_call(int(seconds) + 1)
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", "s16le", "-ar", "16000", "-ac", "1",
+         "-i", "pipe:0", "-c:a", "libopus", "-b:a", "32k", "-f", "webm", "pipe:1"],
+        input=samples.tobytes(), capture_output=True, check=True
+    )
+    return result.stdout
+
+def percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0}
+    data = np.asarray(values) * 1000
+    return {
+        "count": len(values),
+        "p50_ms": float(np.percentile(data, 50)),
+        "p95_ms": float(np.percentile(data, 95)),
+        "p99_ms": float(np.percentile(data, 99)),
+        "max_ms": float(data.max()),
+    }
+
+class ProcessSampler:
+    """Samples RSS and CPU of the server process from /proc once a second"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.rss_mb: List[float] = []
+        self.cpu_percent: List[float] = []
+        self.ticks = os.sysconf("SC_CLK_TCK")
+
+    def _cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def _rss(self) -> float:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    async def run(self):
+        last_cpu, last_time = self._cpu_seconds(), time.monotonic()
+        while True:
+            await asyncio.sleep(1.0)
+            cpu, now = self._cpu_seconds(), time.monotonic()
+            self.cpu_percent.append(100 * (cpu - last_cpu) / (now - last_time))
+            self.rss_mb.append(self._rss())
+            last_cpu, last_time = cpu, now
+
+    def summary(self) -> Dict:
+        return {
+            "rss_mb_max": max(self.rss_mb, default=0.0),
+            "rss_mb_end": self.rss_mb[-1] if self.rss_mb else 0.0,
+            "cpu_percent_mean": float(np.mean(self.cpu_percent)) if self.cpu_percent else 0.0,
+            "cpu_percent_max": max(self.cpu_percent, default=0.0),
+        }
+
+class SessionStats:
+    def __init__(self):
+        self.audio_ack: List[float] = []
+        self.transcript_insight: List[float] = []
+        self.final_results = 0
+        self.partial_results = 0
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.errors = 0
+
+async def run_session(url: str, session_id: str, audio: bytes, duration: float,
+                      use_real_transcription: bool, transcript_interval: float,
+                      stats: SessionStats):
+    bytes_per_frame = max(1, int(len(audio) / duration * AUDIO_FRAME_SECONDS))
+    audio_sent: List[float] = []
+    transcripts_sent: Dict[str, float] = {}
+
+    async with websockets.connect(f"{url}/ws/live-call/{session_id}", max_size=None) as ws:
+        await ws.recv()  # connection_established
+
+        async def receive():
+            async for raw in ws:
+                now = time.perf_counter()
+                stats.messages_received += 1
+                message = json.loads(raw)
+                if message.get("type") == "error":
+                    stats.errors += 1
+                    continue
+                transcript = message.get("transcript", "")
+                if transcript in transcripts_sent:
+                    stats.transcript_insight.append(now - transcripts_sent.pop(transcript))
+                elif "is_final" in message:
+                    # Streaming result pushed by the session's Transcribe stream
+                    if message["is_final"]:
+                        stats.final_results += 1
+                    else:
+                        stats.partial_results += 1
+                elif audio_sent:
+                    # One reply per processed audio message, in order
+                    stats.audio_ack.append(now - audio_sent.pop(0))
+
+        receiver = asyncio.create_task(receive())
+        start = time.perf_counter()
+        next_transcript = start + transcript_interval
+        n = 0
+        for offset in range(0, len(audio), bytes_per_frame):
+            due = start + n * AUDIO_FRAME_SECONDS
+            if due > start + duration:
+                break
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            audio_sent.append(time.perf_counter())
+            await ws.send(json.dumps({
+                "type": "audio_data",
+                "data": base64.b64encode(audio[offset:offset + bytes_per_frame]).decode(),
+                "use_real_transcription": use_real_transcription
+            }))
+            stats.messages_sent += 1
+            if time.perf_counter() >= next_transcript:
+                text = f"{TRANSCRIPT_SENTENCES[n % len(TRANSCRIPT_SENTENCES)]} ({session_id}/{n})"
+                transcripts_sent[text] = time.perf_counter()
+                await ws.send(json.dumps({"type": "transcript_data", "data": text, "is_final": True}))
+                stats.messages_sent += 1
+                next_transcript += transcript_interval
+            n += 1
+        # Let in-flight replies arrive before closing
+        await asyncio.sleep(2.0)
+        receiver.cancel()
+
+async def drive(url: str, args, audio: bytes, pid: int) -> Dict:
+    sampler = ProcessSampler(pid)
+    sampler_task = asyncio.create_task(sampler.run())
+    sessions = [SessionStats() for _ in range(args.sessions)]
+    started = time.perf_counter()
+
+    async def staggered(index: int):
+        # Spread connects over ramp seconds, like calls arriving
+        await asyncio.sleep(args.ramp * index / max(1, args.sessions))
+        try:
+            await run_session(url, f"load-{index}", audio, args.duration,
+                              args.mode == "real", args.transcript_interval, sessions[index])
+        except Exception as e:
+            sessions[index].errors += 1
+            print(f"session {index} failed: {e}", file=sys.stderr)
+
+    await asyncio.gather(*(staggered(i) for i in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    sampler_task.cancel()
+
+    def collect(name):
+        return [value for session in sessions for value in getattr(session, name)]
+
+    sent = sum(session.messages_sent for session in sessions)
+    received = sum(session.messages_received for session in sessions)
+    return {
+        "audio_ack_latency": percentiles(collect("audio_ack")),
+        "transcript_to_insight_latency": percentiles(collect("transcript_insight")),
+        "streaming_final_results": sum(session.final_results for session in sessions),
+        "streaming_partial_results": sum(session.partial_results for session in sessions),
+        "messages_sent_per_s": sent / elapsed,
+        "messages_received_per_s": received / elapsed,
+        "audio_seconds_per_s": args.sessions * args.duration / elapsed,
+        "errors": sum(session.errors for session in sessions),
+        "wall_seconds": elapsed,
+        "server": sampler.summary(),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def start_server(port: int) -> subprocess.Popen:
+    env = dict(os.environ,
+               TRANSCRIBE_STREAMING_BACKEND="fake",
+               AWS_ACCESS_KEY_ID="testing", AWS_SECRET_ACCESS_KEY="testing",
+               AWS_DEFAULT_REGION="ap-south-1")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Server did not start")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the live-call WebSocket")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of audio per session")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds to open all sessions")
+    parser.add_argument("--mode", choices=["real", "sim"], default="real",
+                        help="real: streaming path with the fake Transcribe backend; sim: simulation path")
+    parser.add_argument("--transcript-interval", type=float, default=2.0)
+    parser.add_argument("--out", default="load_test_results.json")
+    parser.add_argument("--no-micro", action="store_true", help="skip the micro-benchmarks")
+    args = parser.parse_args(argv)
+
+    audio = make_webm(args.duration)
+    port = free_port()
+    server = start_server(port)
+    try:
+        results = asyncio.run(drive(f"ws://127.0.0.1:{port}", args, audio, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "load": results,
+    }
+    if not args.no_micro:
+        from benchmarks import bench_hot_paths
+        report["micro"] = bench_hot_paths.run()
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
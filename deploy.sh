@@ -1,8 +1,9 @@
 #!/bin/bash
-# Package Lambda function
+# Package Lambda function (handler plus the shared app package)
 cd lambda
 zip -r function.zip .
 cd ..
+zip -r lambda/function.zip app -x "*/__pycache__/*"
 
 # Update Lambda function code
 aws lambda update-function-code \
@@ -80,8 +80,9 @@ const LiveCallInterface = () => {
           case 'live_insights':
             // Only process insights from backend, not transcript data
             // Transcript is now handled directly in the frontend
+            // With delta set, only the fields that changed are sent
             if (data.insights && Object.keys(data.insights).length > 0) {
-              setInsights(data.insights);
+              setInsights(prev => data.delta ? { ...prev, ...data.insights } : data.insights);
             }
             break;
             
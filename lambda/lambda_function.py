@@ -1,40 +1,194 @@
+"""
+Lambda entry point for recorded-call analysis
+Handles three event shapes:
+- API Gateway: body {"audio_s3_uri": ...} or {"audio_s3_uris": [...]}
+- S3 ObjectCreated notifications, one or many records
+- SQS batches whose messages carry S3 notifications (or {"audio_s3_uri": ...});
+  failed messages are returned as batchItemFailures, so enable
+  ReportBatchItemFailures on the event source mapping
+Records of one event are processed concurrently. Only the standard library is
+imported at module load; boto3 and the app modules load on first use and,
+like the event loop and the AWS clients, are reused by warm invocations.
+"""
 import json
-import boto3
-from transcribe import start_transcription
-from comprehend import analyze_text
-import asyncio
+import os
+import time
+import urllib.parse
 
-transcribe_client = boto3.client("transcribe", region_name="us-east-1")
-comprehend_client = boto3.client("comprehend", region_name="us-east-1")
+_init_started = time.perf_counter()
 
-def lambda_handler(event, context):
-    try:
-        # Assume audio is uploaded to S3 and event contains S3 bucket/key
-        body = json.loads(event["body"])
-        audio_s3_uri = body.get("audio_s3_uri")
+AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
+# Results of S3/SQS records are written next to the audio under this prefix
+RESULTS_PREFIX = os.environ.get("RESULTS_PREFIX", "insights/")
+# Records of one event processed at a time
+MAX_CONCURRENT_RECORDS = int(os.environ.get("MAX_CONCURRENT_RECORDS", "10"))
+# Cold-start import budget (this module plus the app modules it loads), in ms
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "300"))
+
+_module_import_ms = None
+_loop = None
+_pipeline = None
+
+class Pipeline:
+    """The app modules and clients used per record, loaded once per container"""
+
+    def __init__(self):
+        started = time.perf_counter()
+        import asyncio
+        from app.aws_clients import get_client
+        from app.comprehend import analyze_text_async
+        from app.media_format import media_format_from_key
+        from app.transcribe import get_transcript_text, start_transcription
+
+        self.asyncio = asyncio
+        self.analyze_text_async = analyze_text_async
+        self.get_transcript_text = get_transcript_text
+        self.media_format_from_key = media_format_from_key
+        self.start_transcription = start_transcription
+        imported = time.perf_counter()
+        # Created now so warm invocations reuse their connection pools
+        self.transcribe = get_client("transcribe", AWS_REGION)
+        self.comprehend = get_client("comprehend", AWS_REGION)
+        self.s3 = get_client("s3", AWS_REGION)
+        self.import_ms = (imported - started) * 1000
+        self.clients_ms = (time.perf_counter() - imported) * 1000
+
+    async def analyze(self, audio_s3_uri: str) -> dict:
+        transcription = await self.start_transcription(self.transcribe, audio_s3_uri)
+        transcript_text = await self.asyncio.to_thread(self.get_transcript_text, transcription["Transcript"])
+        insights = await self.analyze_text_async(self.comprehend, transcript_text)
+        return {
+            "audio_s3_uri": audio_s3_uri,
+            "transcription": transcription,
+            "transcript": transcript_text,
+            "insights": insights
+        }
+
+    async def analyze_and_store(self, audio_s3_uri: str) -> dict:
+        result = await self.analyze(audio_s3_uri)
+        bucket, _, key = audio_s3_uri[5:].partition("/")
+        result_key = f"{RESULTS_PREFIX}{key}.json"
+        await self.asyncio.to_thread(self.s3.put_object, Bucket=bucket, Key=result_key,
+                                     Body=json.dumps(result).encode(), ContentType="application/json")
+        return {"audio_s3_uri": audio_s3_uri, "result_uri": f"s3://{bucket}/{result_key}"}
+
+    async def run_all(self, uris, handler):
+        """Run handler over every URI concurrently; a failure is returned as its exception"""
+        semaphore = self.asyncio.Semaphore(MAX_CONCURRENT_RECORDS)
+
+        async def run_one(uri):
+            async with semaphore:
+                return await handler(uri)
 
-        if not audio_s3_uri:
-            return {
-                "statusCode": 400,
-                "body": json.dumps({"error": "Missing audio_s3_uri"})
-            }
+        return await self.asyncio.gather(*(run_one(uri) for uri in uris), return_exceptions=True)
 
-        # Start transcription
-        loop = asyncio.get_event_loop()
-        transcription = loop.run_until_complete(start_transcription(transcribe_client, audio_s3_uri))
+def get_pipeline() -> Pipeline:
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = Pipeline()
+        import_ms = _module_import_ms + _pipeline.import_ms
+        # One structured line per cold start, for CloudWatch Logs Insights
+        print(json.dumps({
+            "cold_start": True,
+            "import_ms": round(import_ms, 1),
+            "clients_ms": round(_pipeline.clients_ms, 1),
+            "import_budget_ms": IMPORT_BUDGET_MS,
+            "over_budget": import_ms > IMPORT_BUDGET_MS
+        }))
+    return _pipeline
 
-        # Analyze transcription
-        insights = analyze_text(comprehend_client, transcription["Transcript"])
+def run(coroutine):
+    """Run on the container's event loop, created once and kept across invocations"""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        import asyncio
 
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop.run_until_complete(coroutine)
+
+def _s3_uris(notification: dict):
+    """Audio object URIs in an S3 event notification (test events have none)"""
+    uris = []
+    for record in notification.get("Records", []):
+        s3 = record.get("s3")
+        if not s3:
+            continue
+        key = urllib.parse.unquote_plus(s3["object"]["key"])
+        if key.startswith(RESULTS_PREFIX):
+            continue
+        uris.append(f"s3://{s3['bucket']['name']}/{key}")
+    return uris
+
+def _is_audio(pipeline: Pipeline, uri: str) -> bool:
+    return pipeline.media_format_from_key(uri) is not None
+
+def handle_sqs(event: dict) -> dict:
+    pipeline = get_pipeline()
+    items = []
+    failures = []
+    for record in event["Records"]:
+        try:
+            body = json.loads(record["body"])
+            uris = [body["audio_s3_uri"]] if "audio_s3_uri" in body else _s3_uris(body)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Unreadable SQS message {record['messageId']}: {e}")
+            failures.append(record["messageId"])
+            continue
+        items.extend((record["messageId"], uri) for uri in uris if _is_audio(pipeline, uri))
+
+    results = run(pipeline.run_all([uri for _, uri in items], pipeline.analyze_and_store))
+    for (message_id, uri), result in zip(items, results):
+        if isinstance(result, BaseException):
+            print(f"Failed {uri}: {result}")
+            if message_id not in failures:
+                failures.append(message_id)
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failures]}
+
+def handle_s3(event: dict) -> dict:
+    pipeline = get_pipeline()
+    uris = [uri for uri in _s3_uris(event) if _is_audio(pipeline, uri)]
+    results = run(pipeline.run_all(uris, pipeline.analyze_and_store))
+    failed = {uri: str(result) for uri, result in zip(uris, results) if isinstance(result, BaseException)}
+    for uri, error in failed.items():
+        print(f"Failed {uri}: {error}")
+    return {"processed": len(uris) - len(failed), "failed": failed}
+
+def handle_api(event: dict) -> dict:
+    body = json.loads(event.get("body") or "{}")
+    uris = body.get("audio_s3_uris") or ([body["audio_s3_uri"]] if body.get("audio_s3_uri") else [])
+    if not uris:
         return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "transcription": transcription,
-                "insights": insights
-            })
+            "statusCode": 400,
+            "body": json.dumps({"error": "Missing audio_s3_uri"})
         }
+
+    pipeline = get_pipeline()
+    results = run(pipeline.run_all(uris, pipeline.analyze))
+    if len(uris) == 1:
+        if isinstance(results[0], BaseException):
+            raise results[0]
+        return {"statusCode": 200, "body": json.dumps(results[0])}
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"results": [
+            {"audio_s3_uri": uri, "error": str(result)} if isinstance(result, BaseException) else result
+            for uri, result in zip(uris, results)
+        ]})
+    }
+
+def lambda_handler(event, context):
+    records = event.get("Records") or []
+    if records and records[0].get("eventSource") == "aws:sqs":
+        return handle_sqs(event)
+    if records and records[0].get("eventSource") == "aws:s3":
+        return handle_s3(event)
+    try:
+        return handle_api(event)
     except Exception as e:
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)})
-        } 
\ No newline at end of file
+        }
+
+_module_import_ms = (time.perf_counter() - _init_started) * 1000
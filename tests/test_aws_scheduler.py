@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.aws_scheduler import AWSRequestScheduler, DeadlineExceeded, QuotaBuckets, scheduling
+
+API = "comprehend.batch_detect_sentiment"
+
+def test_quota_is_shared_between_event_loops():
+    # Burst of 5, then 10 per second, for every loop in the process together
+    buckets = QuotaBuckets({API: 10.0})
+    buckets.get(API).capacity = buckets.get(API).tokens = 5.0
+    finished = []
+
+    def worker():
+        async def requests():
+            scheduler = AWSRequestScheduler(buckets)
+            await asyncio.gather(*(scheduler.acquire(API) for _ in range(5)))
+            return scheduler
+        scheduler = asyncio.run(requests())
+        finished.append((time.monotonic(), scheduler.queues[API].granted))
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(granted for _, granted in finished) == 15
+    # 15 requests, 5 from the burst and 10 at 10 per second
+    assert max(at for at, _ in finished) - started >= 0.9
+
+def test_higher_priority_is_served_first():
+    async def scenario():
+        buckets = QuotaBuckets({API: 20.0})
+        buckets.get(API).tokens = 0.0
+        scheduler = AWSRequestScheduler(buckets)
+        order = []
+
+        async def request(priority, score=0.0):
+            with scheduling(priority, score):
+                await scheduler.acquire(API)
+            order.append((priority, score))
+
+        await asyncio.gather(request("low"), request("normal"), request("high", 0.2),
+                             request("critical"), request("high", 0.9))
+        return order
+
+    assert asyncio.run(scenario()) == [("critical", 0.0), ("high", 0.9), ("high", 0.2),
+                                       ("normal", 0.0), ("low", 0.0)]
+
+def test_queued_request_is_dropped_at_its_deadline():
+    async def scenario():
+        buckets = QuotaBuckets({API: 1.0})
+        buckets.get(API).tokens = 0.0
+        scheduler = AWSRequestScheduler(buckets)
+        with pytest.raises(DeadlineExceeded):
+            await scheduler.acquire(API, deadline_seconds=0.05)
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["by_api"][API]["dropped"] == 1
+    assert stats["by_priority"]["normal"]["dropped"] == 1
@@ -0,0 +1,32 @@
+import subprocess
+import sys
+
+from app.media_format import SNIFF_BYTES, detect_media_format, media_format_from_key
+
+def test_detect_media_format():
+    heads = {
+        b"ID3\x04\x00\x00\x00\x00\x00\x00\x00\x00": "mp3",
+        b"\xff\xfb\x90\x64\x00\x00\x00\x00\x00\x00\x00\x00": "mp3",
+        b"RIFF\x24\x00\x00\x00WAVE": "wav",
+        b"fLaC\x00\x00\x00\x22\x00\x00\x00\x00": "flac",
+        b"OggS\x00\x02\x00\x00\x00\x00\x00\x00": "ogg",
+        b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\xf7\x81": "webm",
+        b"#!AMR\n\x00\x00\x00\x00\x00\x00": "amr",
+        b"\x00\x00\x00\x20ftypM4A ": "m4a",
+        b"\x00\x00\x00\x20ftypisom": "mp4",
+        bytes(SNIFF_BYTES): None,
+    }
+    assert {head: detect_media_format(head) for head in heads} == heads
+
+def test_media_format_from_key():
+    assert media_format_from_key("s3://call-recordings/calls/a.WAV") == "wav"
+    assert media_format_from_key("calls/a.m4a") == "m4a"
+    assert media_format_from_key("calls/a.txt") is None
+    assert media_format_from_key("calls/a") is None
+
+def test_lambda_modules_need_no_server_dependencies():
+    # The Lambda zip carries the app package but none of its requirements
+    code = ("import sys; import app.media_format, app.transcribe, app.comprehend; "
+            "print(sorted({'multipart', 'fastapi', 'numpy'} & set(sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
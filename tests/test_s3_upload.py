@@ -0,0 +1,81 @@
+import asyncio
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app.s3_upload import MultipartFileReader, S3MultipartUpload, upload_stream
+
+BUCKET = "call-recordings"
+# S3's minimum size for every part but the last
+PART_SIZE = 5 * 1024 * 1024
+WAV_HEADER = b"RIFF\x00\x00\x00\x00WAVEfmt "
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+async def chunked(data: bytes, size: int = 1024 * 1024):
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+def test_upload_stream_in_parts(s3):
+    body = WAV_HEADER + bytes(range(256)) * (11 * 1024 * 1024 // 256)
+    upload = asyncio.run(upload_stream(s3, BUCKET, "calls/a.wav", chunked(body),
+                                       part_size=PART_SIZE, max_parallel=2))
+    assert upload.uri == f"s3://{BUCKET}/calls/a.wav"
+    assert upload.size == len(body)
+    assert upload.media_format == "wav"
+    assert len(upload._parts) == 3
+    stored = s3.get_object(Bucket=BUCKET, Key="calls/a.wav")["Body"].read()
+    assert stored == body
+
+def test_small_upload_is_one_part(s3):
+    upload = asyncio.run(upload_stream(s3, BUCKET, "calls/short.mp3", chunked(b"ID3" + bytes(100))))
+    assert upload.media_format == "mp3"
+    assert s3.head_object(Bucket=BUCKET, Key="calls/short.mp3")["ContentLength"] == 103
+
+def test_failed_stream_aborts_upload(s3):
+    async def broken():
+        yield bytes(PART_SIZE)
+        raise ConnectionError("client went away")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(upload_stream(s3, BUCKET, "calls/broken.wav", broken(), part_size=PART_SIZE))
+    assert not s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+def test_form_upload_streams_into_s3(s3):
+    boundary = "recording-boundary"
+    audio = WAV_HEADER + bytes(4096)
+    form = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="note"\r\n\r\n'
+        "ignored\r\n"
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="call.wav"\r\n'
+        "Content-Type: audio/wav\r\n\r\n"
+    ).encode() + audio + f"\r\n--{boundary}--\r\n".encode()
+
+    async def scenario():
+        reader = MultipartFileReader({"content-type": f"multipart/form-data; boundary={boundary}"},
+                                     chunked(form, size=100))
+        await reader.open()
+        assert reader.filename == "call.wav"
+        assert reader.content_type == "audio/wav"
+        upload = S3MultipartUpload(s3, BUCKET, "calls/call.wav", content_type=reader.content_type)
+        async for chunk in reader.chunks():
+            await upload.write(chunk)
+        await upload.complete()
+        return upload
+
+    upload = asyncio.run(scenario())
+    assert upload.media_format == "wav"
+    stored = s3.get_object(Bucket=BUCKET, Key="calls/call.wav")
+    assert stored["ContentType"] == "audio/wav"
+    assert stored["Body"].read() == audio
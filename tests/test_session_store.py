@@ -0,0 +1,117 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.session_store import MemorySessionStore, RedisSessionStore
+
+def redis_store(server=None, **options):
+    client = fakeredis.FakeAsyncRedis(server=server or fakeredis.FakeServer(), decode_responses=True)
+    return RedisSessionStore(client=client, **options)
+
+# Every backend has to pass the same contract
+STORES = {
+    "memory": MemorySessionStore,
+    "redis": redis_store,
+}
+
+@pytest.fixture(params=sorted(STORES))
+def make_store(request):
+    return STORES[request.param]
+
+# Published until a new subscriber is listening; skipped by next_message
+PROBE = {"type": "probe"}
+
+async def next_message(subscription, timeout=2.0):
+    message = PROBE
+    while message == PROBE:
+        message = await asyncio.wait_for(subscription.__anext__(), timeout)
+    return message
+
+async def subscribed(store, session_id):
+    """A subscription that is already listening"""
+    subscription = store.subscribe(session_id)
+    first = asyncio.ensure_future(subscription.__anext__())
+    while not first.done():
+        await store.publish(session_id, PROBE)
+        await asyncio.sleep(0.01)
+    assert first.result() == PROBE
+    return subscription
+
+def test_session_metadata(make_store):
+    async def scenario():
+        store = make_store()
+        assert await store.get_session("call-1") is None
+        await store.create_session("call-1", {"backend": "fake", "status": "active", "channels": 2})
+        await store.update_session("call-1", {"status": "ended", "ended_at": 12.5})
+        session = await store.get_session("call-1")
+        await store.create_session("call-1", {"backend": "aws"})
+        recreated = await store.get_session("call-1")
+        await store.close()
+        return session, recreated
+
+    session, recreated = asyncio.run(scenario())
+    assert session == {"backend": "fake", "status": "ended", "channels": 2, "ended_at": 12.5}
+    # Creating a session again starts its metadata over
+    assert recreated == {"backend": "aws"}
+
+def test_returned_metadata_is_a_copy(make_store):
+    async def scenario():
+        store = make_store()
+        await store.create_session("call-1", {"status": "active"})
+        (await store.get_session("call-1"))["status"] = "changed"
+        return await store.get_session("call-1")
+
+    assert asyncio.run(scenario()) == {"status": "active"}
+
+def test_insight_snapshots(make_store):
+    snapshot = {"chunks_analyzed": 3, "customer_sentiment": "negative", "speakers": {"agent": {}}}
+
+    async def scenario():
+        store = make_store()
+        assert await store.load_insights("call-1") is None
+        await store.save_insights("call-1", snapshot)
+        return await store.load_insights("call-1")
+
+    assert asyncio.run(scenario()) == snapshot
+
+def test_sessions_expire(make_store):
+    async def scenario():
+        store = make_store(ttl=1)
+        await store.create_session("call-1", {"status": "active"})
+        await store.save_insights("call-1", {"chunks_analyzed": 1})
+        await asyncio.sleep(1.1)
+        return await store.get_session("call-1"), await store.load_insights("call-1")
+
+    assert asyncio.run(scenario()) == (None, None)
+
+def test_publish_reaches_subscribers(make_store):
+    async def scenario():
+        store = make_store()
+        first = await subscribed(store, "call-1")
+        second = await subscribed(store, "call-1")
+        other = await subscribed(store, "call-2")
+        await store.publish("call-1", {"type": "live_insights", "transcript": "hello"})
+        received = [await next_message(first), await next_message(second)]
+        with pytest.raises(asyncio.TimeoutError):
+            await next_message(other, timeout=0.1)
+        for subscription in (first, second, other):
+            await subscription.aclose()
+        await store.close()
+        return received
+
+    assert asyncio.run(scenario()) == [{"type": "live_insights", "transcript": "hello"}] * 2
+
+def test_redis_store_is_shared_between_workers():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        worker_a, worker_b = redis_store(server), redis_store(server)
+        await worker_a.create_session("call-1", {"worker": "a"})
+        await worker_a.save_insights("call-1", {"chunks_analyzed": 2})
+        watcher = await subscribed(worker_b, "call-1")
+        await worker_a.publish("call-1", {"type": "live_insights"})
+        message = await next_message(watcher)
+        await watcher.aclose()
+        return await worker_b.get_session("call-1"), await worker_b.load_insights("call-1"), message
+
+    assert asyncio.run(scenario()) == ({"worker": "a"}, {"chunks_analyzed": 2}, {"type": "live_insights"})
@@ -0,0 +1,67 @@
+import asyncio
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from app import transcribe
+from app.transcribe import get_job_tracker, start_transcription
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    # moto moves a job along one status per poll
+    monkeypatch.setattr(transcribe, "MIN_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(transcribe, "MAX_POLL_SECONDS", 0.05)
+    with mock_aws():
+        yield boto3.client("transcribe", region_name="us-east-1")
+
+def test_start_transcription_waits_for_completion(client):
+    async def scenario():
+        result = await start_transcription(client, "s3://call-recordings/calls/a.wav")
+        return result, get_job_tracker().stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result["JobName"].startswith("transcription-")
+    assert result["Transcript"].endswith("asrOutput.json")
+    job = client.get_transcription_job(TranscriptionJobName=result["JobName"])["TranscriptionJob"]
+    # The format comes from the extension when the upload did not detect it
+    assert job["MediaFormat"] == "wav"
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["polls"] >= 2
+
+def test_tracker_polls_jobs_together(client):
+    async def scenario():
+        tracker = get_job_tracker()
+        names = [await tracker.submit(client, f"s3://call-recordings/calls/{index}.mp3")
+                 for index in range(5)]
+        results = await asyncio.gather(*(tracker.wait(name) for name in names))
+        return tracker, names, results
+
+    tracker, names, results = asyncio.run(scenario())
+    assert len(set(names)) == 5
+    assert [result["TranscriptionJobName"] for result in results] == names
+    assert all(result["TranscriptionJobStatus"] == "COMPLETED" for result in results)
+    assert tracker.completed == 5
+    assert not tracker.futures
+
+def test_unknown_job_is_an_error(client):
+    async def scenario():
+        with pytest.raises(KeyError):
+            await get_job_tracker().wait("transcription-unknown")
+
+    asyncio.run(scenario())
+
+def test_duplicate_job_name_is_rejected(client):
+    async def scenario():
+        tracker = get_job_tracker()
+        await tracker.submit(client, "s3://call-recordings/calls/a.wav", job_name="transcription-a")
+        with pytest.raises(client.exceptions.ConflictException):
+            await tracker.submit(client, "s3://call-recordings/calls/a.wav", job_name="transcription-a")
+        await tracker.wait("transcription-a")
+        return tracker
+
+    tracker = asyncio.run(scenario())
+    assert tracker.submitted == 1
@@ -0,0 +1,166 @@
+import asyncio
+
+from app.audio_decoder import EBML_MAGIC, session_decoders
+from app.metrics import SIMULATION_FALLBACKS
+from app.transcribe_streaming import (
+    SAMPLE_TRANSCRIPTIONS, FakeTranscribeStream, TranscribeStreamSession, process_audio_chunk,
+    start_real_transcription, transcribe_sessions
+)
+from app.websocket_handler import handle_audio_data, manager
+
+# 100 ms of 16 kHz s16le PCM
+FRAME = bytes(3200)
+
+async def ignore_result(text, is_final):
+    pass
+
+async def wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+def test_failing_open_falls_back_to_simulation():
+    async def scenario():
+        attempts = []
+
+        async def open_stream():
+            attempts.append(1)
+            raise ConnectionError("no credentials")
+
+        session = TranscribeStreamSession("fail-open", ignore_result, open_stream=open_stream,
+                                          max_open_failures=2, retry_seconds=60)
+        session.backend = "fake"
+        transcribe_sessions["fail-open"] = session
+        manager.transcribe_sessions["fail-open"] = session
+        try:
+            assert await start_real_transcription(FRAME, "fail-open", is_pcm=True)
+            session.send_audio(FRAME)
+            await wait_for(lambda: session.failed)
+            assert len(attempts) == 2
+            assert session.last_error == "no credentials"
+            assert not await start_real_transcription(FRAME, "fail-open", is_pcm=True)
+
+            fallbacks = SIMULATION_FALLBACKS.values.get((), 0)
+            await handle_audio_data("fail-open", FRAME, True, codec="pcm_s16le")
+            assert SIMULATION_FALLBACKS.values.get((), 0) == fallbacks + 1
+        finally:
+            transcribe_sessions.pop("fail-open", None)
+            manager.transcribe_sessions.pop("fail-open", None)
+            manager.ingests.pop("fail-open", None)
+            await session.close()
+
+    asyncio.run(scenario())
+
+def test_failed_session_retries_after_the_retry_window():
+    async def scenario():
+        outcomes = [ConnectionError("throttled"), None]
+        streams = []
+
+        class Stream:
+            async def send(self, pcm):
+                pass
+
+            async def end(self):
+                pass
+
+            async def results(self):
+                return
+                yield
+
+        async def open_stream():
+            outcome = outcomes.pop(0)
+            if outcome is not None:
+                raise outcome
+            streams.append(Stream())
+            return streams[-1]
+
+        session = TranscribeStreamSession("retry-open", ignore_result, open_stream=open_stream,
+                                          max_open_failures=1, retry_seconds=0.2)
+        session.send_audio(FRAME)
+        await wait_for(lambda: session.failed)
+        await wait_for(lambda: not session.failed)
+        session.send_audio(FRAME)
+        await wait_for(lambda: session.streams_opened == 1)
+        assert session.open_failures == 0
+        assert session.frames_sent == 1
+        await session.close()
+
+    asyncio.run(scenario())
+
+def fake_opener(failures=0, **options):
+    """open_stream for FakeTranscribeStream that fails the first `failures` times"""
+    calls = []
+
+    async def open_stream():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ConnectionError("service unavailable")
+        return await FakeTranscribeStream(**options).open()
+
+    return open_stream, calls
+
+def test_stream_opens_on_first_audio_and_delivers_results():
+    async def scenario():
+        results = []
+
+        async def on_result(text, is_final):
+            results.append((text, is_final))
+
+        open_stream, calls = fake_opener(sentence_seconds=0.5, partial_seconds=0.1)
+        session = TranscribeStreamSession("fake-open", on_result, open_stream=open_stream)
+        await asyncio.sleep(0.05)
+        # Lazy: no audio, no stream
+        assert calls == []
+        for _ in range(6):
+            session.send_audio(FRAME)
+        await wait_for(lambda: any(is_final for _, is_final in results))
+        await session.close()
+        assert calls == [1]
+        assert session.streams_opened == 1
+        assert session.frames_sent == 6
+        assert any(not is_final for _, is_final in results)
+        # Closed sessions ignore audio
+        session.send_audio(FRAME)
+        assert session.frames_sent == 6
+
+    asyncio.run(scenario())
+
+def test_stream_open_is_retried():
+    async def scenario():
+        open_stream, calls = fake_opener(failures=1)
+        session = TranscribeStreamSession("fake-retry", ignore_result, open_stream=open_stream)
+        session.send_audio(FRAME)
+        await wait_for(lambda: session.frames_sent == 1)
+        assert len(calls) == 2
+        assert session.errors == 1
+        assert not session.failed
+        await session.close()
+
+    asyncio.run(scenario())
+
+def test_idle_stream_is_closed_and_reopened():
+    async def scenario():
+        open_stream, calls = fake_opener()
+        session = TranscribeStreamSession("fake-idle", ignore_result, open_stream=open_stream,
+                                          idle_seconds=0.05)
+        session.send_audio(FRAME)
+        await wait_for(lambda: session.frames_sent == 1)
+        await asyncio.sleep(0.2)
+        session.send_audio(FRAME)
+        await wait_for(lambda: session.frames_sent == 2)
+        assert session.streams_opened == 2
+        await session.close()
+
+    asyncio.run(scenario())
+
+def test_encoded_simulation_does_not_decode():
+    async def scenario():
+        chunk = EBML_MAGIC + bytes(4000)
+        transcripts = [await process_audio_chunk(chunk, "sim-webm") for _ in range(50)]
+        assert "sim-webm" not in session_decoders
+        # Throttled to one transcript per SIMULATED_ENCODED_SECONDS
+        assert sum(1 for text in transcripts if text) <= 1
+        assert all(not text or text in SAMPLE_TRANSCRIPTIONS["medium"] for text in transcripts)
+
+    asyncio.run(scenario())